@@ -1,10 +1,11 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from DataModel.Effects.HackingEffects.CleanHackedEffect import CleanHackedEffect
 from DataModel.Effects.VehicleEffect import VehicleEffect
 from DataModel.Effects.VehicleEffectList import VehicleEffectIdentification
 from DataModel.Vehicle import Vehicle
+from EnvironmentManagement.Clock import get_clock
 from EnvironmentManagement.ConfigurationHandler import ConfigurationHandler
 
 logger = logging.getLogger(__name__)
@@ -38,7 +39,7 @@ class HackingProtection(VehicleEffect):
         except KeyError:
             duration = 15
 
-        self._end_time = datetime.now() + timedelta(seconds=duration)
+        self._end_time = get_clock().now() + timedelta(seconds=duration)
 
         return True
 
@@ -49,4 +50,4 @@ class HackingProtection(VehicleEffect):
         if self._end_time is None:
             logger.error("The effect had no valid end time set. Removing it now")
             return True
-        return self._end_time < datetime.now()
+        return self._end_time < get_clock().now()
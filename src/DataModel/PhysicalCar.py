@@ -4,7 +4,8 @@ from typing import Callable
 from bleak import BleakClient
 from DataModel.Vehicle import Vehicle
 from LocationService.PhysicalLocationService import PhysicalLocationService
-from VehicleManagement.AnkiController import AnkiController
+from LocationService.PieceLengthCalibration import PieceLengthCalibration
+from VehicleManagement.AnkiController import AnkiController, BleClient
 from VehicleManagement.VehicleController import Turns
 
 logger = logging.getLogger(__name__)
@@ -37,12 +38,19 @@ class PhysicalCar(Vehicle):
         self._location_service.__del__()
         super().__del__()
 
-    async def initiate_connection(self, uuid: str) -> bool:
+    async def initiate_connection(self, uuid: str, ble_client: BleClient | None = None) -> bool:
+        """
+        Connects the controller to the car with the UUID. If a client is given (e.g. a stand-in for the car), it's
+        used instead of creating a `BleakClient`
+        """
         if self._controller is None:
             logger.error("Tried to connect to vehicle without active controller. Ignoring the request")
             return False
-        if await self._controller.connect_to_vehicle(BleakClient(uuid), True):
+        if ble_client is None:
+            ble_client = BleakClient(uuid)
+        if await self._controller.connect_to_vehicle(ble_client, True):
             self._controller.set_ble_not_reachable_callback(self._model_car_not_reachable_callback)
+            self._controller.set_latency_callback(self._location_service.add_ble_latency_sample)
             self._controller.set_callbacks(self._receive_location,
                                            self._receive_transition,
                                            self._receive_offset_update,
@@ -66,11 +74,26 @@ class PhysicalCar(Vehicle):
         super()._receive_transition(value_tuple)
         _, _, offset, _ = value_tuple
         offset = clamp(offset, -66.5, 66.5)
-        self._location_service.notify_transition_event(offset)
+        timestamp = None if self._controller is None else self._controller.get_last_notification_time()
+        self._location_service.notify_transition_event(offset, timestamp)
+
+    def get_ble_latency(self) -> float:
+        """
+        Gets the estimated latency in seconds of the BLE notifications of the car
+        """
+        return self._location_service.get_ble_latency()
+
+    def set_length_calibration(self, calibration: PieceLengthCalibration) -> None:
+        """
+        Sets the effective piece lengths of the track that are shared by all physical cars
+        """
+        self._location_service.set_length_calibration(calibration)
 
     def extract_controller(self):
         controller = self._controller
         self._controller = None
+        if controller is not None:
+            controller.set_latency_callback(None)
         return controller
 
     def insert_controller(self, controller: AnkiController):
@@ -81,6 +104,7 @@ class PhysicalCar(Vehicle):
                                        self._receive_version,
                                        self._receive_battery)
         self._controller.set_ble_not_reachable_callback(self._model_car_not_reachable_callback)
+        self._controller.set_latency_callback(self._location_service.add_ble_latency_sample)
         self._controller.request_version()
         self._controller.request_battery()
 
@@ -12,6 +12,7 @@ from typing import Callable, Any
 
 import Constants
 from DataModel.Effects.VehicleEffect import VehicleEffect
+from EnvironmentManagement.Clock import get_clock
 from Items.Item import Item
 from LocationService.LocationService import LocationService
 from LocationService.Track import FullTrack
@@ -67,7 +68,7 @@ class Vehicle:
         Sets the owner of the vehicle
         """
         self.player = key
-        self.game_start = datetime.now()
+        self.game_start = get_clock().now()
 
     def remove_player(self) -> None:
         """
@@ -294,11 +295,12 @@ class Vehicle:
         return
 
     def _receive_version(self, value_tuple: tuple[Any]) -> None:
-        self._version = str(value_tuple)
+        # the record is converted to a plain tuple to keep the format of the string
+        self._version = str(tuple(value_tuple))
         return
 
     def _receive_battery(self, value_tuple: tuple[Any]) -> None:
-        self._battery = str(value_tuple)
+        self._battery = str(tuple(value_tuple))
 
         self._on_driving_data_change()
         return
@@ -358,7 +360,7 @@ class Vehicle:
                     self._effects.remove(effect)
                     self._on_item_data_change('None')
                     logger.info("Car %s doesn't have the effect %s anymore", self.vehicle_id, str(effect.identify()))
-            await asyncio.sleep(1)
+            await get_clock().sleep(1)
 
     def set_item_data_callback(self, function_name: Callable[[dict[str, str]], None]) -> None:
         self._item_data_callback = function_name
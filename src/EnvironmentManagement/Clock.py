@@ -0,0 +1,120 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class Clock:
+    """
+    Source of time for everything in the game that waits or measures time. This default implementation uses the
+    real time. Use `set_clock` to replace it, e.g. with a `VirtualClock` to run the game faster than realtime.
+    """
+
+    def time(self) -> float:
+        """
+        Gets a monotonic time in seconds. Only differences between two values are meaningful
+        """
+        return time.monotonic()
+
+    def now(self) -> datetime:
+        """
+        Gets the current date and time
+        """
+        return datetime.now()
+
+    async def sleep(self, seconds: float) -> None:
+        """
+        Waits for the given amount of seconds
+        """
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """
+    Clock that only advances when `advance` is called. Sleeping tasks are woken up in the order of their wake up
+    time as soon as the virtual time reaches it, without waiting in real time. This allows running the game (e.g.
+    headless for load studies or in tests) as fast as the CPU allows.
+
+    Parameters
+    ----------
+    start: datetime | None
+        Date and time at virtual time 0. Defaults to the current date and time
+    settle_iterations: int
+        How often the event loop is run after waking up tasks, so they can handle the wake up and go to sleep
+        again before the time advances further
+    """
+
+    def __init__(self, start: datetime | None = None, settle_iterations: int = 10) -> None:
+        self._time: float = 0
+        self._start: datetime = start if start is not None else datetime.now()
+        self._settle_iterations: int = settle_iterations
+        self._sleepers: list[tuple[float, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+
+    def time(self) -> float:
+        return self._time
+
+    def now(self) -> datetime:
+        return self._start + timedelta(seconds=self._time)
+
+    async def sleep(self, seconds: float) -> None:
+        if seconds <= 0:
+            await asyncio.sleep(0)
+            return
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self._time + seconds, next(self._sequence), future))
+        await future
+
+    def get_sleeper_count(self) -> int:
+        """
+        Gets the amount of tasks that are currently waiting for the virtual time to advance
+        """
+        return len([sleeper for sleeper in self._sleepers if not sleeper[2].done()])
+
+    async def advance(self, seconds: float) -> None:
+        """
+        Advances the virtual time by the given amount of seconds and wakes up all tasks whose sleep ends in this
+        time, one wake up time after another.
+        """
+        target = self._time + seconds
+        await self._settle()
+        while len(self._sleepers) > 0 and self._sleepers[0][0] <= target:
+            wake_time = self._sleepers[0][0]
+            self._time = max(self._time, wake_time)
+            while len(self._sleepers) > 0 and self._sleepers[0][0] <= wake_time:
+                _, _, future = heapq.heappop(self._sleepers)
+                if not future.done():
+                    future.set_result(None)
+            await self._settle()
+        self._time = max(self._time, target)
+
+    async def _settle(self) -> None:
+        """
+        Runs the event loop a few times so all tasks that are ready can run until they wait again
+        """
+        for _ in range(0, self._settle_iterations):
+            await asyncio.sleep(0)
+
+
+_clock: Clock = Clock()
+
+
+def get_clock() -> Clock:
+    """
+    Gets the clock that is used by the whole game
+    """
+    return _clock
+
+
+def set_clock(clock: Clock) -> None:
+    """
+    Replaces the clock that is used by the whole game. Should be done before the game is started, since tasks
+    that are already sleeping keep waiting on the old clock
+    """
+    global _clock
+    _clock = clock
+    logger.info("Using %s as clock", type(clock).__name__)
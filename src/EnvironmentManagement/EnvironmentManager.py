@@ -11,7 +11,7 @@ import asyncio
 import re
 
 from enum import Enum
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Callable, Any
 from collections import deque
 from deprecated import deprecated
@@ -22,18 +22,20 @@ from DataModel.PhysicalCar import PhysicalCar
 from DataModel.Vehicle import Vehicle
 from DataModel.VirtualCar import VirtualCar
 
+from .Clock import get_clock
 from .ConfigurationHandler import ConfigurationHandler
+from .SpeedProfileStore import SpeedProfileStore
+from .TrackRegistry import TrackRegistry
 
 from Items.ItemGenerator import ItemGenerator
 from LocationService.PhysicalLocationService import PhysicalLocationService
-from LocationService.TrackSerialization import parse_list_of_dicts_to_full_track, PieceDecodingException, \
-    full_track_to_list_of_dicts
 
-from VehicleManagement.AnkiController import AnkiController
+from VehicleManagement.AnkiController import AnkiController, BleClient
 from VehicleManagement.FleetController import FleetController
 
-from LocationService.LocationService import LocationService
+from LocationService.LocationService import LocationService, SimulationClock
 from LocationService.TrackPieces import FullTrack
+from LocationService.VectorizedSimulation import VectorizedSimulation, VectorizedLocationService
 
 logger = logging.getLogger(__name__)
 
@@ -49,7 +51,10 @@ class EnvironmentManager:
 
     def __init__(self,
                  fleet_ctrl: FleetController,
-                 configuration_handler: ConfigurationHandler = ConfigurationHandler()):
+                 configuration_handler: ConfigurationHandler = ConfigurationHandler(),
+                 track_artifact_file: str | None = None,
+                 speed_profile_file: str | None = None,
+                 piece_length_file: str | None = None):
 
         self._fleet_ctrl: FleetController = fleet_ctrl
 
@@ -77,6 +82,26 @@ class EnvironmentManager:
         self._item_collision_detector: ItemCollisionDetector = ItemCollisionDetector()
         self._item_generator: ItemGenerator | None = None
 
+        # the track is parsed once and shared by all vehicles. If a file is given, the track and its tables are
+        # cached in it for the next start. The piece lengths learned by the physical cars are kept in another file
+        self._track_registry: TrackRegistry = TrackRegistry(self.config_handler, track_artifact_file,
+                                                            piece_length_file)
+
+        self._car_color_map: dict[str, list[str]] | None = None
+
+        # learned speed calibration of every physical car. If a file is given, it's kept for the next start
+        self._speed_profile_store: SpeedProfileStore = SpeedProfileStore(speed_profile_file)
+
+        # shared clock that drives the simulation of all vehicles
+        self._simulation_clock: SimulationClock = SimulationClock()
+        self._simulation_clock.add_on_tick_callback(self._item_collision_detector.check_collisions)
+
+        # amount of emulated cars that were added, used for their addresses
+        self._emulated_car_count: int = 0
+
+        # shared simulation of all virtual vehicles, if `env_vectorized_simulation` is enabled
+        self._vectorized_simulation: VectorizedSimulation | None = None
+
     def add_item_generator(self, item_generator: ItemGenerator):
         self._item_generator = item_generator
 
@@ -414,7 +439,7 @@ class EnvironmentManager:
         removes player from vehicle as soon as the playing time is up
         """
         while self.__playing_time_checking_flag:
-            await asyncio.sleep(10)
+            await get_clock().sleep(10)
 
             timeout_interval = int(self.config_handler.get_configuration()["game_config"]
                                    ["game_cfg_playing_time_limit_min"])
@@ -424,7 +449,7 @@ class EnvironmentManager:
                 if player.game_start is None:
                     logger.error("A player without game start time exists")
                     return
-                time_difference: timedelta = datetime.now() - player.game_start
+                time_difference: timedelta = get_clock().now() - player.game_start
                 if time_difference >= timedelta(minutes=timeout_interval):
                     logger.debug(f'playtime of {time_difference} for player {player.player} is over')
                     if player.player is None:
@@ -481,7 +506,7 @@ class EnvironmentManager:
             Time to wait in seconds until player is removed, in case of reconnect.
         """
         try:
-            await asyncio.sleep(grace_period)
+            await get_clock().sleep(grace_period)
             self.manage_removal_from_game_for(player_id=player,
                                               reason=RemovalReason.PLAYER_NOT_REACHABLE)
         except asyncio.CancelledError:
@@ -538,30 +563,83 @@ class EnvironmentManager:
 
             self._active_anki_cars.remove(found_vehicle)
             found_vehicle.__del__()
+            if isinstance(found_vehicle, PhysicalCar):
+                self._speed_profile_store.save()
+                self._track_registry.save_calibration()
 
             self._assign_players_to_vehicles()
             logger.debug("Updated list of active vehicles: %s", self._active_anki_cars)
             self.update_staff_ui()
             return True
 
-    async def connect_to_physical_car_by(self, uuid: str) -> None:
+    async def connect_to_physical_car_by(self, uuid: str, ble_client: BleClient | None = None) -> None:
+        """
+        Connects to a physical car and adds it to the active vehicles. If a client is given (e.g. an
+        `EmulatedAnkiCar`), it's used instead of connecting to the car with the UUID via BLE
+        """
         logger.debug(f"Adding physical vehicle with UUID {uuid}")
 
-        anki_car_controller = AnkiController()
-        location_service = PhysicalLocationService(self.get_track(), start_immediately=True)
+        environment_config = self.config_handler.get_configuration().get('environment', {})
+        anki_car_controller = AnkiController(
+            write_without_response=environment_config.get('env_ble_write_without_response', False))
+        event_driven = environment_config.get('env_event_driven_physical_cars', False)
+        location_service = PhysicalLocationService(self.get_track(), start_immediately=True,
+                                                   simulation_clock=self._simulation_clock,
+                                                   event_driven=event_driven,
+                                                   length_calibration=self._track_registry.get_length_calibration())
+        location_service.set_speed_profile(self._speed_profile_store.get_profile(uuid))
         new_vehicle = PhysicalCar(uuid, anki_car_controller, location_service)
-        await new_vehicle.initiate_connection(uuid)
+        await new_vehicle.initiate_connection(uuid, ble_client)
         # TODO: add a check if connection was successful
 
-        def item_collision(pos, rot, _): self._item_collision_detector.notify_new_vehicle_position(new_vehicle,
-                                                                                                   pos,
-                                                                                                   rot)
+        # the positions of all vehicles are checked against the items together at the end of every tick
+        def item_collision(pos, rot, _): self._item_collision_detector.queue_vehicle_position(new_vehicle, pos)
         location_service.add_on_update_callback(item_collision)
 
         new_vehicle.set_vehicle_not_reachable_callback(self.__remove_non_reachable_vehicle)
         self._add_to_active_vehicle_list(new_vehicle)
         return
 
+    async def add_emulated_cars(self, count: int, latency: float = 0.02, jitter: float = 0.01,
+                                loss: float = 0) -> list[str]:
+        """
+        Adds emulated Anki cars (see `EmulatedAnkiCar`) that drive on the current track and connects to them like to
+        physical cars. They are driven by the same simulation clock as all other vehicles, so the physical path can
+        be load tested without cars. The track needs the physical IDs of its pieces for the cars to be localised.
+
+        Parameters
+        ----------
+        count: int
+            Amount of cars to add
+        latency: float
+            Minimum delay in seconds of the commands and notifications of the cars
+        jitter: float
+            Maximum random delay in seconds that is added to the latency
+        loss: float
+            Probability that a notification is lost
+
+        Returns
+        -------
+        list[str]
+            The addresses of the added cars. Empty, if there is no track
+        """
+        # the emulator is only needed for load tests, so it isn't loaded with the environment manager
+        from VehicleManagement.EmulatedAnkiCar import EmulatedAnkiCar
+
+        track = self.get_track()
+        if track is None:
+            logger.warning("Can't add emulated cars without a track")
+            return []
+        addresses: list[str] = []
+        for _ in range(0, count):
+            self._emulated_car_count += 1
+            address = f'EE:00:00:00:{self._emulated_car_count >> 8 & 0xff:02X}:{self._emulated_car_count & 0xff:02X}'
+            car = EmulatedAnkiCar(address, track, self._simulation_clock, latency, jitter, loss,
+                                  seed=self._emulated_car_count)
+            await self.connect_to_physical_car_by(address, car)
+            addresses.append(address)
+        return addresses
+
     def __remove_non_reachable_vehicle(self, vehicle_id: str, player_id: str | None) -> None:
         """
         Callback that should be executed when a vehicle isn't reachable anymore
@@ -597,17 +675,31 @@ class EnvironmentManager:
 
         logger.debug(f"Adding virtual vehicle with name {name}")
 
-        location_service = LocationService(self.get_track(), start_immediately=True)
+        location_service = self._create_virtual_location_service()
         new_vehicle = VirtualCar(name, location_service)
 
-        def item_collision(pos, rot, _): self._item_collision_detector.notify_new_vehicle_position(new_vehicle,
-                                                                                                   pos,
-                                                                                                   rot)
+        # the positions of all vehicles are checked against the items together at the end of every tick
+        def item_collision(pos, rot, _): self._item_collision_detector.queue_vehicle_position(new_vehicle, pos)
         location_service.add_on_update_callback(item_collision)
 
         self._add_to_active_vehicle_list(new_vehicle)
         return name
 
+    def _create_virtual_location_service(self) -> LocationService:
+        """
+        Creates the location service of a virtual vehicle. If `env_vectorized_simulation` is enabled in the
+        environment configuration, all virtual vehicles are simulated together by a `VectorizedSimulation`
+        """
+        track = self.get_track()
+        environment_config = self.config_handler.get_configuration().get('environment', {})
+        if not environment_config.get('env_vectorized_simulation', False) or track is None:
+            return LocationService(track, start_immediately=True, simulation_clock=self._simulation_clock)
+        if self._vectorized_simulation is None:
+            self._vectorized_simulation = VectorizedSimulation(track, simulation_clock=self._simulation_clock)
+        else:
+            self._vectorized_simulation.notify_new_track(track)
+        return VectorizedLocationService(self._vectorized_simulation, start_immediately=True)
+
     def _add_to_active_vehicle_list(self, new_vehicle: Vehicle) -> None:
         vehicle_already_exists = self.get_vehicle_by_vehicle_id(new_vehicle.get_vehicle_id()) is not None
         if vehicle_already_exists:
@@ -683,37 +775,44 @@ class EnvironmentManager:
         return None
 
     def get_car_color_map(self) -> dict[str, list[str]]:
-        colors = ["#F93822", "#DAA03D", "#E69A8D", "#42EADD", "#00203F", "#D6ED17", "#2C5F2D", "#101820"]
-        full_map: dict[str, list[str]] = {}
-        num = 1
-        for c in colors:
-            for d in colors:
-                # disallow same inner and outer color to preserve a contrast
-                if c != d:
-                    full_map.update({f"Virtual Vehicle {num}": [d, c]})
-                    num += 1
-        return full_map
+        """
+        Get the colors used to draw virtual vehicles without a picture. The map never changes, so it's only built
+        once and the same dictionary is returned every time. It must not be modified
+        """
+        if self._car_color_map is None:
+            colors = ["#F93822", "#DAA03D", "#E69A8D", "#42EADD", "#00203F", "#D6ED17", "#2C5F2D", "#101820"]
+            full_map: dict[str, list[str]] = {}
+            num = 1
+            for c in colors:
+                for d in colors:
+                    # disallow same inner and outer color to preserve a contrast
+                    if c != d:
+                        full_map.update({f"Virtual Vehicle {num}": [d, c]})
+                        num += 1
+            self._car_color_map = full_map
+        return self._car_color_map
 
     # racetrack management
     def get_track(self) -> FullTrack | None:
         """
-        Get the used track in the simulation
+        Get the used track in the simulation. The same object is returned until another track is stored with
+        `notify_new_track`
         """
-        track = self.config_handler.get_configuration().get('track')
-        if track is None:
-            return None
-        try:
-            full_track = parse_list_of_dicts_to_full_track(track)
-            return full_track
-        except PieceDecodingException as e:
-            logger.error("Couldn't parse track from config: %s", e)
-        return None
+        return self._track_registry.get_track()
+
+    def get_track_version(self) -> int:
+        """
+        Get the version of the used track. It's increased every time the track changes
+        """
+        return self._track_registry.get_version()
 
     def notify_new_track(self, new_track: FullTrack) -> None:
-        track_config = {'track': full_track_to_list_of_dicts(new_track)}
-        self.config_handler.write_configuration(new_config=track_config)
+        self._track_registry.store_track(new_track)
+        length_calibration = self._track_registry.get_length_calibration()
         for car in self.get_vehicle_list():
             car.notify_new_track(new_track)
+            if isinstance(car, PhysicalCar):
+                car.set_length_calibration(length_calibration)
         if self._item_generator is None:
             logger.critical("EnvironmentManager has no Item Generator!")
             return
@@ -743,5 +842,15 @@ class EnvironmentManager:
         self.notify_new_track(new_track)
         return None
 
+    def get_ble_latency_estimates(self) -> dict[str, float]:
+        """
+        Gets the estimated latency in seconds of the BLE notifications of every connected physical car
+        """
+        return {vehicle.vehicle_id: vehicle.get_ble_latency() for vehicle in self._active_anki_cars
+                if isinstance(vehicle, PhysicalCar)}
+
     def get_item_collision_detector(self) -> ItemCollisionDetector:
         return self._item_collision_detector
+
+    def get_simulation_clock(self) -> SimulationClock:
+        return self._simulation_clock
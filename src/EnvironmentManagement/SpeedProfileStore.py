@@ -0,0 +1,91 @@
+# Copyright 2024 IAV GmbH
+#
+# This file is part of the IAV Distortion project an interactive
+# and educational showcase designed to demonstrate the need
+# of automotive cybersecurity in a playful, engaging manner.
+# and is released under the "Apache 2.0". Please see the LICENSE
+# file that should have been included as part of this package.
+#
+import logging
+from typing import Any
+
+from EnvironmentManagement.ThrottledJsonFile import ThrottledJsonFile
+from LocationService.SpeedProfile import SpeedProfile
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION: int = 1
+
+
+class SpeedProfileStore:
+    """
+    Keeps the speed profiles of all physical cars by their MAC address, so a car that connects again starts with
+    what was learned about it before. The profiles are stored in a JSON file. While cars are driving the file is
+    written at most once per `save_interval`, since the profiles are updated on every transition event.
+    """
+
+    def __init__(self, file: str | None = None, save_interval: float = 30):
+        """
+        Parameters
+        ----------
+        file: str | None
+            JSON file the profiles are stored in. If None, the profiles are only kept while the program runs
+        save_interval: float
+            Minimum time in seconds between two automatic saves
+        """
+        self._file: ThrottledJsonFile = ThrottledJsonFile(file, 'speed profiles', self._get_content, save_interval)
+        self._profiles: dict[str, SpeedProfile] = dict()
+        self._load()
+
+    def get_profile(self, mac_address: str) -> SpeedProfile:
+        """
+        Gets the profile of a car. If nothing is known about the car yet, an empty profile is created. The same
+        profile object is returned for the same car, so updates by one user are seen by all
+        """
+        key = mac_address.upper()
+        profile = self._profiles.get(key)
+        if profile is None:
+            profile = SpeedProfile()
+            self._add(key, profile)
+        return profile
+
+    def save(self) -> None:
+        """
+        Writes all profiles to the file, if there were changes since the last time
+        """
+        self._file.save()
+
+    def _get_content(self) -> dict[str, Any]:
+        return {'format_version': FORMAT_VERSION,
+                'profiles': {key: profile.to_dict() for key, profile in self._profiles.items()}}
+
+    def _add(self, key: str, profile: SpeedProfile) -> None:
+        self._profiles[key] = profile
+        profile.add_on_update_callback(self._on_profile_update)
+
+    def _on_profile_update(self, _: SpeedProfile) -> None:
+        """
+        Saves the profiles, if the last save was long enough ago
+        """
+        self._file.on_change()
+
+    def _load(self) -> None:
+        """
+        Reads the profiles from the file. A missing or invalid file results in no profiles
+        """
+        content = self._file.read()
+        if content is None:
+            return
+
+        try:
+            if content['format_version'] != FORMAT_VERSION:
+                logger.info("The speed profiles in %s have an unsupported format. Ignoring them", self._file.get_file())
+                return
+            profiles = {key.upper(): SpeedProfile.from_dict(profile_dict)
+                        for key, profile_dict in content['profiles'].items()}
+        except (ValueError, TypeError, KeyError, IndexError, AttributeError) as e:
+            logger.warning("The speed profiles in %s are damaged. Ignoring them: %s", self._file.get_file(), e)
+            return
+        for key, profile in profiles.items():
+            self._add(key, profile)
+        logger.debug("Loaded the speed profiles of %d cars", len(profiles))
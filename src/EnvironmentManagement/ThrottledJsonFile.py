@@ -0,0 +1,99 @@
+# Copyright 2024 IAV GmbH
+#
+# This file is part of the IAV Distortion project an interactive
+# and educational showcase designed to demonstrate the need
+# of automotive cybersecurity in a playful, engaging manner.
+# and is released under the "Apache 2.0". Please see the LICENSE
+# file that should have been included as part of this package.
+#
+import json
+import logging
+import os
+from typing import Any, Callable
+
+from EnvironmentManagement.Clock import get_clock
+
+logger = logging.getLogger(__name__)
+
+
+class ThrottledJsonFile:
+    """
+    JSON file for values that are learned while cars are driving. Since they are updated on every transition event,
+    the file is written at most once per `save_interval` after a change. It's replaced atomically, so a reader never
+    sees a partially written file.
+    """
+
+    def __init__(self, file: str | None, description: str, get_content: Callable[[], dict[str, Any] | None],
+                 save_interval: float = 30):
+        """
+        Parameters
+        ----------
+        file: str | None
+            JSON file the values are stored in. If None, nothing is read or written
+        description: str
+            Description of the values for the log (e.g. "speed profiles")
+        get_content: Callable[[], dict[str, Any] | None]
+            Function that gets the content to write. If it returns None, nothing is written
+        save_interval: float
+            Minimum time in seconds between two automatic saves
+        """
+        self._file: str | None = file
+        self._description: str = description
+        self._get_content: Callable[[], dict[str, Any] | None] = get_content
+        self._save_interval: float = save_interval
+        self._last_save: float | None = None
+        self._unsaved_changes: bool = False
+
+    def get_file(self) -> str | None:
+        """
+        Gets the path of the file or None, if nothing is stored
+        """
+        return self._file
+
+    def read(self) -> Any | None:
+        """
+        Reads the content of the file. Returns None, if there is no file or it can't be read
+        """
+        if self._file is None:
+            return None
+        try:
+            with open(self._file, 'r') as input_file:
+                return json.load(input_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Couldn't read the %s from %s: %s", self._description, self._file, e)
+            return None
+
+    def on_change(self) -> None:
+        """
+        Marks the values as changed and saves them, if the last save was long enough ago
+        """
+        self._unsaved_changes = True
+        if self._last_save is None or get_clock().time() - self._last_save >= self._save_interval:
+            self.save()
+
+    def discard_changes(self) -> None:
+        """
+        Forgets that the values changed, e.g. because other values are stored from now on
+        """
+        self._unsaved_changes = False
+
+    def save(self) -> None:
+        """
+        Writes the content to the file, if there were changes since the last time
+        """
+        self._last_save = get_clock().time()
+        if self._file is None or not self._unsaved_changes:
+            return
+        content = self._get_content()
+        if content is None:
+            return
+        temporary_file = self._file + '.tmp'
+        try:
+            with open(temporary_file, 'w') as output:
+                json.dump(content, output, indent=2)
+            os.replace(temporary_file, self._file)
+            self._unsaved_changes = False
+        except OSError as e:
+            logger.warning("Couldn't write the %s to %s: %s", self._description, self._file, e)
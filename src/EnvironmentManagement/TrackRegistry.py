@@ -0,0 +1,206 @@
+# Copyright 2024 IAV GmbH
+#
+# This file is part of the IAV Distortion project an interactive
+# and educational showcase designed to demonstrate the need
+# of automotive cybersecurity in a playful, engaging manner.
+# and is released under the "Apache 2.0". Please see the LICENSE
+# file that should have been included as part of this package.
+#
+import logging
+from typing import Any, Tuple
+
+from EnvironmentManagement.ConfigurationHandler import ConfigurationHandler
+from EnvironmentManagement.ThrottledJsonFile import ThrottledJsonFile
+from LocationService.PieceLengthCalibration import PieceLengthCalibration
+from LocationService.Track import FullTrack
+from LocationService.TrackArtifact import get_track_checksum, load_track_artifact, write_track_artifact
+from LocationService.TrackSerialization import parse_list_of_dicts_to_full_track, PieceDecodingException, \
+    full_track_to_list_of_dicts
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_FORMAT_VERSION: int = 1
+
+
+class TrackRegistry:
+    """
+    Holds the track of the configuration. The track is only parsed once and the same FullTrack object is handed out
+    to all vehicles, the UI and the item generation. A FullTrack doesn't change after it's built, so it can safely
+    be shared. Every time another track is stored, the version number is increased, so users of the track can
+    detect the change (e.g. to invalidate caches).
+
+    If an artifact file is given, the track and the expensive tables calculated for it (like the baked track) are
+    cached in this file (see `TrackArtifact`), so they don't need to be calculated again on the next start.
+
+    The registry also holds the effective piece lengths learned by the physical cars for the current track (see
+    `PieceLengthCalibration`), so the track itself stays unchanged. If a calibration file is given, they are stored in
+    it together with the checksum of the track. They are written at most once per `save_interval` while they are
+    learned and only loaded again for the same track.
+    """
+
+    def __init__(self, configuration_handler: ConfigurationHandler, artifact_file: str | None = None,
+                 calibration_file: str | None = None, save_interval: float = 30):
+        self._config_handler: ConfigurationHandler = configuration_handler
+        self._artifact_file: str | None = artifact_file
+        self._calibration_file: ThrottledJsonFile = ThrottledJsonFile(calibration_file, 'piece length calibration',
+                                                                      self._get_calibration_content, save_interval)
+        # checksum of the current track as hex string. None, if it's unknown
+        self._checksum: str | None = None
+        self._track: FullTrack | None = None
+        # learned piece lengths of the current track
+        self._length_calibration: PieceLengthCalibration = PieceLengthCalibration()
+        self._version: int = 0
+        # the list from the configuration the current track was parsed from
+        self._source: list[dict[str, Any]] | None = None
+        self._parsed: bool = False
+
+    def get_track(self) -> FullTrack | None:
+        """
+        Gets the track of the configuration or None, if the configuration doesn't contain a valid track
+        """
+        return self.get_versioned_track()[1]
+
+    def get_length_calibration(self) -> PieceLengthCalibration:
+        """
+        Gets the effective piece lengths of the current track, which are shared by all physical cars. A new
+        calibration is used every time the track changes
+        """
+        self.get_versioned_track()
+        return self._length_calibration
+
+    def get_version(self) -> int:
+        """
+        Gets the version of the current track. It's increased every time the track changes
+        """
+        return self.get_versioned_track()[0]
+
+    def get_versioned_track(self) -> Tuple[int, FullTrack | None]:
+        """
+        Gets the version of the current track and the track itself. The track is only parsed again, if the track
+        in the configuration changed
+        """
+        source = self._config_handler.get_configuration().get('track')
+        # the configuration is only read again after something was written to it, so the same list is returned
+        # until then. If anything else was written, the track list is still equal
+        if self._parsed and (source is self._source or source == self._source):
+            self._source = source
+            return self._version, self._track
+
+        track: FullTrack | None = None
+        if source is not None:
+            track = self._load_artifact(source)
+        if source is not None and track is None:
+            try:
+                track = parse_list_of_dicts_to_full_track(source)
+            except PieceDecodingException as e:
+                logger.error("Couldn't parse track from config: %s", e)
+            if track is not None:
+                self._write_artifact(track)
+        self._replace(track, source)
+        return self._version, self._track
+
+    def store_track(self, new_track: FullTrack) -> int:
+        """
+        Writes a new track to the configuration and hands it out from now on
+
+        Returns
+        -------
+        int
+            The version of the new track
+        """
+        track_list = full_track_to_list_of_dicts(new_track)
+        self._config_handler.write_configuration(new_config={'track': track_list})
+        self._write_artifact(new_track)
+        self._replace(new_track, track_list)
+        return self._version
+
+    def _replace(self, track: FullTrack | None, source: list[dict[str, Any]] | None) -> None:
+        """
+        Replaces the current track and increases the version
+        """
+        # the learned lengths of the old track are kept for the case that it's used again
+        self.save_calibration()
+        self._track = track
+        self._source = source
+        self._parsed = True
+        self._version += 1
+        logger.debug("Using track version %d", self._version)
+        self._checksum = None
+        self._length_calibration = PieceLengthCalibration()
+        self._calibration_file.discard_changes()
+        if track is None or self._calibration_file.get_file() is None:
+            return
+        try:
+            self._checksum = get_track_checksum(source).hex()
+        except (TypeError, ValueError) as e:
+            logger.error("Couldn't calculate the checksum of the track from config: %s", e)
+        calibration = self._load_calibration()
+        if calibration is not None:
+            self._length_calibration = calibration
+        self._length_calibration.add_on_update_callback(self._on_calibration_update)
+
+    def _load_artifact(self, source: list[dict[str, Any]]) -> FullTrack | None:
+        """
+        Loads the track from the artifact file, if it matches the track of the configuration
+        """
+        if self._artifact_file is None:
+            return None
+        try:
+            checksum = get_track_checksum(source)
+        except (TypeError, ValueError) as e:
+            logger.error("Couldn't calculate the checksum of the track from config: %s", e)
+            return None
+        return load_track_artifact(self._artifact_file, checksum)
+
+    def _write_artifact(self, track: FullTrack) -> None:
+        """
+        Writes the track to the artifact file. Failing to do so only slows down the next start
+        """
+        if self._artifact_file is None:
+            return
+        try:
+            write_track_artifact(self._artifact_file, track)
+        except OSError as e:
+            logger.warning("Couldn't write the track artifact %s: %s", self._artifact_file, e)
+
+    def save_calibration(self) -> None:
+        """
+        Writes the learned piece lengths of the current track to the calibration file, if they changed
+        """
+        self._calibration_file.save()
+
+    def _get_calibration_content(self) -> dict[str, Any] | None:
+        if self._checksum is None or self._track is None:
+            return None
+        return {'format_version': CALIBRATION_FORMAT_VERSION,
+                'checksum': self._checksum,
+                'pieces': self._length_calibration.to_dict()}
+
+    def _on_calibration_update(self, calibration: PieceLengthCalibration) -> None:
+        """
+        Saves the calibration, if the last save was long enough ago
+        """
+        if self._track is None or calibration is not self._length_calibration:
+            return
+        self._calibration_file.on_change()
+
+    def _load_calibration(self) -> PieceLengthCalibration | None:
+        """
+        Reads the learned piece lengths from the calibration file, if they were learned for the current track
+        """
+        if self._checksum is None:
+            return None
+        content = self._calibration_file.read()
+        if content is None:
+            return None
+
+        try:
+            if content['format_version'] != CALIBRATION_FORMAT_VERSION or content['checksum'] != self._checksum:
+                logger.info("The piece length calibration in %s is for another track. Ignoring it",
+                            self._calibration_file.get_file())
+                return None
+            return PieceLengthCalibration.from_dict(content['pieces'])
+        except (ValueError, TypeError, KeyError, IndexError, AttributeError) as e:
+            logger.warning("The piece length calibration in %s is damaged. Ignoring it: %s",
+                           self._calibration_file.get_file(), e)
+            return None
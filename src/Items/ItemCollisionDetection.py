@@ -3,26 +3,90 @@ from typing import Callable
 from DataModel.Vehicle import Vehicle
 from EnvironmentManagement.ConfigurationHandler import ConfigurationHandler
 from Items.Item import Item
-from LocationService.Trigo import Position, Angle
+from LocationService.Trigo import Position, Angle, is_batch_geometry_available, pairwise_distances, \
+    positions_to_array
 
 
 class ItemCollisionDetector:
+    # distance in mm between a vehicle and an item at which the item is collected
+    _COLLECTION_DISTANCE: float = 40
+
     def __init__(self,
                  configuration_handler: ConfigurationHandler = ConfigurationHandler()) -> None:
 
         self.config_handler: ConfigurationHandler = configuration_handler
         self._items: list[Item] = []
         self._on_item_change: Callable[[list[Item]], None] | None = None
+
+        # vehicle positions collected during a simulation tick, that are checked together in check_collisions
+        self._queued_vehicles: list[Vehicle] = []
+        self._queued_positions: list[Position] = []
         return
 
     def notify_new_vehicle_position(self, vehicle: Vehicle, vehicle_position: Position, vehicle_rotation: Angle):
-        for item in self._items:
-            if item.get_position() is None:
-                continue
-            if item.get_position().distance_to(vehicle_position) < 40:
+        self._collect_items_near(vehicle, vehicle_position.get_x(), vehicle_position.get_y())
+
+    def _collect_items_near(self, vehicle: Vehicle, x: float, y: float) -> None:
+        # iterate backwards, so collected items can be removed while iterating
+        for i in range(len(self._items) - 1, -1, -1):
+            item = self._items[i]
+            item_position = item.get_position()
+            if item_position is not None and item_position.distance_to_xy(x, y) < self._COLLECTION_DISTANCE:
                 vehicle.notify_item_collected(item)
                 self.remove_item(item)
 
+    def notify_new_vehicle_positions(self, vehicles: list[Vehicle], vehicle_positions: list[Position]) -> None:
+        """
+        Checks all vehicles against all items in one call. The vehicles are handled in the given order, so an item
+        that is in reach of multiple vehicles is collected by the first one. Uses the batch geometry of Trigo if
+        numpy is installed.
+
+        Parameters
+        ----------
+        vehicles: list[Vehicle]
+            Vehicles to check
+        vehicle_positions: list[Position]
+            Position of every vehicle in the same order as the vehicles
+        """
+        if len(vehicles) == 0 or len(self._items) == 0:
+            return
+        if not is_batch_geometry_available():
+            for vehicle, position in zip(vehicles, vehicle_positions):
+                self._collect_items_near(vehicle, position.get_x(), position.get_y())
+            return
+
+        items = [item for item in self._items if item.get_position() is not None]
+        if len(items) == 0:
+            return
+        distances = pairwise_distances(positions_to_array(vehicle_positions),
+                                       positions_to_array([item.get_position() for item in items]))
+        vehicle_indices, item_indices = (distances < self._COLLECTION_DISTANCE).nonzero()
+        collected: set[int] = set()
+        for vehicle_index, item_index in zip(vehicle_indices, item_indices):
+            if item_index in collected:
+                continue
+            collected.add(item_index)
+            vehicles[vehicle_index].notify_item_collected(items[item_index])
+            self.remove_item(items[item_index])
+
+    def queue_vehicle_position(self, vehicle: Vehicle, vehicle_position: Position) -> None:
+        """
+        Remembers the position of a vehicle to check it together with all other vehicles in `check_collisions`
+        """
+        self._queued_vehicles.append(vehicle)
+        self._queued_positions.append(vehicle_position)
+
+    def check_collisions(self) -> None:
+        """
+        Checks all queued vehicle positions against all items and clears the queue. Meant to be called once per
+        simulation tick
+        """
+        vehicles = self._queued_vehicles
+        positions = self._queued_positions
+        self._queued_vehicles = []
+        self._queued_positions = []
+        self.notify_new_vehicle_positions(vehicles, positions)
+
     def set_on_item_change_callback(self, callback: Callable[[list[Item]], None]):
         self._on_item_change = callback
 
@@ -3,6 +3,7 @@ from asyncio import Task
 from typing import Any
 
 from DataModel.Effects.HackingProtection import HackingProtection
+from EnvironmentManagement.Clock import get_clock
 from EnvironmentManagement.ConfigurationHandler import ConfigurationHandler
 from Items.Item import Item
 from Items.ItemCollisionDetection import ItemCollisionDetector
@@ -41,5 +42,5 @@ class ItemGenerator:
         except KeyError:
             interval_time = 30
         while True:
-            await asyncio.sleep(interval_time)
+            await get_clock().sleep(interval_time)
             self._item_collision_detection.add_item(self.generate_item())
@@ -0,0 +1,247 @@
+import math
+from array import array
+from typing import TYPE_CHECKING, Any, Sequence, Tuple
+
+import Constants
+from LocationService.Trigo import Position, Angle
+
+if TYPE_CHECKING:
+    from LocationService.Track import FullTrack, TrackPiece
+
+# resolution in mm that is used if no other one is requested
+DEFAULT_RESOLUTION: float = 10
+# amount of lanes on the track. They are evenly distributed around the center of the track
+LANE_COUNT: int = 7
+# distance in mm used to calculate the direction of the track at a sample point
+_HEADING_EPSILON: float = 0.01
+
+
+class BakedTrack:
+    """
+    Precalculated representation of a track that allows looking up positions instead of calculating them. Every
+    piece is sampled at evenly spaced fractions of its length for every lane. The samples of all pieces and lanes
+    are stored in flat arrays and positions in between are linearly interpolated. The direction of the track is
+    stored once per segment.
+
+    At a fixed fraction of a piece the position is linear in the offset (for straight pieces as well as for curves),
+    so the interpolation between two lanes is exact and offsets between the lanes (e.g. while changing lanes) don't
+    need any extra samples. The only error is caused by the interpolation along the piece, which is limited by
+    `get_error_bound`. The error of the direction is limited by `get_heading_error_bound`.
+    """
+
+    def __init__(self, track: 'FullTrack', resolution: float = DEFAULT_RESOLUTION,
+                 tables: dict[str, Any] | None = None):
+        """
+        Bakes the track
+
+        Parameters
+        ----------
+        track: FullTrack
+            Track to bake. It must not be changed afterwards
+        resolution: float
+            Maximum distance in mm between two samples on the outermost lane. Smaller values reduce the error and
+            increase the memory usage
+        tables: dict[str, Any] | None
+            Tables of a previous bake of the same track with the same resolution as returned by `get_tables`. If
+            given, they are used instead of sampling the track again
+        """
+        if resolution <= 0:
+            raise ValueError(f"The resolution has to be positive but is {resolution}")
+        self._track: 'FullTrack' = track
+        self._resolution: float = resolution
+        self._lane_width: float = Constants.TRACK_LANE_WIDTH
+        self._first_lane_offset: float = -self._lane_width * (LANE_COUNT // 2)
+
+        # number of segments of every piece. Every lane of a piece has one sample more than segments
+        self._segment_counts: Sequence[int] = array('l')
+        # positions of all samples. The lanes of a piece are stored one after another
+        self._x: Sequence[float] = array('d')
+        self._y: Sequence[float] = array('d')
+        # direction of the track in the default driving direction at the center of every segment
+        self._headings: Sequence[float] = array('d')
+        self._error_bound: float = 0
+        self._heading_error_bound: float = 0
+        if tables is None:
+            self._bake()
+        else:
+            self._segment_counts = tables['segment_counts']
+            self._x = tables['x']
+            self._y = tables['y']
+            self._headings = tables['headings']
+            self._error_bound = tables['error_bound']
+            self._heading_error_bound = tables['heading_error_bound']
+            if len(self._segment_counts) != track.get_len():
+                raise ValueError("The tables don't match the track")
+
+        # index of the first sample of a piece in _x and _y and of the first segment in the lists of angles
+        self._sample_start: array = array('l')
+        self._angle_start: array = array('l')
+        # the length of every piece is base + slope * offset (see `FullTrack`)
+        self._length_base: array = array('d')
+        self._length_slope: array = array('d')
+        sample_count = 0
+        segment_count = 0
+        for index, segments in enumerate(self._segment_counts):
+            self._sample_start.append(sample_count)
+            self._angle_start.append(segment_count)
+            sample_count += (segments + 1) * LANE_COUNT
+            segment_count += segments
+            length = track.get_piece_length(index, 0)
+            self._length_base.append(length)
+            self._length_slope.append(track.get_piece_length(index, 1) - length)
+        if sample_count != len(self._x) or sample_count != len(self._y) or segment_count != len(self._headings):
+            raise ValueError("The tables don't match the track")
+
+        # Angles are immutable, so the same objects can be handed out for every position. Segments with the same
+        # direction (e.g. on straight pieces) share their objects
+        known_angles: dict[float, Tuple[Angle, Angle]] = dict()
+        self._angles: list[Angle] = list()
+        self._reversed_angles: list[Angle] = list()
+        for heading in self._headings:
+            angles = known_angles.get(heading)
+            if angles is None:
+                angles = (Angle(heading), Angle((heading + 180) % 360))
+                known_angles[heading] = angles
+            self._angles.append(angles[0])
+            self._reversed_angles.append(angles[1])
+
+    def _bake(self) -> None:
+        """
+        Samples all pieces of the track
+        """
+        track = self._track
+        lane_offsets = [self._first_lane_offset + self._lane_width * lane for lane in range(0, LANE_COUNT)]
+        for index in range(0, track.get_len()):
+            piece, global_offset = track.get_entry_tupel(index)
+            length = track.get_piece_length(index, 0)
+            max_length = max(track.get_piece_length(index, lane_offset) for lane_offset in lane_offsets)
+            segments = max(1, math.ceil(max_length / self._resolution))
+            self._segment_counts.append(segments)
+
+            for lane_offset in lane_offsets:
+                lane_length = track.get_piece_length(index, lane_offset)
+                for sample in range(0, segments + 1):
+                    x, y = piece.get_position_xy(lane_length * sample / segments, lane_offset)
+                    self._x.append(x + global_offset.get_x())
+                    self._y.append(y + global_offset.get_y())
+
+            headings = [self._get_heading(piece, length * sample / (segments * 2), length)
+                        for sample in range(0, segments * 2 + 1)]
+            for segment in range(0, segments):
+                # headings at the start, the center and the end of the segment
+                start, center, end = headings[segment * 2:segment * 2 + 3]
+                self._headings.append(center)
+                change = abs((end - start + 180) % 360 - 180)
+                # the error of a linear interpolation is at most h^2/8 * curvature. The curvature of the segment is
+                # its change of direction divided by its length h, so the error is at most h * change / 8
+                self._error_bound = max(self._error_bound, max_length / segments * math.radians(change) / 8)
+                self._heading_error_bound = max(self._heading_error_bound, change / 2)
+
+    @staticmethod
+    def _get_heading(piece: 'TrackPiece', progress: float, length: float) -> float:
+        """
+        Calculates the direction of the track in the default driving direction at the given progress of the
+        center lane
+        """
+        epsilon = min(_HEADING_EPSILON, length / 2)
+        before = Position(*piece.get_position_xy(max(progress - epsilon, 0), 0))
+        return before.calculate_angle_deg_to_xy(*piece.get_position_xy(min(progress + epsilon, length), 0))
+
+    def get_resolution(self) -> float:
+        """
+        Gets the maximum distance in mm between two samples on the outermost lane
+        """
+        return self._resolution
+
+    def get_sample_count(self) -> int:
+        """
+        Gets the number of stored samples of all pieces and lanes
+        """
+        return len(self._x)
+
+    def get_tables(self) -> dict[str, Any]:
+        """
+        Gets the sampled data, so the track doesn't need to be baked again (see the argument `tables` of the
+        constructor)
+        """
+        return {
+            'segment_counts': self._segment_counts,
+            'x': self._x,
+            'y': self._y,
+            'headings': self._headings,
+            'error_bound': self._error_bound,
+            'heading_error_bound': self._heading_error_bound}
+
+    def get_error_bound(self) -> float:
+        """
+        Gets the maximum distance in mm between an interpolated position and the exact position for offsets
+        between the outermost lanes. Extrapolated offsets can have a slightly bigger error
+        """
+        return self._error_bound
+
+    def get_heading_error_bound(self) -> float:
+        """
+        Gets the maximum difference in degree between the looked up direction and the exact direction of the track
+        """
+        return self._heading_error_bound
+
+    def get_position_xy(self, index: int, progress: float, offset: float) -> Tuple[float, float]:
+        """
+        Gets the global position on the track like `TrackPiece.get_position_xy` plus the global offset of the piece
+        """
+        x, y, _ = self.get_pose(index, progress, offset)
+        return x, y
+
+    def get_pose(self, index: int, progress: float, offset: float,
+                 reverse: bool = False) -> Tuple[float, float, Angle]:
+        """
+        Gets the global position and the direction of the track for the given piece, progress on the piece and
+        offset. The position is interpolated and the direction is the one of the segment the position is on
+
+        Parameters
+        ----------
+        index: int
+            Index of the piece in the track
+        progress: float
+            Progress on the piece in mm for the given offset
+        offset: float
+            Offset from the center of the track. Offsets outside the outermost lanes are extrapolated, which is
+            exact like the interpolation between the lanes
+        reverse: bool
+            Whether the direction should be the opposing driving direction instead of the default one
+
+        Returns
+        -------
+        Tuple[float, float, Angle]
+            x, y and the direction of the track. The Angle objects are shared
+        """
+        segments = self._segment_counts[index]
+        position = progress / (self._length_base[index] + self._length_slope[index] * offset) * segments
+        segment = int(position)
+        if segment >= segments:
+            segment = segments - 1
+        elif segment < 0:
+            segment = 0
+        fraction = position - segment
+
+        lane_position = (offset - self._first_lane_offset) / self._lane_width
+        lane = int(lane_position)
+        if lane >= LANE_COUNT - 1:
+            lane = LANE_COUNT - 2
+        elif lane < 0:
+            lane = 0
+        lane_fraction = lane_position - lane
+
+        first = self._sample_start[index] + lane * (segments + 1) + segment
+        second = first + segments + 1
+        xs = self._x
+        ys = self._y
+        x_first = xs[first] + (xs[first + 1] - xs[first]) * fraction
+        x_second = xs[second] + (xs[second + 1] - xs[second]) * fraction
+        y_first = ys[first] + (ys[first + 1] - ys[first]) * fraction
+        y_second = ys[second] + (ys[second + 1] - ys[second]) * fraction
+
+        angles = self._reversed_angles if reverse else self._angles
+        return (x_first + (x_second - x_first) * lane_fraction,
+                y_first + (y_second - y_first) * lane_fraction,
+                angles[self._angle_start[index] + segment])
@@ -0,0 +1,146 @@
+import math
+from typing import Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy is optional and only needed for the batch functions at the end of this module
+    np = None
+
+
+def integrate_speed(speed: float, target_speed: float, acceleration: float, duration: float) -> Tuple[float, float]:
+    """
+    Changes the speed towards the target speed with a constant acceleration for the given time. The result is exact
+    for every duration, so one long step gives the same result as many short ones
+
+    Parameters
+    ----------
+    speed: float
+        Speed in mm/s at the start
+    target_speed: float
+        Speed in mm/s that is approached
+    acceleration: float
+        Absolute acceleration in mm/s^2 that is used until the target speed is reached
+    duration: float
+        Time in seconds
+
+    Returns
+    -------
+    Tuple[float, float]
+        The speed at the end and the distance in mm that was driven
+    """
+    difference = target_speed - speed
+    if difference == 0 or acceleration <= 0:
+        return speed, speed * duration
+    time_to_target = abs(difference) / acceleration
+    if time_to_target <= duration:
+        # accelerate until the target speed is reached and keep it afterwards
+        return target_speed, (speed + target_speed) / 2 * time_to_target + target_speed * (duration - time_to_target)
+    new_speed = speed + math.copysign(acceleration * duration, difference)
+    return new_speed, (speed + new_speed) / 2 * duration
+
+
+def integrate_lane_change(offset: float, target_offset: float, distance: float, rate: float) \
+        -> Tuple[float, float, float]:
+    """
+    Moves the offset towards the target offset while driving the given distance. During a lane change the car moves
+    `rate` mm sideways per mm it drives, so it moves `sqrt(1 - rate^2)` mm along the track. The result is exact for
+    every distance, so one long step gives the same result as many short ones
+
+    Parameters
+    ----------
+    offset: float
+        Offset in mm at the start
+    target_offset: float
+        Offset in mm that is approached
+    distance: float
+        Distance in mm the car drives
+    rate: float
+        Distance the car moves sideways per driven distance during a lane change. Between 0 and 1
+
+    Returns
+    -------
+    Tuple[float, float, float]
+        The offset at the end, the distance along the track during the lane change and the distance along the track
+        after it
+    """
+    needed_offset = abs(target_offset - offset)
+    if needed_offset == 0 or rate <= 0:
+        return offset, 0, distance
+    distance_to_target = needed_offset / rate
+    if distance_to_target <= distance:
+        return target_offset, distance_to_target * math.sqrt(1 - rate * rate), distance - distance_to_target
+    new_offset = offset + math.copysign(rate * distance, target_offset - offset)
+    return new_offset, distance * math.sqrt(1 - rate * rate), 0
+
+
+def get_length_mean_factor(old_length: float, new_length: float) -> float:
+    """
+    Gets the factor that converts a distance driven while the length of a piece changed linearly from old_length to
+    new_length (e.g. while changing lanes on a curve) to the equivalent distance on the piece with new_length.
+
+    The progress on a piece is proportional to the driven distance divided by the length of the piece for the current
+    offset. Integrating this while the length changes linearly results in the logarithmic mean of both lengths
+    """
+    if old_length <= 0 or new_length <= 0 or math.isclose(old_length, new_length):
+        return 1
+    logarithmic_mean = (new_length - old_length) / math.log(new_length / old_length)
+    return new_length / logarithmic_mean
+
+
+# ---------------------------------------------------------------------------------------------------------------
+# Batch versions over numpy arrays with one value per car, e.g. for the `VectorizedSimulation`. The results match the
+# scalar functions above.
+# ---------------------------------------------------------------------------------------------------------------
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("The batch kinematics functions require numpy to be installed")
+
+
+def integrate_speed_batch(speed: 'np.ndarray', target_speed: 'np.ndarray', acceleration: 'np.ndarray',
+                          duration: float) -> Tuple['np.ndarray', 'np.ndarray']:
+    """
+    Same as `integrate_speed` for arrays of speeds, target speeds and accelerations. Returns the speeds at the end
+    and the driven distances
+    """
+    _require_numpy()
+    difference = target_speed - speed
+    changing = (difference != 0) & (acceleration > 0)
+    time_to_target = np.abs(difference) / np.where(changing, acceleration, 1)
+    reaches_target = changing & (time_to_target <= duration)
+    new_speed = np.where(reaches_target, target_speed,
+                         np.where(changing, speed + np.copysign(acceleration * duration, difference), speed))
+    distance = np.where(reaches_target,
+                        (speed + new_speed) / 2 * time_to_target + new_speed * (duration - time_to_target),
+                        (speed + new_speed) / 2 * duration)
+    return new_speed, distance
+
+
+def integrate_lane_change_batch(offset: 'np.ndarray', target_offset: 'np.ndarray', distance: 'np.ndarray',
+                                rate: float) -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray']:
+    """
+    Same as `integrate_lane_change` for arrays of offsets, target offsets and distances. Returns the offsets at the
+    end, the distances along the track during the lane changes and the distances along the track after them
+    """
+    _require_numpy()
+    if rate <= 0:
+        return offset.copy(), np.zeros_like(distance), distance.copy()
+    difference = target_offset - offset
+    distance_to_target = np.abs(difference) / rate
+    reaches_target = distance_to_target <= distance
+    changing_distance = np.where(reaches_target, distance_to_target, distance)
+    new_offset = np.where(reaches_target, target_offset, offset + np.copysign(rate * distance, difference))
+    return new_offset, changing_distance * math.sqrt(1 - rate * rate), distance - changing_distance
+
+
+def get_length_mean_factor_batch(old_length: 'np.ndarray', new_length: 'np.ndarray') -> 'np.ndarray':
+    """
+    Same as `get_length_mean_factor` for arrays of old and new lengths
+    """
+    _require_numpy()
+    # same tolerance as math.isclose
+    changed = ~np.isclose(old_length, new_length, rtol=1e-9, atol=0) & (old_length > 0) & (new_length > 0)
+    safe_old_length = np.where(changed, old_length, 1)
+    safe_new_length = np.where(changed, new_length, 2)
+    logarithmic_mean = (safe_new_length - safe_old_length) / np.log(safe_new_length / safe_old_length)
+    return np.where(changed, safe_new_length / logarithmic_mean, 1)
@@ -5,7 +5,10 @@ import logging
 from typing import Any, Tuple, Callable, List
 
 import Constants
+from EnvironmentManagement.Clock import get_clock
 from LocationService.Trigo import Position, Angle
+from LocationService.BakedTrack import BakedTrack
+from LocationService.Kinematics import integrate_lane_change, integrate_speed, get_length_mean_factor
 from LocationService.Track import FullTrack
 
 logger = logging.getLogger(__name__)
@@ -16,12 +19,20 @@ class LocationService:
                  track: FullTrack | None,
                  starting_offset: float = 0,
                  simulation_ticks_per_second: int = 24,
-                 start_immediately: bool = False):
+                 start_immediately: bool = False,
+                 simulation_clock: 'SimulationClock | None' = None,
+                 baked_track_resolution: float | None = None):
         """
         Init the location service
         track: List of all Track Pieces
-        simulation_ticks_per_second: how many steps should be calculated per second. A higher value
-            increases accuracy and the required CPU time
+        simulation_ticks_per_second: how many steps should be calculated per second. Speed and offset
+            changes are calculated in closed form (see `Kinematics`), so a lower value only reduces how
+            often positions are published and the required CPU time, but not the accuracy. Ignored if a
+            simulation_clock is given, since the clock determines the tick rate then
+        simulation_clock: Shared clock that advances this service together with all other registered
+            services. If None, the service runs its own asynchronous loop
+        baked_track_resolution: If given, positions and directions are looked up in a baked track with this
+            resolution in mm (see `BakedTrack`) instead of being calculated by the track pieces
         on_update_callback: Callback that gets executed every time a new position was
             calculated. It includes the global position, the global angle and a dict
             with additional data. This data is:
@@ -32,6 +43,9 @@ class LocationService:
                 uturn_in_progress: True, if it's currently doing a U-Turn
         """
         self.__MAX_USED_DISTANCE_FOR_OFFSET_PERCENT = 0.30
+        self._simulation_clock: SimulationClock | None = simulation_clock
+        if simulation_clock is not None:
+            simulation_ticks_per_second = simulation_clock.get_ticks_per_second()
         self._simulation_ticks_per_second = simulation_ticks_per_second
         self.__start_immediately = start_immediately
 
@@ -52,12 +66,17 @@ class LocationService:
         self._uturn_override: UTurnOverride | None = None
 
         self._track: FullTrack | None = track
+        self._baked_track_resolution: float | None = baked_track_resolution
+        self._baked_track: BakedTrack | None = None
+        if track is not None and baked_track_resolution is not None:
+            self._baked_track = track.get_baked_track(baked_track_resolution)
         self._current_piece_index: int = 0
         self._progress_on_current_piece: float = 0
         self._current_position: Position | None
         if track is not None:
-            first_piece, _ = self._track.get_entry_tupel(0)
-            _, self._current_position = first_piece.process_update(0, 0, starting_offset)
+            first_piece, global_track_offset = self._track.get_entry_tupel(0)
+            _, start_position = first_piece.process_update(0, 0, starting_offset)
+            self._current_position = start_position + global_track_offset
         else:
             self._current_position = None
 
@@ -68,7 +87,7 @@ class LocationService:
             self.start()
 
     def __del__(self):
-        if self.__task is not None:
+        if self.__task is not None or self._simulation_clock is not None:
             self.stop()
 
     def add_on_update_callback(self, callback_function: Callable[[Position, Angle, dict[str, Any]], None]) -> None:
@@ -76,6 +95,51 @@ class LocationService:
 
         return
 
+    def get_arc_length(self) -> float | None:
+        """
+        Gets the current position of the car as arc length coordinate s of the track (see `FullTrack.to_arc_length`)
+        for the offset the car is currently driving on. Use `FullTrack.convert_arc_length` to compare it with
+        cars on other lanes.
+
+        Returns
+        -------
+        float | None
+            The arc length coordinate or None, if there is no track
+        """
+        if self._track is None:
+            return None
+        return self._track.to_arc_length(self._current_piece_index, self._progress_on_current_piece,
+                                         self._actual_offset)
+
+    def get_arc_length_offset(self) -> float:
+        """
+        Gets the offset that's used for the arc length coordinate returned by `get_arc_length`
+        """
+        return self._actual_offset
+
+    def get_distance_to_position(self, index: int, progress: float) -> float | None:
+        """
+        Gets the shortest distance from the car to another position on the track in O(1) (see
+        `FullTrack.get_distance_between`). The offset of the car is used for both positions.
+
+        Parameters
+        ----------
+        index: int
+            Index of the piece of the other position
+        progress: float
+            Progress on the piece of the other position
+
+        Returns
+        -------
+        float | None
+            The distance, which is positive if the position is ahead of the car in its driving direction and negative
+            if it's behind. None, if there is no track
+        """
+        if self._track is None:
+            return None
+        return self._track.get_distance_between(self._current_piece_index, self._progress_on_current_piece,
+                                                index, progress, self._actual_offset, self._direction_mult)
+
     async def do_uturn(self) -> None:
         """
         Do a U-Turn.
@@ -149,41 +213,55 @@ class LocationService:
         self._target_offset = offset * -1 * self._direction_mult
         return
 
-    def _adjust_speed(self) -> None:
+    def _adjust_speed(self, duration: float | None = None) -> float:
         """
         Updates internal speed values for the simulation based on the acceleration.
         Not Thread-safe
+
+        Parameters
+        ----------
+        duration: float | None
+            Time in seconds to simulate. If None, the time of one simulation step is used.
+
+        Returns
+        -------
+        distance: float
+            Distance driven during the time.
         """
-        self._adjust_speed_to(self._target_speed)
-        return
+        return self._adjust_speed_to(self._target_speed, duration)
 
-    def _adjust_speed_to(self, target_speed: float) -> None:
+    def _adjust_speed_to(self, target_speed: float, duration: float | None = None) -> float:
         """
-        Updates internal speed values for the simulation based on the acceleration.
+        Updates internal speed values for the simulation based on the acceleration. The speed changes with a
+        constant acceleration until the target speed is reached, which is calculated in closed form, so the result
+        doesn't depend on the length of the simulation steps.
         Not Thread-safe
 
         Parameters
         ----------
         target_speed: float
             Target speed.
-        """
-        max_change = self._acceleration / self._simulation_ticks_per_second
-        if self._actual_speed < target_speed:
-            self._actual_speed += max_change
-            # accelerated too much
-            if self._actual_speed > target_speed:
-                self._actual_speed = target_speed
+        duration: float | None
+            Time in seconds to simulate. If None, the time of one simulation step is used.
 
-        if self._actual_speed > target_speed:
-            self._actual_speed -= max_change
-            # decelerated too much
-            if self._actual_speed < target_speed:
-                self._actual_speed = target_speed
+        Returns
+        -------
+        distance: float
+            Distance driven during the time.
+        """
+        if duration is None:
+            duration = 1 / self._simulation_ticks_per_second
+        self._actual_speed, distance = integrate_speed(self._actual_speed, target_speed, self._acceleration,
+                                                       duration)
+        return distance
 
     def _adjust_offset(self, travel_distance: float) -> float:
         """
         Changes the current offset to get closer to the target based on the
-        traveled distance.
+        traveled distance. The car moves sideways by a fixed part of the driven distance
+        until the target is reached, which is calculated in closed form, so the result
+        doesn't depend on the length of the simulation steps. Only a lane change across
+        the border of a curve is approximated.
         Not Thread-safe
 
         Parameters
@@ -194,27 +272,20 @@ class LocationService:
         Returns
         -------
         remaining_way: float
-            Leftover distance that can be traveled straight.
+            Leftover distance that can be traveled along the track with the new offset.
         """
-        # slightly changes the progress on the piece itself
-        needed_offset = abs(self._actual_offset - self._target_offset)
-        max_change = self.__MAX_USED_DISTANCE_FOR_OFFSET_PERCENT * travel_distance
-        change = max_change
-        if max_change > needed_offset:
-            change = needed_offset
-
-        if needed_offset < change:
-            change = needed_offset
         old_offset = self._actual_offset
-        if self._target_offset > self._actual_offset:
-            new_offset = self._actual_offset + change
-        else:
-            new_offset = self._actual_offset - change
+        new_offset, changing_way, straight_way = integrate_lane_change(
+            old_offset, self._target_offset, travel_distance, self.__MAX_USED_DISTANCE_FOR_OFFSET_PERCENT)
+        if new_offset == old_offset:
+            return straight_way
+        # slightly changes the progress on the piece itself
         self._adjust_offset_on_piece(old_offset, new_offset)
 
-        # use pythagoras for more accuracy
-        remaining_way = math.sqrt(travel_distance * travel_distance - change * change)
-        return remaining_way
+        # while changing lanes on a curve the length of the piece changes, so the way is converted to the new offset
+        piece, _ = self._track.get_entry_tupel(self._current_piece_index)
+        changing_way *= get_length_mean_factor(piece.get_length(old_offset), piece.get_length(new_offset))
+        return changing_way + straight_way
 
     def _adjust_offset_on_piece(self, old_offset: float, new_offset: float) -> None:
         """
@@ -248,8 +319,7 @@ class LocationService:
             if self._uturn_override is not None:
                 trav_distance = self._uturn_override.override_simulation()
             else:
-                self._adjust_speed()
-                trav_distance = self._adjust_offset(self._actual_speed / self._simulation_ticks_per_second)
+                trav_distance = self._adjust_offset(self._adjust_speed())
             return self._run_simulation_step(trav_distance * self._direction_mult)
 
     def _run_simulation_step(self, distance: float) -> Tuple[Position | None, Angle]:
@@ -267,67 +337,103 @@ class LocationService:
         Tuple[Position, Angle]
             The new position and the Angle where the car is pointing.
         """
-        # prevent "maximum recursion depth exceeded" Errors in case the simulation has a bug
+        # a distance against the driving direction can only be caused by a bug in the simulation
         if self._direction_mult == -1 and distance > 0:
             logger.critical(
-                "The leftover distance is positive while driving in opposing direction."
-                "This would create a infinite recursion. Breaking the loop to prevent this!")
+                "The distance is positive while driving in opposing direction."
+                "Ignoring the simulation step to prevent moving in the wrong direction!")
             return self._current_position, self._stop_direction
         elif self._direction_mult == 1 and distance < 0:
             logger.critical(
-                "The leftover distance is negative while driving in default direction."
-                "This would create a infinite recursion. Breaking the loop to prevent this!")
+                "The distance is negative while driving in default direction."
+                "Ignoring the simulation step to prevent moving in the wrong direction!")
             return self._current_position, self._stop_direction
 
+        # look up the piece where the car ends up instead of walking over all pieces in between
+        self._current_piece_index, self._progress_on_current_piece = self._track.move_along(
+            self._current_piece_index, self._progress_on_current_piece, distance, self._actual_offset)
+        return self._update_position(distance != 0)
+
+    def _update_position(self, moved: bool) -> Tuple[Position | None, Angle]:
+        """
+        Calculates the position and direction of the car for the current piece index, progress and offset
+
+        Parameters
+        ----------
+        moved: bool
+            Whether the car moved along the track since the last position
+
+        Returns
+        -------
+        Tuple[Position, Angle]
+            The new position and the Angle where the car is pointing.
+        """
         old_pos = self._current_position
-        piece, global_track_offset = self._track.get_entry_tupel(self._current_piece_index)
-        leftover_distance, new_pos = piece.process_update(self._progress_on_current_piece, distance,
-                                                          self._actual_offset)
-        self._progress_on_current_piece += distance
-        if leftover_distance != 0:
-            self._current_piece_index = (self._current_piece_index + self._direction_mult) % self._track.get_len()
-            if self._direction_mult == 1:
-                self._progress_on_current_piece = 0
-            else:
-                new_piece, _ = self._track.get_entry_tupel(self._current_piece_index)
-                self._progress_on_current_piece = new_piece.get_length(self._actual_offset)
-            return self._run_simulation_step(leftover_distance)
-        self._current_position = new_pos + global_track_offset
-        distance = self._current_position.distance_to(old_pos)
-        if distance < 0.1:
+        heading: Angle | None = None
+        if self._baked_track is not None:
+            x, y, heading = self._baked_track.get_pose(self._current_piece_index, self._progress_on_current_piece,
+                                                       self._actual_offset, reverse=self._direction_mult == -1)
+        else:
+            piece, global_track_offset = self._track.get_entry_tupel(self._current_piece_index)
+            # work with plain coordinates to not create intermediate Position objects
+            local_x, local_y = piece.get_position_xy(self._progress_on_current_piece, self._actual_offset)
+            x = local_x + global_track_offset.get_x()
+            y = local_y + global_track_offset.get_y()
+        if heading is not None and moved and self._uturn_override is None \
+                and self._actual_offset == self._target_offset:
+            # the direction of the track doesn't include the sideways movement of lane changes and U-Turns
+            rot = heading
+            self._stop_direction = rot
+        elif old_pos.distance_to_xy(x, y) < 0.1:
             rot = self._stop_direction
         else:
-            rot = old_pos.calculate_angle_to(self._current_position)
+            rot = Angle(old_pos.calculate_angle_deg_to_xy(x, y))
             self._stop_direction = rot
+        self._current_position = Position(x, y)
         return self._current_position, rot
 
+    async def _run_tick(self) -> None:
+        """
+        Runs a single simulation step and notifies all registered callbacks about the result.
+        """
+        pos, rot = await self._run_simulation_step_threadsafe()
+        self._publish_position(pos, rot)
+
+    def _publish_position(self, pos: Position | None, rot: Angle) -> None:
+        """
+        Notifies all registered callbacks about a new position
+        """
+        data: dict[str, Any] = {
+            'offset': self._actual_offset * self._direction_mult * -1,
+            'speed': self._actual_speed,
+            'going_clockwise': self._direction_mult == 1,
+            'uturn_in_progress': self._uturn_override is not None}
+
+        for callback in self._on_update_callback:
+            callback(pos, rot, data)
+        return
+
     async def _run_task(self) -> None:
         """
         Runs the simulation asynchronously in an asynchronous loop.
         """
         # while not self._stop_event.is_set():
         while True:
-            pos, rot = await self._run_simulation_step_threadsafe()
-            data: dict[str, Any] = {
-                'offset': self._actual_offset * self._direction_mult * -1,
-                'speed': self._actual_speed,
-                'going_clockwise': self._direction_mult == 1,
-                'uturn_in_progress': self._uturn_override is not None}
-
-            for callback in self._on_update_callback:
-                callback(pos, rot, data)
-
+            await self._run_tick()
             # time.sleep(1 / self._simulation_ticks_per_second)
-            await asyncio.sleep(1 / self._simulation_ticks_per_second)
+            await get_clock().sleep(1 / self._simulation_ticks_per_second)
 
     def start(self) -> None:
         """
-        Creates a task and adds it to the event loop.
+        Registers the service at the simulation clock or, if there is none, creates a task and adds it to the
+        event loop.
         """
-        if self._track is not None:
-            self.__task = asyncio.create_task(self._run_task())
-        else:
+        if self._track is None:
             logger.error("Location service was told to start while there is no track. Ignoring the request!")
+        elif self._simulation_clock is not None:
+            self._simulation_clock.register(self)
+        else:
+            self.__task = asyncio.create_task(self._run_task())
         #        if self._simulation_thread is not None:
         #            self.logger.error("It was attempted to start an already running LocationService Thread.
         #            Ignoring the request!")
@@ -340,8 +446,10 @@ class LocationService:
 
     def stop(self) -> None:
         """
-        Cancels the task that runs the simulation.
+        Cancels the task that runs the simulation or unregisters the service from the simulation clock.
         """
+        if self._simulation_clock is not None:
+            self._simulation_clock.unregister(self)
         if self.__task is not None:
             self.__task.cancel()
         #        #if self._simulation_thread is None:
@@ -355,13 +463,176 @@ class LocationService:
 
     def notify_new_track(self, new_track: FullTrack) -> None:
         self._track = new_track
-        first_piece, _ = self._track.get_entry_tupel(0)
-        _, self._current_position = first_piece.process_update(0, 0, self._actual_offset)
+        if self._baked_track_resolution is not None:
+            self._baked_track = new_track.get_baked_track(self._baked_track_resolution)
+        first_piece, global_track_offset = self._track.get_entry_tupel(0)
+        _, start_position = first_piece.process_update(0, 0, self._actual_offset)
+        self._current_position = start_position + global_track_offset
         if self.__task is not None:
             self.__task.cancel()
         self.start()
 
 
+class SimulationClock:
+    """
+    Central clock that advances all registered LocationServices in one fixed timestep pass. The ticks are
+    scheduled against the absolute time of the event loop, so the time needed for a pass doesn't accumulate
+    as drift. Passes that take longer than a tick are counted and reported as overruns.
+    """
+
+    def __init__(self, ticks_per_second: int = 24):
+        """
+        Create a simulation clock
+
+        Parameters
+        ----------
+        ticks_per_second: int
+            How many simulation steps every registered LocationService should do per second.
+        """
+        self._ticks_per_second: int = ticks_per_second
+        self._location_services: list[LocationService] = []
+        self._task: asyncio.Task[None] | None = None
+
+        self._tick_count: int = 0
+        self._overrun_count: int = 0
+        self._last_tick_duration: float = 0
+
+        self._before_tick_callback: list[Callable[[], None]] = []
+        self._on_tick_callback: list[Callable[[], None]] = []
+
+    def add_before_tick_callback(self, callback_function: Callable[[], None]) -> None:
+        """
+        Adds a callback that's called at the start of every tick before the location services run, e.g. to advance
+        a simulation that is shared by several location services
+        """
+        self._before_tick_callback.append(callback_function)
+        return
+
+    def add_on_tick_callback(self, callback_function: Callable[[], None]) -> None:
+        """
+        Adds a callback that's called after all location services finished a tick, e.g. to process the new
+        positions of all vehicles at once
+        """
+        self._on_tick_callback.append(callback_function)
+        return
+
+    def get_ticks_per_second(self) -> int:
+        """
+        Gets the amount of simulation steps per second
+        """
+        return self._ticks_per_second
+
+    def get_tick_count(self) -> int:
+        """
+        Gets the amount of ticks that were done since the clock was created
+        """
+        return self._tick_count
+
+    def get_overrun_count(self) -> int:
+        """
+        Gets the amount of ticks that took longer than the tick interval
+        """
+        return self._overrun_count
+
+    def get_last_tick_duration(self) -> float:
+        """
+        Gets the time in seconds that was needed to advance all location services in the last tick
+        """
+        return self._last_tick_duration
+
+    def get_registered_services(self) -> list[LocationService]:
+        """
+        Gets all location services that are currently driven by this clock
+        """
+        return self._location_services
+
+    def register(self, location_service: LocationService) -> None:
+        """
+        Adds a location service to the services that are advanced every tick. Starts the clock, if it isn't
+        running yet. Registering an already registered service is ignored.
+        """
+        if location_service in self._location_services:
+            return
+        self._location_services.append(location_service)
+        if self._task is None:
+            self.start()
+        return
+
+    def unregister(self, location_service: LocationService) -> None:
+        """
+        Removes a location service from the clock. The clock stops, if there is no service left.
+        """
+        if location_service in self._location_services:
+            self._location_services.remove(location_service)
+        if len(self._location_services) == 0:
+            self.stop()
+        return
+
+    def start(self) -> None:
+        """
+        Creates the task that runs the ticks and adds it to the event loop.
+        """
+        if self._task is not None:
+            logger.warning("The simulation clock was told to start while it's already running. Ignoring the request!")
+            return
+        self._task = asyncio.create_task(self._run_task())
+        return
+
+    def stop(self) -> None:
+        """
+        Cancels the task that runs the ticks.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        return
+
+    async def _run_tick(self) -> None:
+        """
+        Advances every registered location service by one simulation step.
+        """
+        for callback in self._before_tick_callback:
+            try:
+                callback()
+            except Exception:
+                logger.exception("A before tick callback of the simulation clock failed")
+        # copy, since callbacks may register or unregister services
+        for location_service in list(self._location_services):
+            try:
+                await location_service._run_tick()
+            except Exception:
+                logger.exception("A location service failed to run a simulation step")
+        for callback in self._on_tick_callback:
+            try:
+                callback()
+            except Exception:
+                logger.exception("A tick callback of the simulation clock failed")
+        self._tick_count += 1
+        return
+
+    async def _run_task(self) -> None:
+        """
+        Runs the ticks in an asynchronous loop with a fixed timestep.
+        """
+        clock = get_clock()
+        interval = 1 / self._ticks_per_second
+        next_tick = clock.time()
+        while True:
+            tick_start = clock.time()
+            await self._run_tick()
+            now = clock.time()
+            self._last_tick_duration = now - tick_start
+
+            next_tick += interval
+            if now > next_tick:
+                # skip the missed ticks instead of running them in a burst
+                self._overrun_count += 1
+                logger.warning("Simulation clock is %.1f ms behind schedule (last tick took %.1f ms)",
+                               (now - next_tick) * 1000, self._last_tick_duration * 1000)
+                next_tick = now
+            await clock.sleep(next_tick - now)
+
+
 class UTurnOverride:
     """
     Class that overrides the complete LocationService behavior to
@@ -392,6 +663,8 @@ class UTurnOverride:
 
         # Point around which the U-Turn will resolve. Generally dx is the length and dy the offset
         self._last_curve_pos: Position = Position(0, self._angle_multiplier)
+        # the curve is driven with the same rotation every step
+        self._step_rotation: Angle = Angle(self._DEGREE_PER_STEP * self._angle_multiplier)
         self._orig_mult = self._location_service._direction_mult
 
     def override_simulation(self) -> float:
@@ -410,8 +683,7 @@ class UTurnOverride:
                 if abs(self._location_service._actual_speed - self._SPEED_FOR_UTURN) < 0.1:
                     self._phase = 1
                     return self.override_simulation()
-                self._location_service._adjust_speed_to(self._SPEED_FOR_UTURN)
-                return self._location_service._actual_speed / self._location_service._simulation_ticks_per_second
+                return self._location_service._adjust_speed_to(self._SPEED_FOR_UTURN)
             # first half of the curve
             case 1:
                 # check if we entered the 2nd half already
@@ -444,7 +716,7 @@ class UTurnOverride:
             Traveled distance.
         """
         new_pos = self._last_curve_pos.clone()
-        new_pos.rotate_around_0_0(Angle(self._DEGREE_PER_STEP * self._angle_multiplier))
+        new_pos.rotate_around_0_0(self._step_rotation)
         dx = new_pos.get_x() - self._last_curve_pos.get_x()
         dy = new_pos.get_y() - self._last_curve_pos.get_y()
 
@@ -0,0 +1,150 @@
+import math
+
+# latency in seconds that is assumed until it was measured
+DEFAULT_LATENCY: float = 0.05
+
+
+class MotionEstimator:
+    """
+    Estimates the speed and position of a physical car from the timestamps of its transition events with an
+    alpha-beta filter. Every transition is a measurement of the position: the car just passed the border of a piece,
+    so it drove the length of the previous piece since the last transition.
+
+    The notifications arrive with a delay that varies between cars and over time. The part that is the same for every
+    notification can't be seen in the timestamps, so it's measured separately (e.g. from the round trip time of BLE
+    commands) and added with `add_latency_sample`. The part that varies per notification (the jitter) shows up as
+    error of the measurements and is smoothed by the filter.
+    """
+
+    def __init__(self, alpha: float = 0.5, beta: float = 0.2, latency_alpha: float = 0.1):
+        """
+        Parameters
+        ----------
+        alpha: float
+            Weight of a measurement for the position. Between 0 and 1
+        beta: float
+            Weight of a measurement for the speed. Between 0 and 1
+        latency_alpha: float
+            Weight of a new latency sample for the smoothed latency. Between 0 and 1
+        """
+        self._alpha: float = alpha
+        self._beta: float = beta
+        self._latency_alpha: float = latency_alpha
+
+        self._latency: float = DEFAULT_LATENCY
+        self._latency_sample_count: int = 0
+        # average absolute error of the measured event times in seconds
+        self._jitter: float = 0
+
+        # driven distance since the first transition at the time of the last transition
+        self._position: float | None = None
+        # measured driven distance at the time of the last transition
+        self._measured_position: float = 0
+        # estimated time of the last transition on the own clock, so without the latency
+        self._event_time: float = 0
+        self._speed: float | None = None
+        # amount of transitions that were measured since the last reset
+        self._measurement_count: int = 0
+
+    def reset(self) -> None:
+        """
+        Forgets the position and speed, e.g. because the position of the car isn't known anymore. The latency is
+        kept, since it doesn't depend on the position
+        """
+        self._position = None
+        self._measured_position = 0
+        self._speed = None
+        self._measurement_count = 0
+
+    def add_latency_sample(self, latency: float) -> None:
+        """
+        Adds a measured latency in seconds of the connection to the car
+        """
+        if latency < 0 or math.isnan(latency):
+            return
+        if self._latency_sample_count == 0:
+            self._latency = latency
+        else:
+            self._latency += self._latency_alpha * (latency - self._latency)
+        self._latency_sample_count += 1
+
+    def get_latency(self) -> float:
+        """
+        Gets the estimated latency in seconds. It's `DEFAULT_LATENCY` until a sample was added
+        """
+        return self._latency
+
+    def get_jitter(self) -> float:
+        """
+        Gets the estimated average difference in seconds between the time a transition was received and the time
+        the filter expected it
+        """
+        return self._jitter
+
+    def get_speed(self) -> float | None:
+        """
+        Gets the estimated speed in mm/s or None, if there weren't enough transitions yet
+        """
+        return self._speed
+
+    def get_measurement_count(self) -> int:
+        """
+        Gets the amount of transitions the speed was measured from since the last reset. The first transition after
+        a reset isn't counted, since it only sets the starting point
+        """
+        return self._measurement_count
+
+    def notify_transition(self, distance: float, timestamp: float, reported_speed: float | None = None) -> None:
+        """
+        Updates the estimation with a transition event
+
+        Parameters
+        ----------
+        distance: float
+            Distance in mm the car drove since the last transition (usually the length of the previous piece). It's
+            ignored for the first transition after a reset
+        timestamp: float
+            Monotonic time in seconds at which the transition event was received
+        reported_speed: float | None
+            Speed the car reported. It's used as first estimation of the speed
+        """
+        event_time = timestamp - self._latency
+        if self._position is None:
+            self._position = 0
+            self._measured_position = 0
+            self._event_time = event_time
+            if reported_speed is not None and reported_speed > 0:
+                self._speed = reported_speed
+            return
+
+        time_difference = event_time - self._event_time
+        if time_difference <= 0:
+            return
+        self._measured_position += distance
+        self._measurement_count += 1
+        if self._speed is None:
+            self._position = self._measured_position
+            self._speed = distance / time_difference
+            self._event_time = event_time
+            return
+
+        predicted_position = self._position + self._speed * time_difference
+        error = self._measured_position - predicted_position
+        self._position = predicted_position + self._alpha * error
+        self._speed = max(self._speed + self._beta * error / time_difference, 0)
+        if self._speed > 0:
+            self._jitter += self._latency_alpha * (abs(error) / self._speed - self._jitter)
+        self._event_time = event_time
+
+    def get_distance_since_transition(self, now: float) -> float | None:
+        """
+        Extrapolates how far the car drove since the last transition until the given monotonic time in seconds
+
+        Returns
+        -------
+        float | None
+            The distance in mm or None, if the speed isn't known yet
+        """
+        if self._position is None or self._speed is None:
+            return None
+        return self._position + self._speed * (now - self._event_time) - self._measured_position
@@ -1,8 +1,16 @@
 import logging
 from typing import Tuple
 
-from LocationService.LocationService import LocationService
+import Constants
+
+from EnvironmentManagement.Clock import get_clock
+from LocationService.LocationService import LocationService, SimulationClock
+from LocationService.MotionEstimator import MotionEstimator
+from LocationService.PieceHistory import PieceHistory
+from LocationService.PieceLengthCalibration import PieceLengthCalibration
+from LocationService.SpeedProfile import SpeedProfile
 from LocationService.Track import FullTrack
+from LocationService.Trigo import Angle, Position
 
 logger = logging.getLogger(__name__)
 
@@ -12,36 +20,82 @@ class PhysicalLocationService(LocationService):
                  track: FullTrack | None,
                  starting_offset: float = 0,
                  simulation_ticks_per_second: int = 24,
-                 start_immediately: bool = False) -> None:
-        super().__init__(track, starting_offset, simulation_ticks_per_second, start_immediately)
+                 start_immediately: bool = False,
+                 simulation_clock: SimulationClock | None = None,
+                 event_driven: bool = False,
+                 length_calibration: PieceLengthCalibration | None = None) -> None:
+        """
+        Init the location service. See `LocationService` for the parameters. If event_driven is True, the position
+        isn't simulated but calculated from the last transition or location event of the car. It's only calculated
+        and published on the tick after an event and whenever a consumer asks for it (see `get_frame`).
+        length_calibration holds the effective piece lengths of the track and should be shared by all physical cars
+        on it. If None, the service learns its own
+        """
+        super().__init__(track, starting_offset, simulation_ticks_per_second, start_immediately, simulation_clock)
         # watch piece indices from location events separately so it doesn't get changed by the default location service
         self._physical_piece: int | None = None
-        # amount of time the BLE message should take. Based on that additional travelling distance will be added to
-        self._BLE_LATENCY_CORRECTION: float = 0.05
-
-        # alpha filter to smoothen the correcture
+        # estimates the latency of the BLE messages and the real speed of the car from the transition events
+        self._motion_estimator: MotionEstimator = MotionEstimator()
+        # calibration of the car that's learned from the estimated speeds
+        self._speed_profile: SpeedProfile = SpeedProfile()
+        # effective lengths of the pieces that are learned from the transition timings
+        self._length_calibration: PieceLengthCalibration = \
+            PieceLengthCalibration() if length_calibration is None else length_calibration
+        # amount of measured transitions at the same target speed after which the estimated speed is trusted enough
+        # to learn from it
+        self._CALIBRATION_MIN_MEASUREMENTS: int = 5
+        # target speed at the last transition event and the amount of transitions since it changed
+        self._last_transition_target_speed: float | None = None
+        self._transitions_at_target_speed: int = 0
+        # index of the entered piece, offset, timestamp and target speed of the last transition event while the
+        # position was known. It's used to measure the effective length of the piece the car drove on since then
+        self._last_transition: Tuple[int, float, float, float] | None = None
+
+        self._event_driven: bool = event_driven
+        # last position reported by the car in event driven mode: piece index, progress on the piece, speed in mm/s
+        # and the monotonic time the car was there. None until the position of the car is known
+        self._anchor: Tuple[int, float, float, float] | None = None
+        # whether the anchor changed since the last published position. Only then a tick calculates the position
+        self._anchor_changed: bool = False
+        # time in seconds after the anchor until which the position is extrapolated. Without new events the car
+        # probably stopped or lost the connection
+        self._MAX_EXTRAPOLATION_TIME: float = 1
+
+        # speed that's added to the simulation to follow the car
         self._speed_correcture: float = 0
-        self._ALPHA_VALUE: float = 0.5
-
-        # list that tracks the history of pieces so we can figure out the position even when there are duplicate IDs
-        # It always has a int or None for indices that are also in the track
-        self._piece_history: list[int | None] = list()
-        self._piece_history_index: int = 0
+        # time in seconds in which the simulation should catch up with the car
+        self._CORRECTION_TIME: float = 1
+
+        # history of the pieces so we can figure out the position even when there are duplicate IDs. It has one slot
+        # for every piece of the track
+        self._piece_history: PieceHistory | None = None
+        # (offset, counting direction) of every position on the track that is still consistent with the history.
+        # The history position p is at the track index (offset + counting direction * p). None means that every
+        # position is possible, because the history is empty
+        self._position_candidates: set[Tuple[int, int]] | None = None
         self._reset_piece_history()
 
         return
 
     # overwritten method to implement a speed correcture based on the sent data
-    def _adjust_speed_to(self, target_speed: float) -> None:
+    def _adjust_speed_to(self, target_speed: float, duration: float | None = None) -> float:
         new_speed = target_speed + self._speed_correcture
         # we don't want to apply speed correctures here since they break the expected behaviour
         if self._uturn_override is not None or target_speed < 10:
-            return super()._adjust_speed_to(target_speed)
+            return super()._adjust_speed_to(target_speed, duration)
         # prevent negative values since the speed needs to always be a positive value
         if new_speed < 0:
-            return super()._adjust_speed_to(0)
+            return super()._adjust_speed_to(0, duration)
+
+        return super()._adjust_speed_to(new_speed, duration)
 
-        return super()._adjust_speed_to(new_speed)
+    # overwritten method to move through the pieces according to their effective length
+    def _run_simulation_step(self, distance: float) -> Tuple[Position | None, Angle]:
+        if self._uturn_override is None:
+            # a piece that is longer in reality needs more time, so the simulation moves slower through the nominal
+            # geometry of it
+            distance /= self._length_calibration.get_factor(self._current_piece_index, self._actual_offset)
+        return super()._run_simulation_step(distance)
 
     # ignore offset change requests and only use car values
     async def set_offset_int(self, offset: int) -> None:
@@ -51,36 +105,223 @@ class PhysicalLocationService(LocationService):
     def _notification_offset_to_internal_offset(self, offset: float) -> float:
         return offset * -1 * self._direction_mult
 
-    def notify_transition_event(self, offset: float) -> None:
+    def add_ble_latency_sample(self, latency: float) -> None:
+        """
+        Adds a measured latency in seconds of the BLE connection to the car (see `MotionEstimator.add_latency_sample`)
+        """
+        self._motion_estimator.add_latency_sample(latency)
+
+    def get_ble_latency(self) -> float:
+        """
+        Gets the estimated latency in seconds of the BLE notifications of the car
+        """
+        return self._motion_estimator.get_latency()
+
+    def get_ble_jitter(self) -> float:
+        """
+        Gets the estimated average variation in seconds of the arrival times of the transition events
+        """
+        return self._motion_estimator.get_jitter()
+
+    def get_estimated_speed(self) -> float | None:
+        """
+        Gets the speed of the car in mm/s estimated from the transition events or None, if it isn't known yet
+        """
+        return self._motion_estimator.get_speed()
+
+    def set_speed_profile(self, profile: SpeedProfile) -> None:
+        """
+        Sets the calibration of the car. It's used until the speed was estimated from the transition events and
+        learns from the estimated speeds
+        """
+        self._speed_profile = profile
+
+    def get_speed_profile(self) -> SpeedProfile:
+        """
+        Gets the calibration of the car
+        """
+        return self._speed_profile
+
+    def set_length_calibration(self, calibration: PieceLengthCalibration) -> None:
+        """
+        Sets the effective piece lengths of the track, e.g. the ones shared by all physical cars after the track
+        changed
+        """
+        self._length_calibration = calibration
+
+    def get_length_calibration(self) -> PieceLengthCalibration:
+        """
+        Gets the effective piece lengths of the track the service uses and learns
+        """
+        return self._length_calibration
+
+    def _get_effective_piece_length(self, index: int, offset: float) -> float:
+        """
+        Gets the length of the piece the car really drives with the given offset according to the calibration. It's
+        the nominal length until enough was learned
+        """
+        return self._track.get_piece_length(index, offset) * self._length_calibration.get_factor(index, offset)
+
+    def _get_calibrated_speed(self) -> float:
+        """
+        Gets the speed the car probably drives with for the current target speed according to its profile
+        """
+        calibrated_speed = self._speed_profile.get_actual_speed(self._target_speed)
+        return self._target_speed if calibrated_speed is None else calibrated_speed
+
+    def _get_tracking_speed(self) -> float:
+        """
+        Gets the speed the car drives with according to the estimation. If the target speed changed since the last
+        transition, the estimation is outdated and the calibrated target speed is used instead
+        """
+        estimated_speed = self._motion_estimator.get_speed()
+        if estimated_speed is None or self._last_transition_target_speed != self._target_speed:
+            return self._get_calibrated_speed()
+        return estimated_speed
+
+    def _set_anchor(self, index: int, progress: float, speed: float, time: float) -> None:
+        """
+        Stores a position of the car in event driven mode, from which the following positions are calculated
+        """
+        self._anchor = (index, progress, speed, time)
+        self._anchor_changed = True
+
+    def _get_anchored_position(self, now: float) -> Tuple[int, float]:
+        """
+        Calculates the piece index and the progress on it where the car is at the given time according to the anchor
+        """
+        index, progress, speed, time = self._anchor
+        elapsed_time = min(max(now - time, 0), self._MAX_EXTRAPOLATION_TIME)
+        # the speed is a real speed, but the progress is measured in the nominal length of the piece
+        distance = speed * elapsed_time / self._length_calibration.get_factor(index, self._actual_offset)
+        if distance == 0:
+            return index, progress
+        return self._track.move_along(index, progress, distance * self._direction_mult, self._actual_offset)
+
+    def get_frame(self) -> Tuple[Position | None, Angle]:
+        """
+        Calculates the current position of the car. In event driven mode it's calculated from the last event of the
+        car, otherwise the last simulated position is returned
+
+        Returns
+        -------
+        Tuple[Position, Angle]
+            The position and the Angle where the car is pointing.
+        """
+        if self._anchor is None or self._uturn_override is not None:
+            return self._current_position, self._stop_direction
+        old_index, old_progress = self._current_piece_index, self._progress_on_current_piece
+        self._current_piece_index, self._progress_on_current_piece = self._get_anchored_position(get_clock().time())
+        self._actual_speed = self._anchor[2]
+        self._target_offset = self._actual_offset
+        moved = old_index != self._current_piece_index or old_progress != self._progress_on_current_piece
+        return self._update_position(moved)
+
+    async def _run_tick(self) -> None:
+        if not self._event_driven or self._anchor is None or self._uturn_override is not None:
+            # the position is simulated until it's known and during U-Turns
+            self._anchor = None
+            return await super()._run_tick()
+        if not self._anchor_changed:
+            # between events the position is only calculated when a consumer asks for it
+            return
+        self._anchor_changed = False
+        pos, rot = self.get_frame()
+        self._publish_position(pos, rot)
+
+    def notify_transition_event(self, offset: float, timestamp: float | None = None) -> None:
         """
         Function that should be called when a physical car sent a transition event message
+
+        Parameters
+        ----------
+        offset: float
+            Offset that was sent by the car
+        timestamp: float | None
+            Monotonic time in seconds (see `Clock.time`) at which the message was received. If None, it's assumed
+            that it was received just now
         """
         if self._track is None:
             return
-        self._piece_history_index = (self._piece_history_index + self._direction_mult) % self._track.get_len()
+        self._piece_history.advance(self._direction_mult)
         if self._physical_piece is None:
             return
+        now = get_clock().time()
+        if timestamp is None:
+            timestamp = now
         # offset in a simulation format
         internal_offset = self._notification_offset_to_internal_offset(offset)
         piece_index = (self._physical_piece + self._direction_mult) % self._track.get_len()
+        self._learn_piece_length(internal_offset, timestamp)
+        self._motion_estimator.notify_transition(
+            self._get_effective_piece_length(self._physical_piece, internal_offset),
+            timestamp, self._get_calibrated_speed())
+        self._learn_speed_profile()
 
         self._target_offset = internal_offset
         self._physical_piece = piece_index
 
-        simulation_difference: float
-        if self._direction_mult == 1:
-            simulation_difference = self._calculate_distance_to_position(piece_index,
-                                                                         self._actual_speed
-                                                                         * self._BLE_LATENCY_CORRECTION)
-        else:
-            piece, _ = self._track.get_entry_tupel(piece_index)
-            simulation_difference = self._calculate_distance_to_position(piece_index,
-                                                                         piece.get_length(internal_offset)
-                                                                         - self._actual_speed
-                                                                         * self._BLE_LATENCY_CORRECTION)
+        # distance the car drove on the new piece until now. It entered it one latency before the message arrived
+        progress = self._motion_estimator.get_distance_since_transition(now)
+        if progress is None:
+            progress = self._actual_speed * (now - timestamp + self._motion_estimator.get_latency())
+        # the simulation uses the nominal length of the piece
+        progress /= self._length_calibration.get_factor(piece_index, internal_offset)
+        if self._direction_mult == -1:
+            progress = self._track.get_piece_length(piece_index, internal_offset) - progress
+        simulation_difference = self.get_distance_to_position(piece_index, progress)
+
+        # follow the estimated speed of the car and catch up with its position
+        estimated_speed = self._motion_estimator.get_speed()
+        if estimated_speed is None:
+            estimated_speed = self._get_calibrated_speed()
+        if self._event_driven:
+            self._actual_offset = internal_offset
+            self._set_anchor(piece_index, progress, self._get_tracking_speed(), now)
+        speed_difference = estimated_speed - self._target_speed
+        self._speed_correcture = speed_difference + simulation_difference / self._CORRECTION_TIME
+
+    def _learn_piece_length(self, offset: float, timestamp: float) -> None:
+        """
+        Measures the effective length of the piece the car just left from the time it needed for it and the speed it
+        reported, if it drove through the whole piece with a constant target speed and offset. The latency of both
+        transitions is the same, so it doesn't change the measured time.
+
+        The reported speed is corrected with the speed profile of the car first. Otherwise a car that is faster than
+        it reports would make every piece look longer. Until the profile knows the speed, nothing is learned
+        """
+        last_transition = self._last_transition
+        entered_piece = (self._physical_piece + self._direction_mult) % self._track.get_len()
+        self._last_transition = (entered_piece, offset, timestamp, self._target_speed)
+        if last_transition is None:
+            return
+        last_piece, last_offset, last_timestamp, last_target_speed = last_transition
+        if last_piece != self._physical_piece or abs(last_offset - offset) > Constants.TRACK_LANE_WIDTH / 2 \
+                or last_target_speed != self._target_speed or self._target_speed <= 0:
+            return
+        actual_speed = self._speed_profile.get_actual_speed(self._target_speed)
+        if actual_speed is None:
+            return
+        measured_length = (timestamp - last_timestamp) * actual_speed
+        nominal_length = self._track.get_piece_length(self._physical_piece, offset)
+        self._length_calibration.add_sample(self._physical_piece, offset, measured_length, nominal_length)
 
-        self._speed_correcture = (simulation_difference * self._ALPHA_VALUE) +\
-                                 ((1 - self._ALPHA_VALUE) * self._speed_correcture)
+    def _learn_speed_profile(self) -> None:
+        """
+        Adds the estimated speed to the profile, if the estimation had enough transitions at a constant target speed
+        """
+        target_speed = self._target_speed
+        if self._last_transition_target_speed == target_speed:
+            self._transitions_at_target_speed += 1
+        else:
+            self._last_transition_target_speed = target_speed
+            self._transitions_at_target_speed = 0
+        estimated_speed = self._motion_estimator.get_speed()
+        if estimated_speed is None \
+                or self._transitions_at_target_speed < self._CALIBRATION_MIN_MEASUREMENTS \
+                or self._motion_estimator.get_measurement_count() < self._CALIBRATION_MIN_MEASUREMENTS:
+            return
+        self._speed_profile.add_sample(target_speed, estimated_speed)
 
     def notify_location_event(self, piece: int, location: int, offset: float, speed: int) -> None:
         """
@@ -91,179 +332,104 @@ class PhysicalLocationService(LocationService):
         offset = self._notification_offset_to_internal_offset(offset)
         self._target_offset = offset
         self._target_speed = speed
+        if self._motion_estimator.get_speed() is None:
+            # until the speed is estimated, the calibration corrects it right away
+            self._speed_correcture = self._get_calibrated_speed() - speed
+        if self._anchor is not None:
+            # continue from the current position with the new speed and offset
+            now = get_clock().time()
+            index, progress = self._get_anchored_position(now)
+            track_piece, _ = self._track.get_entry_tupel(index)
+            progress = track_piece.get_equivalent_progress_for_offset(self._actual_offset, offset, progress)
+            self._actual_offset = offset
+            self._set_anchor(index, progress, self._get_tracking_speed(), now)
 
         if not self._track.contains_physical_piece(piece):
             logger.warning(
                 "Couldn't find a piece matching the physical ID %d we got from the location event. Ignoring it", piece)
             return
 
-        old_piece: int | None = self._piece_history[self._piece_history_index]
+        old_piece: int | None = self._piece_history.get_current()
         if old_piece is not None and old_piece != piece:
             logger.warning("The piece history had another piece in this position. Clearing the list!")
             self._reset_piece_history()
 
-        self._piece_history[self._piece_history_index] = piece
+        self._piece_history.set_current(piece)
 
-        self._find_physical_location()
-
-    def _calculate_distance_to_position(self, other_index: int, other_progress: float) -> float:
-        """
-        Calculates the difference between the simulation and another given position.
-        A positive value means the simulation is in front of the other position. A negative value means the simulation
-        is behind of the other position
-        """
-        if self._current_piece_index == other_index:
-            return self._calculate_distance_on_same_piece(other_progress)
-
-        forward_distance = self._calculate_distance_to_position_forward(other_index, other_progress)
-        backward_distance = self._calculate_distance_to_position_backward(other_index, other_progress)
-
-        # return smaller
-        if abs(forward_distance) > abs(backward_distance):
-            return backward_distance
-        return forward_distance
-
-    def _calculate_distance_to_position_forward(self, other_index: int, other_progress: float) -> float:
-        """
-        Calculate the distance to another position in the driving direction. The result signs are the same as in
-        `_calculate_distance_to_position`
-        """
-        # progress on own piece
-        diff: float
-        if self._direction_mult == 1:
-            diff = self._calculate_distance_to_end(self._current_piece_index, self._progress_on_current_piece)
-        else:
-            diff = self._calculate_distance_from_start(self._progress_on_current_piece)
-
-        # add full length of all pieces between
-        i = self._current_piece_index
-        while True:
-            i = (i + self._direction_mult) % self._track.get_len()
-            if i == other_index:
-                break
-            piece, _ = self._track.get_entry_tupel(i)
-            diff += piece.get_length(self._actual_offset)
-
-        # add progress of the other car
-        if self._direction_mult == 1:
-            diff += self._calculate_distance_from_start(other_progress)
-        else:
-            diff += self._calculate_distance_to_end(i, other_progress)
-
-        return diff
-
-    # TODO: Check redundancy with _calculate_distance_to_position_forward
-    def _calculate_distance_to_position_backward(self, other_index: int, other_progress: float) -> float:
-        """
-        Calculate the distance to another position against the driving direction. The result signs are the same as in
-        `_calculate_distance_to_position`
-        """
-        # progress on own piece
-        diff: float
-        if self._direction_mult == 1:
-            diff = self._calculate_distance_from_start(self._progress_on_current_piece)
-        else:
-            diff = self._calculate_distance_to_end(self._current_piece_index, self._progress_on_current_piece)
-
-        # add full length of all pieces between
-        i = self._current_piece_index
-        while True:
-            i = (i - self._direction_mult) % self._track.get_len()
-            if i == other_index:
-                break
-            piece, _ = self._track.get_entry_tupel(i)
-            diff += piece.get_length(self._actual_offset)
-
-        # add progress of the other car
-        if self._direction_mult == 1:
-            diff += self._calculate_distance_to_end(i, other_progress)
-        else:
-            diff += self._calculate_distance_from_start(other_progress)
-        return diff * -1
-
-    def _calculate_distance_on_same_piece(self, other_position: float) -> float:
-        """
-        Calculates the distance to another position assuming we are on the same piece. The result signs are the same as
-        in `_calculate_distance_to_position`
-        """
-        return (other_position - self._progress_on_current_piece) * self._direction_mult
-
-    def _calculate_distance_from_start(self, progress: float) -> float:
-        """
-        Calculates how far the car is on the current piece. This function only returns its argument and exists
-        purely for code readability
-        """
-        _ = self
-        return progress
-
-    def _calculate_distance_to_end(self, piece_index: int, progress: float) -> float:
-        """
-        Calculates how far the car is away from the end of a piece
-        """
-        piece, _ = self._track.get_entry_tupel(piece_index)
-        return piece.get_length(self._actual_offset) - progress
+        self._find_physical_location(piece)
 
     def _reset_piece_history(self) -> None:
         """
-        Resets the own piece_history list to have None in every position
-        to avoid out of bounds exceptions
+        Removes all entries from the piece history, so every position on the track is possible again
         """
+        self._position_candidates = None
         if self._track is None:
             return
-        self._piece_history.clear()
-        for _ in range(0, self._track.get_len()):
-            self._piece_history.append(None)
+        if self._piece_history is None or self._piece_history.get_size() != self._track.get_len():
+            self._piece_history = PieceHistory(self._track.get_len())
+        else:
+            self._piece_history.clear()
 
-    def _find_physical_location(self) -> None:
+    def _find_physical_location(self, piece: int) -> None:
         """
-        Matches the piece history with the track piece IDs to figure out where we are
-        on the track
+        Matches the piece that was just stored in the piece history with the track to figure out where we are on the
+        track. Only the positions that were consistent with the history before are checked, so this takes time
+        proportional to the amount of remaining candidates instead of the length of the track
         """
-        # the bool stands for whether it was found while seraching in the opposite direction
-        possible_start_indices: list[Tuple[int, bool]] = list()
+        self._position_candidates = self._get_matching_candidates(piece)
         track_len = self._track.get_len()
 
-        for starting_offset in range(0, track_len):
-            if self._test_history_matches_track_with_offset(starting_offset, 1):
-                possible_start_indices.append((starting_offset, False))
-            if self._test_history_matches_track_with_offset(starting_offset, -1):
-                possible_start_indices.append((starting_offset, True))
-
-        if len(possible_start_indices) == 1:
-            index, direction = possible_start_indices[0]
-            self._physical_piece = (self._piece_history_index + index) % track_len
-            if direction:
+        if len(self._position_candidates) == 1:
+            offset, counting_direction = next(iter(self._position_candidates))
+            history_position = self._piece_history.get_position()
+            physical_piece = (offset + counting_direction * history_position) % track_len
+            if physical_piece != self._physical_piece or counting_direction == -1:
+                # the transitions so far were counted for another position
+                self._motion_estimator.reset()
+                self._last_transition = None
+                self._anchor = None
+            self._physical_piece = physical_piece
+            if counting_direction == -1:
+                # the history counts against the driving direction. After mirroring it, the same pieces are
+                # matched by counting forwards from the same offset
                 self._direction_mult *= -1
-                self._piece_history.reverse()
-                self._piece_history_index = self._track.get_len() - self._piece_history_index
-                self._physical_piece = self._track.get_len() - self._physical_piece
+                self._piece_history.mirror()
+                self._position_candidates = {(offset, 1)}
             return
 
-        if len(possible_start_indices) == 0:
+        if len(self._position_candidates) == 0:
             logger.warning("The piece history doesn't match the track with any offset. Resetting the piece history")
             self._reset_piece_history()
             return
 
         logger.info("Didn't get enough data to determine the physical position yet. "
-                    "Number of possible starting points: %d", len(possible_start_indices))
+                    "Number of possible starting points: %d", len(self._position_candidates))
 
-    def _test_history_matches_track_with_offset(self, offset: int, counting_direction: int) -> bool:
+    def _get_matching_candidates(self, piece: int) -> set[Tuple[int, int]]:
         """
-        Test whether the piece history matches the track at every point when using a certain offset.
-        Missing pieces in the piece history are ignored and considered matching
+        Gets the candidates for the position on the track that are consistent with the piece at the current history
+        position and all entries in the history before
         """
         track_len = self._track.get_len()
-        for i in range(0, track_len):
-            track_index: int
-            track_index = (i * counting_direction + offset) % track_len
-            track_piece, _ = self._track.get_entry_tupel(track_index)
-            history_id: int | None
-            history_id = self._piece_history[i]
-            if history_id is not None and track_piece.get_physical_id() != self._piece_history[i]:
-                return False
-        return True
+        history_position = self._piece_history.get_position()
+        if self._position_candidates is None:
+            # every piece with the ID is a possible position in both counting directions
+            candidates: set[Tuple[int, int]] = set()
+            for track_index in self._track.get_indices_of_physical_piece(piece):
+                candidates.add(((track_index - history_position) % track_len, 1))
+                candidates.add(((track_index + history_position) % track_len, -1))
+            return candidates
+
+        return {(offset, counting_direction) for offset, counting_direction in self._position_candidates
+                if self._track.get_entry_tupel((offset + counting_direction * history_position) % track_len)[0]
+                .get_physical_id() == piece}
 
     def notify_new_track(self, new_track: FullTrack) -> None:
         super().notify_new_track(new_track)
+        # the learned lengths belong to the old track
+        self._length_calibration = PieceLengthCalibration()
         self._reset_piece_history()
+        self._motion_estimator.reset()
+        self._last_transition = None
+        self._anchor = None
         return
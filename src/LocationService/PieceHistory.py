@@ -0,0 +1,95 @@
+from array import array
+
+
+class PieceHistory:
+    """
+    Fixed-size ring buffer with one slot per piece of the track that stores the physical IDs a car reported. The
+    current position moves one slot for every transition, so after a full lap the same slots are used again.
+
+    Clearing the buffer and mirroring it (when it turns out the car counts in the opposite direction) don't touch
+    the stored entries, so both only take constant time: entries of an older generation are ignored and mirroring
+    only changes the direction the slots are addressed in.
+    """
+
+    def __init__(self, size: int):
+        """
+        Parameters
+        ----------
+        size: int
+            Amount of slots. This should be the amount of pieces of the track
+        """
+        if size <= 0:
+            raise ValueError(f"The size has to be positive but is {size}")
+        self._size: int = size
+        self._position: int = 0
+        # 1 or -1. Slots are addressed with position * direction
+        self._direction: int = 1
+        self._entries: list[int | None] = [None] * size
+        # generation in which every slot was written. Only entries of the current generation are valid
+        self._generations: array = array('l', [0] * size)
+        self._generation: int = 1
+        self._entry_count: int = 0
+
+    def get_size(self) -> int:
+        """
+        Gets the amount of slots
+        """
+        return self._size
+
+    def get_position(self) -> int:
+        """
+        Gets the current position. It's always between 0 and the size
+        """
+        return self._position
+
+    def get_entry_count(self) -> int:
+        """
+        Gets the amount of slots that have an entry
+        """
+        return self._entry_count
+
+    def advance(self, steps: int) -> None:
+        """
+        Moves the current position by the given amount of slots. Negative values move backwards
+        """
+        self._position = (self._position + steps) % self._size
+
+    def get(self, position: int) -> int | None:
+        """
+        Gets the entry at a position or None, if there is none
+        """
+        slot = (position * self._direction) % self._size
+        if self._generations[slot] != self._generation:
+            return None
+        return self._entries[slot]
+
+    def get_current(self) -> int | None:
+        """
+        Gets the entry at the current position or None, if there is none
+        """
+        return self.get(self._position)
+
+    def set_current(self, physical_id: int) -> None:
+        """
+        Stores an entry at the current position
+        """
+        slot = (self._position * self._direction) % self._size
+        if self._generations[slot] != self._generation:
+            self._generations[slot] = self._generation
+            self._entry_count += 1
+        self._entries[slot] = physical_id
+
+    def clear(self) -> None:
+        """
+        Removes all entries. The current position stays the same
+        """
+        self._generation += 1
+        self._entry_count = 0
+
+    def mirror(self) -> None:
+        """
+        Mirrors the history, so the entry at a position is afterwards at the negated position (modulo the size).
+        This is needed when the direction the positions are counted in is inverted
+        """
+        self._direction *= -1
+        self._position = -self._position % self._size
@@ -0,0 +1,84 @@
+import Constants
+from LocationService.RunningAverages import RunningAverages
+
+# lanes that are learned separately, as multiples of the lane width
+_LANES: range = range(-3, 4)
+# amount of samples of a lane until its factor is used
+MIN_SAMPLES: int = 3
+# samples that differ more from the nominal length are caused by something else (e.g. the car was lifted)
+_MAX_DEVIATION: float = 0.5
+
+
+class PieceLengthCalibration(RunningAverages[tuple[int, int]]):
+    """
+    Effective lengths of the pieces of a track learned from physical cars. The real pieces and the paths the cars
+    drive on them differ from the nominal lengths the track is built with. For every piece and lane the ratio of the
+    measured to the nominal length is learned from the time a car needed for the piece and the speed it reported.
+    All physical cars on the same track share the calibration, so every car contributes to it.
+    """
+
+    def __init__(self, factors: dict[tuple[int, int], tuple[float, int]] | None = None):
+        """
+        Parameters
+        ----------
+        factors: dict[tuple[int, int], tuple[float, int]] | None
+            Learned values for every piece index and lane: the ratio of the effective to the nominal length and the
+            amount of samples
+        """
+        super().__init__(factors)
+
+    def add_sample(self, index: int, offset: float, measured_length: float, nominal_length: float) -> bool:
+        """
+        Learns from a measured length of a piece
+
+        Parameters
+        ----------
+        index: int
+            Index of the piece in the track
+        offset: float
+            Offset in mm the piece was driven with
+        measured_length: float
+            Length in mm that was measured (e.g. time on the piece multiplied with the reported speed)
+        nominal_length: float
+            Length in mm of the piece with the offset according to the track
+
+        Returns
+        -------
+        bool
+            Whether the sample was used. Samples that are too far off from the nominal length are ignored
+        """
+        if nominal_length <= 0:
+            return False
+        ratio = measured_length / nominal_length
+        if abs(ratio - 1) > _MAX_DEVIATION:
+            return False
+        self._add_sample((index, _get_lane(offset)), ratio)
+        return True
+
+    def get_factor(self, index: int, offset: float) -> float:
+        """
+        Gets the ratio of the effective to the nominal length of a piece for the lane closest to the offset. It's 1
+        until the lane has `MIN_SAMPLES` samples
+        """
+        key = (index, _get_lane(offset))
+        if self._sample_counts.get(key, 0) < MIN_SAMPLES:
+            return 1
+        return self._averages[key]
+
+    @staticmethod
+    def _encode_key(key: tuple[int, int]) -> str:
+        # the piece index and the lane separated by a colon
+        return f'{key[0]}:{key[1]}'
+
+    @staticmethod
+    def _decode_key(key: str) -> tuple[int, int]:
+        index, lane = key.split(':')
+        return int(index), int(lane)
+
+
+def _get_lane(offset: float) -> int:
+    """
+    Gets the lane closest to the offset
+    """
+    lane = round(offset / Constants.TRACK_LANE_WIDTH)
+    return min(max(lane, _LANES.start), _LANES.stop - 1)
@@ -0,0 +1,90 @@
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Generic, TypeVar
+
+# smallest weight of a new sample, so the averages keep adapting after a lot of samples (e.g. to the battery level)
+_MIN_SAMPLE_WEIGHT: float = 0.05
+
+K = TypeVar('K', int, tuple[int, int])
+
+
+class RunningAverages(ABC, Generic[K]):
+    """
+    Base of values that are learned from samples separately for every key (e.g. a speed range). Every key gets the
+    average of all its samples at first and an exponential moving average afterwards, so it keeps adapting to
+    changes. The values can be converted to a dictionary that can be stored as JSON.
+
+    Subclasses define how a key is converted to a string and back with `_encode_key` and `_decode_key`.
+    """
+
+    def __init__(self, values: dict[K, tuple[float, int]] | None = None):
+        """
+        Parameters
+        ----------
+        values: dict[K, tuple[float, int]] | None
+            Learned values for every key: the average and the amount of samples
+        """
+        self._averages: dict[K, float] = dict()
+        self._sample_counts: dict[K, int] = dict()
+        if values is not None:
+            for key, (average, sample_count) in values.items():
+                self._averages[key] = float(average)
+                self._sample_counts[key] = int(sample_count)
+        self._sorted_keys: list[K] = sorted(self._averages.keys())
+        self._on_update_callbacks: list[Callable[[Any], None]] = list()
+
+    def add_on_update_callback(self, callback: Callable[[Any], None]) -> None:
+        """
+        Adds a function that is called with this object every time a sample was added
+        """
+        self._on_update_callbacks.append(callback)
+
+    def get_sample_count(self) -> int:
+        """
+        Gets the amount of samples that were learned from
+        """
+        return sum(self._sample_counts.values())
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Converts the values to a dictionary that can be stored as JSON
+        """
+        return {self._encode_key(key): [self._averages[key], self._sample_counts[key]] for key in self._sorted_keys}
+
+    @classmethod
+    def from_dict(cls, values_dict: dict[str, Any]) -> Any:
+        """
+        Creates the values from a dictionary created by `to_dict`. Raises a ValueError, TypeError or IndexError, if
+        the dictionary is invalid
+        """
+        return cls({cls._decode_key(key): (float(values[0]), int(values[1])) for key, values in values_dict.items()})
+
+    def _add_sample(self, key: K, value: float) -> None:
+        """
+        Adds a sample to the average of the key and calls the update callbacks
+        """
+        sample_count = self._sample_counts.get(key, 0) + 1
+        self._sample_counts[key] = sample_count
+        if sample_count == 1:
+            self._averages[key] = value
+            self._sorted_keys = sorted(self._averages.keys())
+        else:
+            weight = max(1 / sample_count, _MIN_SAMPLE_WEIGHT)
+            self._averages[key] += weight * (value - self._averages[key])
+        for callback in self._on_update_callbacks:
+            callback(self)
+
+    @staticmethod
+    @abstractmethod
+    def _encode_key(key: K) -> str:
+        """
+        Converts a key to the string it's stored with in the dictionary of `to_dict`
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    @abstractmethod
+    def _decode_key(key: str) -> K:
+        """
+        Converts a string created by `_encode_key` back to the key. Raises a ValueError, if the string is invalid
+        """
+        raise NotImplementedError
@@ -0,0 +1,69 @@
+from bisect import bisect_left
+
+from LocationService.RunningAverages import RunningAverages
+
+# width in mm/s of the speed ranges that are learned separately
+BIN_WIDTH: int = 100
+
+
+class SpeedProfile(RunningAverages[int]):
+    """
+    Calibration of a physical car that maps the speed it reports to the speed it really drives. Cars differ in their
+    motors, tires and the way they measure their speed, so every car gets its own profile.
+
+    The reported speeds are divided into ranges of `BIN_WIDTH`. For every range the average ratio of the real speed
+    to the reported speed is learned. Speeds between the centers of two ranges are interpolated, speeds outside the
+    learned ranges use the ratio of the closest one.
+    """
+
+    def __init__(self, ratios: dict[int, tuple[float, int]] | None = None):
+        """
+        Parameters
+        ----------
+        ratios: dict[int, tuple[float, int]] | None
+            Learned values for every index of a speed range: the ratio and the amount of samples
+        """
+        super().__init__(ratios)
+
+    def add_sample(self, reported_speed: float, actual_speed: float) -> None:
+        """
+        Learns from a measured speed
+
+        Parameters
+        ----------
+        reported_speed: float
+            Speed in mm/s the car reported
+        actual_speed: float
+            Speed in mm/s the car really drove with (e.g. from `MotionEstimator`)
+        """
+        if reported_speed <= 0 or actual_speed < 0:
+            return
+        self._add_sample(int(reported_speed // BIN_WIDTH), actual_speed / reported_speed)
+
+    def get_actual_speed(self, reported_speed: float) -> float | None:
+        """
+        Gets the speed the car really drives with when it reports the given speed or None, if nothing was learned yet
+        """
+        ranges = self._sorted_keys
+        if len(ranges) == 0:
+            return None
+        # position of the speed in units of ranges, relative to the center of the first range
+        position = reported_speed / BIN_WIDTH - 0.5
+        index = bisect_left(ranges, position)
+        if index == 0:
+            ratio = self._averages[ranges[0]]
+        elif index == len(ranges):
+            ratio = self._averages[ranges[-1]]
+        else:
+            lower, upper = ranges[index - 1], ranges[index]
+            fraction = (position - lower) / (upper - lower)
+            ratio = self._averages[lower] + (self._averages[upper] - self._averages[lower]) * fraction
+        return reported_speed * ratio
+
+    @staticmethod
+    def _encode_key(key: int) -> str:
+        return str(key)
+
+    @staticmethod
+    def _decode_key(key: str) -> int:
+        return int(key)
@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import Tuple, Any
+from bisect import bisect_left, bisect_right
+import math
+from typing import Tuple, Any, Sequence
 
+import Constants
+from LocationService.BakedTrack import BakedTrack
 from LocationService.Trigo import Position, Angle, Distance
 
 from enum import Enum
@@ -51,6 +55,9 @@ class TrackPiece(ABC):
     def get_physical_id(self) -> int | None:
         return self._physical_id
 
+    def get_rotation(self) -> Angle:
+        return self._rotation
+
     def __eq__(self, other: 'TrackPiece'):
         return type(self) == type(other) \
             and self._rotation == other._rotation \
@@ -70,6 +77,14 @@ class TrackPiece(ABC):
         """
         raise NotImplementedError
 
+    def get_position_xy(self, progress: float, offset: float) -> Tuple[float, float]:
+        """
+        Gets the position relative to the center of the track piece for a progress on the piece as tuple of x and
+        y. Pieces should override this to avoid creating Position objects in the simulation
+        """
+        _, position = self.process_update(progress, 0, offset)
+        return position.get_as_tuple()
+
     @abstractmethod
     def get_used_space_horiz(self) -> float:
         """
@@ -178,23 +193,28 @@ class TrackEntry():
 class FullTrack():
     """
     Class that represents an entire track. The upper left corner of the upper left
-    track piece is at the coordinate 0, 0. All units are in mm.
+    track piece is at the coordinate 0, 0. All units are in mm. A track doesn't change
+    after it's built, so one object can be shared by all vehicles.
     """
-    def __init__(self, pieces: list[TrackPiece]):
-        self.track_entries: list[TrackEntry] = list()
+    def __init__(self, pieces: list[TrackPiece], tables: dict[str, Any] | None = None):
+        """
+        Builds the track out of the pieces. tables can contain the result of `get_tables` of the same track to
+        not calculate them again
+        """
+        track_entries: list[TrackEntry] = list()
         offset = Position(0, 0)
         last_piece = pieces[0]
-        self.track_entries.append(TrackEntry(last_piece, offset.clone()))
+        track_entries.append(TrackEntry(last_piece, offset.clone()))
         for piece in pieces[1:]:
             offset += last_piece.get_outgoing_offset()
             offset += piece.get_incoming_offset()
             last_piece = piece
-            self.track_entries.append(TrackEntry(last_piece, offset.clone()))
+            track_entries.append(TrackEntry(last_piece, offset.clone()))
 
         # this section is here to move the top left corner of the top left piece to (0, 0)
         min_x = 0
         min_y = 0
-        for entry in self.track_entries:
+        for entry in track_entries:
             piece = entry.get_piece()
             offset = entry.get_global_offset()
             local_x = offset.get_x() - piece.get_used_space_horiz() / 2
@@ -206,8 +226,65 @@ class FullTrack():
         change_x = abs(min_x)
         change_y = abs(min_y)
 
-        for entry in self.track_entries:
+        for entry in track_entries:
             entry.get_global_offset().add_offset(change_x, change_y)
+        # the track is shared between all vehicles and must not change anymore
+        self.track_entries: tuple[TrackEntry, ...] = tuple(track_entries)
+
+        # The length of every piece is linear in the offset (straight pieces have a constant length and curves
+        # change by pi/2 per mm of offset). That's why the distance from the start of the track to the start of
+        # every piece is stored as base + slope * offset, which is exact for every offset and not only for lanes.
+        self._cumulative_length_base: Sequence[float]
+        self._cumulative_length_slope: Sequence[float]
+        if tables is not None:
+            self._cumulative_length_base = tables['cumulative_length_base']
+            self._cumulative_length_slope = tables['cumulative_length_slope']
+        else:
+            self._cumulative_length_base = [0]
+            self._cumulative_length_slope = [0]
+            for entry in self.track_entries:
+                piece = entry.get_piece()
+                base_length = piece.get_length(0)
+                self._cumulative_length_base.append(self._cumulative_length_base[-1] + base_length)
+                self._cumulative_length_slope.append(self._cumulative_length_slope[-1]
+                                                     + piece.get_length(1) - base_length)
+
+        # The track doesn't change after it's built, so everything that is looked up often is calculated once here
+        self._physical_id_indices: dict[int, list[int]] = dict()
+        self._lane_lengths: list[dict[float, float]] = list()
+        self._bounding_boxes: list[Tuple[float, float, float, float]] = list()
+        self._html_list: list[dict[str, dict[str, Any]]] = list() if tables is None else tables['html_list']
+        self._json_list: list[dict[str, Any]] = list()
+        lane_offsets = [Constants.TRACK_LANE_WIDTH * lane for lane in range(-3, 4)]
+        max_vert: float = 0
+        max_horiz: float = 0
+        for index, entry in enumerate(self.track_entries):
+            piece = entry.get_piece()
+            offset = entry.get_global_offset()
+            physical_id = piece.get_physical_id()
+            if physical_id is not None:
+                self._physical_id_indices.setdefault(physical_id, list()).append(index)
+            self._lane_lengths.append({lane_offset: piece.get_length(lane_offset) for lane_offset in lane_offsets})
+            half_horiz = piece.get_used_space_horiz() / 2
+            half_vert = piece.get_used_space_vert() / 2
+            self._bounding_boxes.append((offset.get_x() - half_horiz, offset.get_y() - half_vert,
+                                         offset.get_x() + half_horiz, offset.get_y() + half_vert))
+            if tables is None:
+                self._html_list.append({
+                    'offset': offset.to_dict(),
+                    'piece': piece.to_html_dict()})
+            self._json_list.append(piece.to_json_dict())
+            # the names of the keys don't match the axes, but the map in the UI relies on them
+            max_vert = max(max_vert, half_vert + offset.get_x())
+            max_horiz = max(max_horiz, half_horiz + offset.get_y())
+        self._used_space: dict[str, float] = {
+            'used_space_vertically': max_vert,
+            'used_space_horizontally': max_horiz}
+        # baked representations of the track by their resolution. They are only created when they are needed
+        self._baked_tracks: dict[float, BakedTrack] = dict()
+        self._baked_track_tables: dict[float, dict[str, Any]] = dict()
+        if tables is not None:
+            self._baked_track_tables = tables['baked_tracks']
 
     def get_entry_tupel(self, num: int) -> Tuple[TrackPiece, Position]:
         """
@@ -222,49 +299,206 @@ class FullTrack():
         """
         return len(self.track_entries)
 
+    def get_distance_to_piece(self, index: int, offset: float) -> float:
+        """
+        Gets the distance driven from the start of the first piece to the start of the piece with the given
+        index when driving with the given offset. The index may be the number of pieces to get the length of
+        the whole track
+        """
+        return self._cumulative_length_base[index] + self._cumulative_length_slope[index] * offset
+
+    def get_track_length(self, offset: float) -> float:
+        """
+        Gets the length of one lap when driving with the given offset
+        """
+        return self.get_distance_to_piece(self.get_len(), offset)
+
+    def to_arc_length(self, index: int, progress: float, offset: float) -> float:
+        """
+        Converts a position on the track (piece index and progress on the piece) to the arc length coordinate s,
+        which is the distance driven from the start of the first piece with the given offset
+        """
+        return self.get_distance_to_piece(index, offset) + progress
+
+    def from_arc_length(self, s: float, offset: float) -> Tuple[int, float]:
+        """
+        Converts the arc length coordinate s for the given offset back to the piece index and the progress on the
+        piece. Values outside of one lap are wrapped around and values exactly at the border of two pieces
+        belong to the later piece
+        """
+        track_len = self.get_len()
+        s %= self.get_track_length(offset)
+        index = bisect_right(range(0, track_len + 1), s, hi=track_len,
+                             key=lambda i: self.get_distance_to_piece(i, offset)) - 1
+        index = max(index, 0)
+        return index, s - self.get_distance_to_piece(index, offset)
+
+    def convert_arc_length(self, s: float, old_offset: float, new_offset: float) -> float:
+        """
+        Converts the arc length coordinate s from one offset to the equivalent position with another offset, so
+        positions of cars on different lanes can be compared
+        """
+        index, progress = self.from_arc_length(s, old_offset)
+        piece, _ = self.get_entry_tupel(index)
+        new_progress = piece.get_equivalent_progress_for_offset(old_offset, new_offset, progress)
+        return self.to_arc_length(index, new_progress, new_offset)
+
+    def get_forward_distance(self, s_from: float, s_to: float, offset: float) -> float:
+        """
+        Gets the distance that has to be driven in the default direction to get from s_from to s_to
+        """
+        return (s_to - s_from) % self.get_track_length(offset)
+
+    def get_signed_distance(self, s_from: float, s_to: float, offset: float) -> float:
+        """
+        Gets the shortest distance from s_from to s_to on the closed track. It's positive if s_to is ahead of
+        s_from in the default direction and negative if it's behind
+        """
+        lap_length = self.get_track_length(offset)
+        distance = (s_to - s_from) % lap_length
+        if distance > lap_length / 2:
+            distance -= lap_length
+        return distance
+
+    def get_distance_between(self, index_from: int, progress_from: float, index_to: int, progress_to: float,
+                             offset: float, direction: int = 1) -> float:
+        """
+        Gets the shortest distance from one position on the track (piece index and progress on the piece) to another
+        one in O(1) without visiting the pieces in between. On the same piece only the difference of the progress is
+        used, otherwise the shorter of the ways in and against the direction is used
+
+        Parameters
+        ----------
+        index_from: int
+            Index of the piece of the position to start from
+        progress_from: float
+            Progress on the piece of the position to start from
+        index_to: int
+            Index of the piece of the other position
+        progress_to: float
+            Progress on the piece of the other position
+        offset: float
+            Offset used for both positions
+        direction: int
+            1 for the default driving direction and -1 for the opposing one
+
+        Returns
+        -------
+        float
+            The distance. It's positive if the other position is ahead in the given direction and negative if it's
+            behind
+        """
+        distance = (self.to_arc_length(index_to, progress_to, offset)
+                    - self.to_arc_length(index_from, progress_from, offset)) * direction
+        if index_from == index_to:
+            return distance
+        lap_length = self.get_track_length(offset)
+        # distance when driving from piece to piece in the direction
+        if (index_to - index_from) * direction < 0:
+            distance += lap_length
+        # prefer it over the way against the direction if both are equally long
+        if abs(distance) > abs(distance - lap_length):
+            return distance - lap_length
+        return distance
+
+    def move_along(self, index: int, progress: float, distance: float, offset: float) -> Tuple[int, float]:
+        """
+        Moves a position (piece index and progress on the piece) along the track without visiting the pieces in
+        between. A positive distance moves in the default direction, a negative distance in the opposing
+        direction. Ending exactly at the border of a piece keeps the position on the piece it was on before, just
+        like it's done by `TrackPiece.process_update`. Returns the new piece index and the progress on it
+        """
+        target = self.to_arc_length(index, progress, offset) + distance
+        if distance < 0:
+            return self.from_arc_length(target, offset)
+
+        track_len = self.get_len()
+        lap_length = self.get_track_length(offset)
+        if target > lap_length:
+            target -= math.ceil(target / lap_length - 1) * lap_length
+        new_index = bisect_left(range(0, track_len + 1), target, lo=1,
+                                key=lambda i: self.get_distance_to_piece(i, offset)) - 1
+        new_index = min(new_index, track_len - 1)
+        return new_index, target - self.get_distance_to_piece(new_index, offset)
+
+    def get_piece_length(self, index: int, offset: float) -> float:
+        """
+        Gets the length of the piece with the given index when driving with the given offset. The lengths on the
+        lanes are taken from a table, other offsets (e.g. while changing lanes) are calculated
+        """
+        length = self._lane_lengths[index].get(offset)
+        if length is None:
+            piece, _ = self.get_entry_tupel(index)
+            return piece.get_length(offset)
+        return length
+
+    def get_bounding_box(self, index: int) -> Tuple[float, float, float, float]:
+        """
+        Gets the space the piece with the given index covers on the global field as tuple of the minimal x, minimal
+        y, maximal x and maximal y value
+        """
+        return self._bounding_boxes[index]
+
+    def get_baked_track(self, resolution: float) -> BakedTrack:
+        """
+        Gets a representation of the track that allows looking up positions instead of calculating them (see
+        `BakedTrack`). It's created on the first call for every resolution and shared afterwards
+        """
+        baked_track = self._baked_tracks.get(resolution)
+        if baked_track is None:
+            baked_track = BakedTrack(self, resolution, self._baked_track_tables.get(resolution))
+            self._baked_tracks[resolution] = baked_track
+        return baked_track
+
+    def get_tables(self) -> dict[str, Any]:
+        """
+        Gets the precalculated data of the track that can be passed to the constructor to build the same track
+        again without calculating it. This includes the baked tracks that were created so far
+        """
+        baked_tracks = dict(self._baked_track_tables)
+        for resolution, baked_track in self._baked_tracks.items():
+            baked_tracks[resolution] = baked_track.get_tables()
+        return {
+            'cumulative_length_base': self._cumulative_length_base,
+            'cumulative_length_slope': self._cumulative_length_slope,
+            'html_list': self._html_list,
+            'baked_tracks': baked_tracks}
+
     def get_as_list(self) -> list[dict[str, dict[str, Any]]]:
         """
         Get's the offsets and pieces as list of dicts. Try preferring other
-        functions if possible for type safety!
+        functions if possible for type safety! The list is created once and shared
+        between all callers, so it must not be modified
         """
-        l: list[dict[str, dict[str, Any]]] = []
-        for entry in self.track_entries:
-            piece = entry.get_piece()
-            offset = entry.get_global_offset()
-            l.append({
-                'offset': offset.to_dict(),
-                'piece': piece.to_html_dict()})
+        return self._html_list
 
-        return l
+    def get_as_json_list(self) -> list[dict[str, Any]]:
+        """
+        Gets the pieces as list of dicts like they are stored in the configuration. The list is created once and
+        shared between all callers, so it must not be modified
+        """
+        return self._json_list
 
     def contains_physical_piece(self, physical_id: int) -> bool:
         """
         Returns whether the track contains a piece with the given physical ID
         """
-        for i in range(0, self.get_len()):
-            piece: TrackPiece = self.track_entries[i].get_piece()
-            if piece.get_physical_id() == physical_id:
-                return True
-        return False
+        return physical_id in self._physical_id_indices
+
+    def get_indices_of_physical_piece(self, physical_id: int) -> list[int]:
+        """
+        Gets the indices of all pieces with the given physical ID in ascending order. Physical IDs can be used
+        multiple times in a track (e.g. for identical curves), so there may be more than one index. The list must
+        not be modified
+        """
+        return self._physical_id_indices.get(physical_id, [])
 
-    def get_used_space_as_dict(self) -> dict[str, int]:
+    def get_used_space_as_dict(self) -> dict[str, float]:
         """
         Returns a dict with the used horizontal and vertical space. The keys are
         `used_space_vertically` and `used_space_horizontally`
         """
-        max_vert: int = 0
-        max_horiz: int = 0
-        for entry in self.track_entries:
-            piece = entry.get_piece()
-            offset = entry.get_global_offset()
-            local_max_x = piece.get_used_space_vert() / 2 + offset.get_x()
-            local_max_y = piece.get_used_space_horiz() / 2 + offset.get_y()
-            max_vert = max(max_vert, local_max_x)
-            max_horiz = max(max_horiz, local_max_y)
-
-        return {
-            'used_space_vertically': max_vert,
-            'used_space_horizontally': max_horiz}
+        return dict(self._used_space)
 
     def __eq__(self, other: 'FullTrack'):
         if type(self) != type(other):  # noqa: E721
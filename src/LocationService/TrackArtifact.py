@@ -0,0 +1,181 @@
+"""
+Binary file that contains a track together with the expensive tables that are calculated for it (cumulative lengths,
+baked tracks and the representation for the car map), so loading a track doesn't need to bake it again. The pieces
+are still constructed from their JSON representation and `FullTrack` still calculates the cheap per piece data (global
+offsets, lane lengths, bounding boxes and the index of the physical IDs) in O(n). The JSON format of
+`TrackSerialization` stays the format for the configuration, import and export. The artifact is only a cache for it:
+it contains a checksum of the JSON representation and is ignored if it doesn't match.
+
+Layout of the file (little endian):
+    header: magic, format version, SHA-256 checksum of the track, length of the metadata
+    metadata: JSON with the pieces, the car map representation and the position of all arrays in the file
+    arrays: the numeric tables, each one aligned to 8 bytes
+
+The arrays are memory mapped and used without copying them.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+from array import array
+from typing import Any, Sequence
+
+from LocationService.BakedTrack import DEFAULT_RESOLUTION
+from LocationService.Track import FullTrack
+from LocationService.TrackSerialization import construct_piece_from_dict, PieceDecodingException
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION: int = 1
+_MAGIC: bytes = b'IAVTRACK'
+_HEADER: struct.Struct = struct.Struct('<8sH32sI')
+_ALIGNMENT: int = 8
+
+
+def get_track_checksum(track_list: list[dict[str, Any]]) -> bytes:
+    """
+    Calculates the checksum of a track in the JSON representation of `TrackSerialization`
+    """
+    serialized = json.dumps(track_list, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(serialized.encode('utf-8')).digest()
+
+
+def write_track_artifact(file: str, track: FullTrack,
+                         baked_track_resolutions: Sequence[float] = (DEFAULT_RESOLUTION,)) -> None:
+    """
+    Writes the track with all its tables to a file. The track is baked with the given resolutions, if that didn't
+    happen yet. The file is replaced atomically, so a reader never sees a partially written file
+    """
+    for resolution in baked_track_resolutions:
+        track.get_baked_track(resolution)
+    tables = track.get_tables()
+
+    data = bytearray()
+    array_positions: dict[str, tuple[int, int, str]] = dict()
+
+    def add_array(name: str, values: Sequence[Any], typecode: str) -> None:
+        data.extend(bytes(-len(data) % _ALIGNMENT))
+        array_positions[name] = (len(data), len(values), typecode)
+        data.extend(array(typecode, values).tobytes())
+
+    add_array('cumulative_length_base', tables['cumulative_length_base'], 'd')
+    add_array('cumulative_length_slope', tables['cumulative_length_slope'], 'd')
+    baked_tracks: list[dict[str, Any]] = list()
+    for resolution, baked_tables in tables['baked_tracks'].items():
+        prefix = f'baked_{len(baked_tracks)}_'
+        add_array(prefix + 'segment_counts', baked_tables['segment_counts'], 'q')
+        for name in ['x', 'y', 'headings']:
+            add_array(prefix + name, baked_tables[name], 'd')
+        baked_tracks.append({
+            'resolution': resolution,
+            'prefix': prefix,
+            'error_bound': baked_tables['error_bound'],
+            'heading_error_bound': baked_tables['heading_error_bound']})
+
+    track_list = track.get_as_json_list()
+    metadata = json.dumps({
+        'pieces': track_list,
+        'html_list': tables['html_list'],
+        'baked_tracks': baked_tracks,
+        'arrays': array_positions}).encode('utf-8')
+    # the arrays start at an aligned position after the metadata
+    metadata += b' ' * (-(_HEADER.size + len(metadata)) % _ALIGNMENT)
+    header = _HEADER.pack(_MAGIC, FORMAT_VERSION, get_track_checksum(track_list), len(metadata))
+
+    temporary_file = file + '.tmp'
+    with open(temporary_file, 'wb') as output:
+        output.write(header)
+        output.write(metadata)
+        output.write(data)
+    os.replace(temporary_file, file)
+
+
+def load_track_artifact(file: str, checksum: bytes | None = None) -> FullTrack | None:
+    """
+    Loads a track from an artifact file. If the file doesn't exist, is damaged, has another format version or
+    doesn't match the checksum (see `get_track_checksum`), None is returned and the track has to be parsed from
+    JSON instead
+    """
+    try:
+        with open(file, 'rb') as input_file:
+            mapped = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        logger.debug("Couldn't open the track artifact %s: %s", file, e)
+        return None
+
+    track: FullTrack | None = None
+    # all views on the mapping, so it can be closed if the track isn't used
+    views: list[memoryview] = list()
+    try:
+        metadata = _read_metadata(file, mapped, checksum)
+        if metadata is not None:
+            track = _construct_track(mapped, metadata, views)
+    except (ValueError, TypeError, KeyError, IndexError, struct.error, PieceDecodingException) as e:
+        logger.warning("The track artifact %s is damaged. Ignoring it: %s", file, e)
+    finally:
+        # the arrays of a loaded track use the mapping, otherwise it isn't needed anymore
+        if track is None:
+            for view in reversed(views):
+                view.release()
+            mapped.close()
+    return track
+
+
+def _read_metadata(file: str, mapped: mmap.mmap, checksum: bytes | None) -> dict[str, Any] | None:
+    """
+    Checks the header of the artifact and reads the metadata. Returns None, if the format or the checksum doesn't
+    match
+    """
+    magic, version, file_checksum, metadata_length = _HEADER.unpack_from(mapped)
+    if magic != _MAGIC or version != FORMAT_VERSION:
+        logger.info("The track artifact %s has an unsupported format. Ignoring it", file)
+        return None
+    if checksum is not None and file_checksum != checksum:
+        logger.info("The track artifact %s doesn't match the track. Ignoring it", file)
+        return None
+    metadata = json.loads(mapped[_HEADER.size:_HEADER.size + metadata_length])
+    metadata['data_start'] = _HEADER.size + metadata_length
+    return metadata
+
+
+def _construct_track(mapped: mmap.mmap, metadata: dict[str, Any], views: list[memoryview]) -> FullTrack:
+    """
+    Constructs the track from its pieces with the arrays of the artifact without copying them. All created views are
+    added to `views`
+    """
+    view = memoryview(mapped)
+    views.append(view)
+
+    def get_array(name: str) -> Sequence[Any]:
+        position, count, typecode = metadata['arrays'][name]
+        start = metadata['data_start'] + position
+        array_view = view[start:start + count * struct.calcsize(typecode)].cast(typecode)
+        views.append(array_view)
+        return array_view
+
+    baked_tracks: dict[float, dict[str, Any]] = dict()
+    for baked_track in metadata['baked_tracks']:
+        prefix = baked_track['prefix']
+        baked_tracks[baked_track['resolution']] = {
+            'segment_counts': get_array(prefix + 'segment_counts'),
+            'x': get_array(prefix + 'x'),
+            'y': get_array(prefix + 'y'),
+            'headings': get_array(prefix + 'headings'),
+            'error_bound': baked_track['error_bound'],
+            'heading_error_bound': baked_track['heading_error_bound']}
+    pieces = [construct_piece_from_dict(piece_dict) for piece_dict in metadata['pieces']]
+    cumulative_length_base = get_array('cumulative_length_base')
+    cumulative_length_slope = get_array('cumulative_length_slope')
+    if len(cumulative_length_base) != len(pieces) + 1 or len(cumulative_length_slope) != len(pieces) + 1:
+        raise ValueError("The cumulative lengths don't match the pieces")
+    track = FullTrack(pieces, tables={
+        'cumulative_length_base': cumulative_length_base,
+        'cumulative_length_slope': cumulative_length_slope,
+        'html_list': metadata['html_list'],
+        'baked_tracks': baked_tracks})
+    # the baked tracks check whether their tables match the track
+    for resolution in baked_tracks.keys():
+        track.get_baked_track(resolution)
+    return track
@@ -77,10 +77,10 @@ class StraightPiece(TrackPiece):
             left = end
             end = 0
 
-        endposition = Position(-offset, self._length / 2 - end)
-        endposition.rotate_around_0_0(self._rotation)
+        return (left, Position(*self.get_position_xy(end, offset)))
 
-        return (left, endposition)
+    def get_position_xy(self, progress: float, offset: float) -> Tuple[float, float]:
+        return self._rotation.rotate_xy(-offset, self._length / 2 - progress)
 
     def get_length(self, offset: float) -> float:
         return self._length
@@ -134,6 +134,12 @@ class CurvedPiece(TrackPiece):
         self._diameter = diameter
         self._is_mirrored = mirror
 
+    def get_radius(self) -> float:
+        return self._radius
+
+    def is_mirrored(self) -> bool:
+        return self._is_mirrored
+
     def get_used_space_horiz(self) -> float:
         return self._size
 
@@ -227,17 +233,22 @@ class CurvedPiece(TrackPiece):
         elif end <= 0:
             left = end
             end = 0
-        progress = end / travel_len
-        angle = Angle(progress * 90)
+        return (left, Position(*self._get_position_xy_for_length(end, offset, travel_len)))
+
+    def get_position_xy(self, progress: float, offset: float) -> Tuple[float, float]:
+        return self._get_position_xy_for_length(progress, offset, self.get_length(offset))
+
+    def _get_position_xy_for_length(self, progress: float, offset: float, travel_len: float) -> Tuple[float, float]:
+        # the angle changes with every update, so it's calculated directly instead of creating an Angle
+        rad = math.radians(progress / travel_len * 90)
         if self._is_mirrored:
             offset *= -1
         distance_to_middle = self._radius + offset
-        position = Position(distance_to_middle * angle.get_x_mult(), distance_to_middle * angle.get_y_mult())
-        position.add_offset(-self._size / 2, -self._size / 2)
+        x = distance_to_middle * math.cos(rad) - self._size / 2
+        y = distance_to_middle * math.sin(rad) - self._size / 2
         if self._is_mirrored:
-            position = Position(position.get_y() * -1, position.get_x() * -1)
-        position.rotate_around_0_0(self._rotation)
-        return (left, position)
+            x, y = -y, -x
+        return self._rotation.rotate_xy(x, y)
 
     def get_length(self, offset: float) -> float:
         if self._is_mirrored:
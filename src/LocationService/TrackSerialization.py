@@ -12,11 +12,7 @@ def full_track_to_list_of_dicts(track: FullTrack) -> list[dict[str, Any]]:
     """
     Converts a track to a list that consists of dictionaries that each represent a track piece
     """
-    ret: list[dict[str, Any]] = list()
-    for entry in track.track_entries:
-        piece = entry.get_piece()
-        ret.append(piece.to_json_dict())
-    return ret
+    return list(track.get_as_json_list())
 
 
 def parse_list_of_dicts_to_full_track(input_list: list[dict[str, Any]]) -> FullTrack | None:
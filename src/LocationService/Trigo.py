@@ -1,42 +1,80 @@
 import math
 
+try:
+    import numpy as np
+except ImportError:
+    # numpy is optional and only needed for the batch functions at the end of this module
+    np = None
+
 
 class Angle():
     """
-    Generic class for angles where 0° means the Angle is pointing up/north
+    Generic class for angles where 0° means the Angle is pointing up/north. Angles are immutable, so the sinus
+    and cosinus are only calculated once when the angle is created. Multiples of 90° are detected and use exact
+    values, so rotations of track pieces don't suffer from rounding errors.
     """
+    # sinus and cosinus for the angles that are multiples of 90°
+    _CARDINAL_SIN_COS: dict[float, tuple[float, float]] = {0: (0.0, 1.0), 90: (1.0, 0.0), 180: (0.0, -1.0),
+                                                           270: (-1.0, 0.0)}
+
     def __init__(self, degree: float = 0.0):
-        self.set_deg(degree)
+        self._angle_degree: float = degree
+        normalized = degree % 360
+        cardinal = self._CARDINAL_SIN_COS.get(normalized)
+        if cardinal is not None:
+            self._sin, self._cos = cardinal
+            self._quarter_turns: int | None = int(normalized) // 90
+        else:
+            rad = math.radians(degree)
+            self._sin = math.sin(rad)
+            self._cos = math.cos(rad)
+            self._quarter_turns = None
 
     def get_sin(self) -> float:
         """
         Gets the sinus of the value
         """
-        return math.sin(math.radians(self._angle_degree))
+        return self._sin
 
     def get_cos(self) -> float:
         """
         Gets the cosinus of the value
         """
-        return math.cos(math.radians(self._angle_degree))
+        return self._cos
 
     def get_x_mult(self):
         """
         Gets the cosinus value (usually used for multiplications with x)
         """
-        return self.get_cos()
+        return self._cos
 
     def get_y_mult(self):
         """
         Gets the sinus value (usually used for multiplications with y)
         """
-        return self.get_sin()
+        return self._sin
 
-    def set_deg(self, degree: float):
+    def rotate_xy(self, x: float, y: float) -> tuple[float, float]:
+        """
+        Rotates the point (x, y) around (0, 0) by this angle and returns the rotated coordinates
+        """
+        match self._quarter_turns:
+            case 0:
+                return x, y
+            case 1:
+                return -y, x
+            case 2:
+                return -x, -y
+            case 3:
+                return y, -x
+            case _:
+                return x * self._cos - y * self._sin, x * self._sin + y * self._cos
+
+    def get_quarter_turns(self) -> int | None:
         """
-        Sets the degree value
+        Gets how many quarter turns (0 to 3) the angle is, if it's a multiple of 90°. Otherwise None is returned
         """
-        self._angle_degree = degree
+        return self._quarter_turns
 
     def get_deg(self) -> float:
         """
@@ -56,8 +94,12 @@ class Angle():
 
 class Position():
     """
-    Generic Position in a 2 dimensional space
+    Generic Position in a 2 dimensional space. Positions are created for every car several times in every
+    simulation step, so hot paths should prefer the in-place (`set_xy`, `add_offset`) and tuple
+    (`get_as_tuple`, `distance_to_xy`, ...) variants over the operators that create new objects.
     """
+    __slots__ = ('_x', '_y')
+
     def __init__(self, x: float = 0.0, y: float = 0.0):
         self._x = x
         self._y = y
@@ -74,6 +116,13 @@ class Position():
         """
         self._y = y
 
+    def set_xy(self, x: float, y: float):
+        """
+        Sets the x and y value of the position
+        """
+        self._x = x
+        self._y = y
+
     def get_x(self) -> float:
         """
         Gets the x value
@@ -109,6 +158,12 @@ class Position():
         self._x += x
         self._y += y
 
+    def get_as_tuple(self) -> tuple[float, float]:
+        """
+        Gets the x and y value as tuple
+        """
+        return self._x, self._y
+
     def get_as_dict(self) -> dict[str, float]:
         """
         Gets the data represented as dict with the fields
@@ -120,10 +175,7 @@ class Position():
         """
         Rotates the point around (0, 0) based on 'rotation'
         """
-        new_x = self._x * rotation.get_cos() - self._y * rotation.get_sin()
-        new_y = self._x * rotation.get_sin() + self._y * rotation.get_cos()
-        self._x = new_x
-        self._y = new_y
+        self._x, self._y = rotation.rotate_xy(self._x, self._y)
 
     def __str__(self) -> str:
         """
@@ -136,21 +188,30 @@ class Position():
         Calculate angle from this point to another point. 0 degrees means the other
         point is above this point. A degree of 90 means the other point is right of this point
         """
-        pos = other - self
-        # yes atan2 takes y first and x second!
+        return Angle(self.calculate_angle_deg_to_xy(other._x, other._y))
+
+    def calculate_angle_deg_to_xy(self, x: float, y: float) -> float:
+        """
+        Same as `calculate_angle_to` for the point (x, y), but returns the degree value without creating any objects
+        """
+        # yes atan2 takes y first and x second! Like `other - self` this uses self - other as direction
         # the - 0.5 * math.pi is here because atan2 defines pointing right as 0 degree
-        rad = math.atan2(pos.get_y(), pos.get_x()) - 0.5 * math.pi
+        rad = math.atan2(self._y - y, self._x - x) - 0.5 * math.pi
         if rad < 0:
             rad += 2 * math.pi
-        deg = math.degrees(rad)
-        return Angle(deg)
+        return math.degrees(rad)
 
     def distance_to(self, other: 'Position') -> float:
         """
         Calculates the distance between this point and another point
         """
-        in_sqrt = math.pow(self.get_x() - other.get_x(), 2) + math.pow(self.get_y() - other.get_y(), 2)
-        return math.sqrt(in_sqrt)
+        return math.hypot(self._x - other._x, self._y - other._y)
+
+    def distance_to_xy(self, x: float, y: float) -> float:
+        """
+        Calculates the distance between this point and the point (x, y)
+        """
+        return math.hypot(self._x - x, self._y - y)
 
     def clone(self):
         """
@@ -169,4 +230,43 @@ class Distance(Position):
     """
     Class that represents a distance. It's the same as a point and only exists for clarity reasons
     """
-    pass
+    __slots__ = ()
+
+
+# ---------------------------------------------------------------------------------------------------------------
+# Batch geometry over numpy arrays. Points are arrays with the shape (N, 2) holding x and y. The conventions are the
+# same as for Position and Angle, so the results match the scalar functions.
+# ---------------------------------------------------------------------------------------------------------------
+def is_batch_geometry_available() -> bool:
+    """
+    Checks whether numpy is installed, which is required for the batch functions
+    """
+    return np is not None
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("The batch geometry functions require numpy to be installed")
+
+
+def positions_to_array(positions: list[Position]) -> 'np.ndarray':
+    """
+    Converts a list of positions to an array of points with the shape (N, 2)
+    """
+    _require_numpy()
+    points = np.empty((len(positions), 2))
+    for i, position in enumerate(positions):
+        points[i] = position._x, position._y
+    return points
+
+
+def pairwise_distances(first: 'np.ndarray', second: 'np.ndarray') -> 'np.ndarray':
+    """
+    Calculates the distances between all points of the first array (N, 2) and all points of the second array
+    (M, 2). The result has the shape (N, M)
+    """
+    _require_numpy()
+    first = np.asarray(first, dtype=float).reshape(-1, 2)
+    second = np.asarray(second, dtype=float).reshape(-1, 2)
+    return np.hypot(first[:, 0, np.newaxis] - second[np.newaxis, :, 0],
+                    first[:, 1, np.newaxis] - second[np.newaxis, :, 1])
@@ -0,0 +1,408 @@
+import logging
+import math
+from typing import Any, Tuple
+
+import numpy as np
+
+import Constants
+from LocationService.Kinematics import integrate_speed_batch, integrate_lane_change_batch, \
+    get_length_mean_factor_batch
+from LocationService.LocationService import LocationService, SimulationClock
+from LocationService.Track import FullTrack
+from LocationService.TrackPieces import CurvedPiece
+from LocationService.Trigo import Position, Angle
+
+logger = logging.getLogger(__name__)
+
+
+class VectorizedSimulation:
+    """
+    Simulation backend that advances many virtual cars at once. The state of all cars is kept in
+    arrays (one entry per car) and every simulation step is calculated for all cars with vectorized
+    numpy operations. The results match the LocationService within floating point precision.
+    U-Turns aren't supported.
+    """
+
+    _STATE_FIELDS: Tuple[str, ...] = ('_actual_speed', '_target_speed', '_acceleration', '_actual_offset',
+                                      '_target_offset', '_direction_mult', '_piece_index', '_progress', '_x', '_y',
+                                      '_rotation_deg', '_active')
+
+    def __init__(self, track: FullTrack, simulation_ticks_per_second: int = 24, initial_capacity: int = 16,
+                 simulation_clock: SimulationClock | None = None):
+        """
+        Create a vectorized simulation
+
+        Parameters
+        ----------
+        track: FullTrack
+            Track on which all cars are driving.
+        simulation_ticks_per_second: int
+            How many steps should be calculated per second. Ignored, if a simulation_clock is given, since the
+            clock determines the tick rate then
+        initial_capacity: int
+            Number of cars the arrays are allocated for. The arrays grow automatically when needed.
+        simulation_clock: SimulationClock | None
+            Clock that runs one step of the simulation at the start of every tick. It's needed for the
+            `VectorizedLocationService`. Without it, `step` has to be called by the user of the simulation
+        """
+        if simulation_clock is not None:
+            simulation_ticks_per_second = simulation_clock.get_ticks_per_second()
+            simulation_clock.add_before_tick_callback(self.step)
+        self._simulation_clock: SimulationClock | None = simulation_clock
+        self.__MAX_USED_DISTANCE_FOR_OFFSET_PERCENT = 0.30
+        self._simulation_ticks_per_second: int = simulation_ticks_per_second
+        self._step_count: int = 0
+        self._car_count: int = 0
+
+        self._actual_speed = np.zeros(initial_capacity)
+        self._target_speed = np.zeros(initial_capacity)
+        self._acceleration = np.zeros(initial_capacity)
+        self._actual_offset = np.zeros(initial_capacity)
+        self._target_offset = np.zeros(initial_capacity)
+        self._direction_mult = np.ones(initial_capacity, dtype=np.int64)
+        self._piece_index = np.zeros(initial_capacity, dtype=np.int64)
+        self._progress = np.zeros(initial_capacity)
+        self._x = np.zeros(initial_capacity)
+        self._y = np.zeros(initial_capacity)
+        # direction the car is pointing. Kept while the car isn't moving
+        self._rotation_deg = np.full(initial_capacity, 90.0)
+        self._active = np.zeros(initial_capacity, dtype=bool)
+
+        self._track: FullTrack = track
+        self._load_track_tables(track)
+
+    def _load_track_tables(self, track: FullTrack) -> None:
+        """
+        Converts the pieces of the track into arrays so the geometry can be calculated for all cars at once
+        """
+        track_len = track.get_len()
+        self._piece_is_curve = np.zeros(track_len, dtype=bool)
+        self._piece_straight_length = np.zeros(track_len)
+        self._piece_radius = np.zeros(track_len)
+        self._piece_half_size = np.zeros(track_len)
+        # curves that are mirrored use the inverted offset
+        self._piece_offset_mult = np.ones(track_len)
+        self._piece_rot_cos = np.zeros(track_len)
+        self._piece_rot_sin = np.zeros(track_len)
+        self._piece_global_x = np.zeros(track_len)
+        self._piece_global_y = np.zeros(track_len)
+
+        for i in range(0, track_len):
+            piece, global_offset = track.get_entry_tupel(i)
+            if isinstance(piece, CurvedPiece):
+                self._piece_is_curve[i] = True
+                self._piece_radius[i] = piece.get_radius()
+                self._piece_half_size[i] = piece.get_used_space_horiz() / 2
+                if piece.is_mirrored():
+                    self._piece_offset_mult[i] = -1
+            else:
+                self._piece_straight_length[i] = piece.get_length(0)
+            self._piece_rot_cos[i] = piece.get_rotation().get_cos()
+            self._piece_rot_sin[i] = piece.get_rotation().get_sin()
+            self._piece_global_x[i] = global_offset.get_x()
+            self._piece_global_y[i] = global_offset.get_y()
+
+    def get_track(self) -> FullTrack:
+        return self._track
+
+    def get_ticks_per_second(self) -> int:
+        return self._simulation_ticks_per_second
+
+    def get_simulation_clock(self) -> SimulationClock | None:
+        return self._simulation_clock
+
+    def get_step_count(self) -> int:
+        """
+        Gets the number of simulation steps that were calculated
+        """
+        return self._step_count
+
+    def get_car_count(self) -> int:
+        """
+        Gets the number of cars that were added (including removed ones)
+        """
+        return self._car_count
+
+    def add_car(self, starting_offset: float = 0) -> int:
+        """
+        Adds a car at the start of the first piece and returns its index in the simulation
+        """
+        if self._car_count == len(self._active):
+            self._grow(max(1, 2 * len(self._active)))
+        index = self._car_count
+        self._car_count += 1
+
+        piece, global_offset = self._track.get_entry_tupel(0)
+        _, position = piece.process_update(0, 0, starting_offset)
+        self._x[index] = position.get_x() + global_offset.get_x()
+        self._y[index] = position.get_y() + global_offset.get_y()
+        self._active[index] = True
+        return index
+
+    def remove_car(self, index: int) -> None:
+        """
+        Stops simulating a car. The index won't be reused
+        """
+        self._active[index] = False
+
+    def _grow(self, new_capacity: int) -> None:
+        """
+        Increases the size of all state arrays
+        """
+        for field in self._STATE_FIELDS:
+            old: np.ndarray = getattr(self, field)
+            new = np.zeros(new_capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, field, new)
+        self._direction_mult[self._car_count:] = 1
+        self._rotation_deg[self._car_count:] = 90.0
+
+    def set_speed_mm(self, index: int, speed_mm: float, acceleration: float = 1000) -> None:
+        """
+        Updates the target speed (in mm/s) and acceleration (in mm/s^2) of a car
+        """
+        self._target_speed[index] = speed_mm
+        self._acceleration[index] = acceleration
+
+    def set_offset_mm(self, index: int, offset: float) -> None:
+        """
+        Sets the targeted offset of a car in mm of distance to the track center. Positive values go
+        right in driving direction
+        """
+        self._target_offset[index] = offset * -1 * self._direction_mult[index]
+
+    def notify_new_track(self, new_track: FullTrack) -> None:
+        """
+        Replaces the track and moves all cars to the start of the first piece
+        """
+        if new_track is self._track:
+            return
+        self._track = new_track
+        self._load_track_tables(new_track)
+        self._piece_index[:] = 0
+        self._progress[:] = 0
+        piece, global_offset = new_track.get_entry_tupel(0)
+        for index in range(0, self._car_count):
+            _, position = piece.process_update(0, 0, self._actual_offset[index])
+            self._x[index] = position.get_x() + global_offset.get_x()
+            self._y[index] = position.get_y() + global_offset.get_y()
+
+    def _get_piece_length(self, piece_index: np.ndarray, offset: np.ndarray) -> np.ndarray:
+        """
+        Gets the length of the given pieces at the given offsets
+        """
+        curve_length = (self._piece_radius[piece_index] + offset * self._piece_offset_mult[piece_index]) * math.pi / 2
+        return np.where(self._piece_is_curve[piece_index], curve_length, self._piece_straight_length[piece_index])
+
+    def _adjust_speed(self, n: int) -> np.ndarray:
+        """
+        Moves the actual speed of the first n cars towards their target speed and returns the distance they drove
+        """
+        new_speed, distance = integrate_speed_batch(self._actual_speed[:n], self._target_speed[:n],
+                                                    self._acceleration[:n], 1 / self._simulation_ticks_per_second)
+        self._actual_speed[:n] = new_speed
+        return distance
+
+    def _adjust_offset(self, n: int, travel_distance: np.ndarray) -> np.ndarray:
+        """
+        Moves the offset of the first n cars towards their target offset and returns the
+        remaining distance they can travel straight
+        """
+        old_offset = self._actual_offset[:n]
+        new_offset, changing_distance, remaining_distance = integrate_lane_change_batch(
+            old_offset, self._target_offset[:n], travel_distance, self.__MAX_USED_DISTANCE_FOR_OFFSET_PERCENT)
+
+        # the progress on curves changes with the offset
+        piece_index = self._piece_index[:n]
+        curve = self._piece_is_curve[piece_index]
+        old_length = self._get_piece_length(piece_index, old_offset)
+        new_length = self._get_piece_length(piece_index, new_offset)
+        safe_length = np.where(curve, old_length, 1)
+        self._progress[:n] = np.where(curve, self._progress[:n] / safe_length * new_length, self._progress[:n])
+        self._actual_offset[:n] = new_offset
+
+        # the way during the lane change is converted to the new offset
+        return changing_distance * get_length_mean_factor_batch(old_length, new_length) + remaining_distance
+
+    def _move_along_track(self, n: int, distance: np.ndarray) -> None:
+        """
+        Moves the first n cars by a signed distance along the track and handles the transitions
+        onto the following pieces
+        """
+        track_len = self._track.get_len()
+        offset = self._actual_offset[:n]
+        direction = self._direction_mult[:n]
+        moving = np.ones(n, dtype=bool)
+        while np.any(moving):
+            piece_index = self._piece_index[:n]
+            length = self._get_piece_length(piece_index, offset)
+            end = self._progress[:n] + distance
+            leftover = np.where(end >= length, end - length, np.where(end <= 0, end, 0))
+            self._progress[:n] = np.where(moving, end, self._progress[:n])
+
+            moving = moving & (leftover != 0)
+            next_index = (piece_index + direction) % track_len
+            self._piece_index[:n] = np.where(moving, next_index, piece_index)
+            next_start = np.where(direction == 1, 0, self._get_piece_length(next_index, offset))
+            self._progress[:n] = np.where(moving, next_start, self._progress[:n])
+            distance = leftover
+
+    def _calculate_positions(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculates the global positions of the first n cars based on their piece, progress and offset
+        """
+        piece_index = self._piece_index[:n]
+        progress = self._progress[:n]
+        curve = self._piece_is_curve[piece_index]
+
+        # straight pieces
+        straight_x = -self._actual_offset[:n]
+        straight_y = self._piece_straight_length[piece_index] / 2 - progress
+
+        # curved pieces
+        offset = self._actual_offset[:n] * self._piece_offset_mult[piece_index]
+        distance_to_middle = self._piece_radius[piece_index] + offset
+        curve_length = np.where(curve, distance_to_middle * math.pi / 2, 1)
+        angle = np.radians(progress / curve_length * 90)
+        half_size = self._piece_half_size[piece_index]
+        curve_x = distance_to_middle * np.cos(angle) - half_size
+        curve_y = distance_to_middle * np.sin(angle) - half_size
+        mirrored = self._piece_offset_mult[piece_index] == -1
+        curve_x, curve_y = np.where(mirrored, -curve_y, curve_x), np.where(mirrored, -curve_x, curve_y)
+
+        local_x = np.where(curve, curve_x, straight_x)
+        local_y = np.where(curve, curve_y, straight_y)
+        rot_cos = self._piece_rot_cos[piece_index]
+        rot_sin = self._piece_rot_sin[piece_index]
+        global_x = local_x * rot_cos - local_y * rot_sin + self._piece_global_x[piece_index]
+        global_y = local_x * rot_sin + local_y * rot_cos + self._piece_global_y[piece_index]
+        return global_x, global_y
+
+    def step(self) -> None:
+        """
+        Advances all active cars by one simulation step
+        """
+        n = self._car_count
+        active = self._active[:n]
+        remaining_way = self._adjust_offset(n, self._adjust_speed(n))
+        # inactive cars don't move
+        self._move_along_track(n, np.where(active, remaining_way * self._direction_mult[:n], 0))
+
+        new_x, new_y = self._calculate_positions(n)
+        # same convention as Position.calculate_angle_to where 0 degree means pointing north
+        dx = self._x[:n] - new_x
+        dy = self._y[:n] - new_y
+        # the angle is only updated when the car moved, so standing cars keep their direction
+        rad = np.arctan2(dy, dx) - 0.5 * math.pi
+        rad = np.where(rad < 0, rad + 2 * math.pi, rad)
+        moved = np.hypot(dx, dy) >= 0.1
+        self._rotation_deg[:n] = np.where(moved & active, np.degrees(rad), self._rotation_deg[:n])
+        self._x[:n] = np.where(active, new_x, self._x[:n])
+        self._y[:n] = np.where(active, new_y, self._y[:n])
+        self._step_count += 1
+
+    def get_positions(self) -> np.ndarray:
+        """
+        Gets the global positions of all cars as array with the shape (number of cars, 2)
+        """
+        return np.stack((self._x[:self._car_count], self._y[:self._car_count]), axis=1)
+
+    def get_angles(self) -> np.ndarray:
+        """
+        Gets the angles (in degree) where all cars are pointing
+        """
+        return self._rotation_deg[:self._car_count].copy()
+
+    def get_position(self, index: int) -> Position:
+        return Position(float(self._x[index]), float(self._y[index]))
+
+    def get_angle(self, index: int) -> Angle:
+        return Angle(float(self._rotation_deg[index]))
+
+    def get_arc_length(self, index: int) -> float:
+        """
+        Gets the arc length coordinate s of a car for the offset it's currently driving on
+        """
+        return self._track.to_arc_length(int(self._piece_index[index]), float(self._progress[index]),
+                                         float(self._actual_offset[index]))
+
+    def get_arc_length_offset(self, index: int) -> float:
+        return float(self._actual_offset[index])
+
+    def get_driving_data(self, index: int) -> dict[str, Any]:
+        """
+        Gets the additional data of a car in the same format as the LocationService callbacks
+        """
+        direction_mult = int(self._direction_mult[index])
+        return {
+            'offset': float(self._actual_offset[index]) * direction_mult * -1,
+            'speed': float(self._actual_speed[index]),
+            'going_clockwise': direction_mult == 1,
+            'uturn_in_progress': False}
+
+
+class VectorizedLocationService(LocationService):
+    """
+    LocationService for a single car whose simulation is calculated by a shared VectorizedSimulation. The clock of
+    the simulation advances all cars once at the start of every tick, and every service only reads the result of
+    its own car.
+    """
+
+    def __init__(self,
+                 simulation: VectorizedSimulation,
+                 starting_offset: float = 0,
+                 start_immediately: bool = False):
+        super().__init__(simulation.get_track(), starting_offset, simulation.get_ticks_per_second(),
+                         start_immediately=False, simulation_clock=simulation.get_simulation_clock())
+        if simulation.get_simulation_clock() is None:
+            raise ValueError("The vectorized simulation needs a simulation clock to be used by location services")
+        self._simulation: VectorizedSimulation = simulation
+        self._car_index: int = simulation.add_car(starting_offset)
+        if start_immediately:
+            self.start()
+
+    def __del__(self):
+        # the car wasn't added, if the constructor failed
+        if hasattr(self, '_car_index'):
+            self._simulation.remove_car(self._car_index)
+        super().__del__()
+
+    def get_arc_length(self) -> float | None:
+        return self._simulation.get_arc_length(self._car_index)
+
+    def get_arc_length_offset(self) -> float:
+        return self._simulation.get_arc_length_offset(self._car_index)
+
+    async def do_uturn(self) -> None:
+        logger.warning("The vectorized simulation doesn't support U-Turns. Ignoring the request")
+        return
+
+    def _set_speed_mm(self, speed_mm: float, acceleration: int = 1000) -> None:
+        self._simulation.set_speed_mm(self._car_index, speed_mm, acceleration)
+        return
+
+    async def set_offset_int(self, offset: int) -> None:
+        async with self._value_mutex:
+            self._set_offset_mm(Constants.TRACK_LANE_WIDTH * offset)
+        return
+
+    def _set_offset_mm(self, offset: float) -> None:
+        self._simulation.set_offset_mm(self._car_index, offset)
+        return
+
+    async def _run_simulation_step_threadsafe(self) -> tuple[Position | None, Angle]:
+        # the simulation was already advanced by the clock, so only the result of this car is read
+        async with self._value_mutex:
+            self._current_position = self._simulation.get_position(self._car_index)
+            return self._current_position, self._simulation.get_angle(self._car_index)
+
+    async def _run_tick(self) -> None:
+        pos, rot = await self._run_simulation_step_threadsafe()
+        data = self._simulation.get_driving_data(self._car_index)
+        for callback in self._on_update_callback:
+            callback(pos, rot, data)
+        return
+
+    def notify_new_track(self, new_track: FullTrack) -> None:
+        self._simulation.notify_new_track(new_track)
+        super().notify_new_track(new_track)
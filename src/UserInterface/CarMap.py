@@ -1,7 +1,10 @@
-from quart import Blueprint, render_template
-from typing import Any, Coroutine, List, Dict
+from quart import Blueprint, render_template, make_response, request
+from typing import Any, Coroutine, List, Dict, Tuple
 
 import asyncio
+import hashlib
+import json
+from datetime import datetime, timezone
 
 from socketio import AsyncServer
 
@@ -31,41 +34,91 @@ class CarMap:
 
         self._sio: AsyncServer = sio
 
+        # rendered page of the car map together with the key it was rendered for, its ETag and the time it was
+        # rendered. It's only rendered again if the track, the display settings or the car pictures change
+        self._page_cache: Tuple[Tuple[int, str], str, str, datetime] | None = None
+
         async def home_car_map():
             """
             Load car map page.
 
             Gets the track from the EnvironmentManager, loads configured vehicle pictures from config file and gets the
             color map from the EnvironmentManager used to visualize virtual cars exceeding the amount of car pictures.
+            The page is cached for every version of the track and served with an ETag and the time it was rendered,
+            so a browser that already has the page gets a 304 response. Data that changes while the page is shown
+            (like the items) isn't part of the page and is loaded from `car_map_state`.
 
             Returns
             -------
             Response
                 Returns a Response object representing the car map page.
             """
-            track = environment_manager.get_track()
-            disp_settings = self.config_handler.get_configuration()["display_settings"]
-
-            if track is None:
-                return await render_template('car_map.html', track=None, disp_settings=disp_settings)
-            serialized_track = track.get_as_list()
             if self._vehicles is not None:
                 for vehicle in self._vehicles:
                     vehicle.set_virtual_location_update_callback(self.update_virtual_location)
 
-            car_pictures = self.config_handler.get_configuration()["virtual_cars_pics"]
+            page, etag, last_modified = await self._get_page()
+            response = await make_response(page)
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # the browser has to ask every time whether the page changed, but doesn't need to load it again
+            response.cache_control.no_cache = True
+            return await response.make_conditional(request)
+
+        async def car_map_state():
+            """
+            Get the parts of the car map that change while the page is shown.
+
+            Returns
+            -------
+            Response
+                JSON object with the list of items that are currently placed on the track.
+            """
             items_as_dict = []
             for item in environment_manager.get_item_collision_detector().get_current_items():
                 items_as_dict.append(item.to_html_dict())
-            return await render_template(template_name_or_list="car_map.html",
-                                         track=serialized_track,
-                                         car_pictures=car_pictures,
-                                         color_map=environment_manager.get_car_color_map(),
-                                         used_space=environment_manager.get_track().get_used_space_as_dict(),
-                                         items=items_as_dict,
-                                         disp_settings=disp_settings)
+            response = await make_response({'items': items_as_dict})
+            response.cache_control.no_store = True
+            return response
 
         self.carMap_blueprint.add_url_rule("", "home_car_map", view_func=home_car_map)
+        self.carMap_blueprint.add_url_rule("/state", "car_map_state", view_func=car_map_state)
+
+    async def _get_page(self) -> Tuple[str, str, datetime]:
+        """
+        Gets the rendered car map page. It's only rendered, if the track or the configuration used for it changed
+        since the last time.
+
+        Returns
+        -------
+        Tuple[str, str, datetime]
+            The page, its ETag and the time it was rendered.
+        """
+        version, track = self._environment_manager.get_track_version(), self._environment_manager.get_track()
+        configuration = self.config_handler.get_configuration()
+        disp_settings = configuration["display_settings"]
+        car_pictures = configuration["virtual_cars_pics"] if track is not None else None
+        key = (version, json.dumps([disp_settings, car_pictures], sort_keys=True))
+        if self._page_cache is not None and self._page_cache[0] == key:
+            return self._page_cache[1:]
+
+        if track is None:
+            page = await render_template('car_map.html', track=None, disp_settings=disp_settings)
+        else:
+            page = await render_template(template_name_or_list="car_map.html",
+                                         track=track.get_as_list(),
+                                         car_pictures=car_pictures,
+                                         color_map=self._environment_manager.get_car_color_map(),
+                                         used_space=track.get_used_space_as_dict(),
+                                         disp_settings=disp_settings)
+        etag = hashlib.sha256(page.encode('utf-8')).hexdigest()
+        # Last-Modified only has a precision of seconds
+        rendered_at = datetime.now(timezone.utc).replace(microsecond=0)
+        if self._page_cache is not None and self._page_cache[2] == etag:
+            # the same page was rendered again, so it wasn't modified
+            rendered_at = self._page_cache[3]
+        self._page_cache = (key, page, etag, rendered_at)
+        return page, etag, rendered_at
 
     def get_blueprint(self) -> Blueprint:
         """
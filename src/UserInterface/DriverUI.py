@@ -12,11 +12,11 @@ from quart import Blueprint, render_template, request
 import uuid
 import logging
 import asyncio
-import time
 
 from socketio import AsyncServer
 
 from DataModel.Vehicle import Vehicle
+from EnvironmentManagement.Clock import get_clock
 from EnvironmentManagement.EnvironmentManager import EnvironmentManager
 from EnvironmentManagement.ConfigurationHandler import ConfigurationHandler
 from VehicleMovementManagement.BehaviourController import BehaviourController
@@ -171,7 +171,7 @@ class DriverUI:
             Updates timestamp of latest received heartbeat for the players.
             """
             player = data["player"]
-            self.__latest_driver_heartbeats[player] = time.time()
+            self.__latest_driver_heartbeats[player] = get_clock().time()
             return
 
         @self._sio.on('driver_inactive')
@@ -236,10 +236,11 @@ class DriverUI:
         Continuously checks driver heartbeats for timeouts.
         """
         while True:
-            await asyncio.sleep(1)
+            await get_clock().sleep(1)
             players = list(self.__latest_driver_heartbeats.keys())
+            now = get_clock().time()
             for player in players:
-                if time.time() - self.__latest_driver_heartbeats.get(player, 0) > self.__driver_heartbeat_timeout:
+                if now - self.__latest_driver_heartbeats.get(player, 0) > self.__driver_heartbeat_timeout:
                     logger.info(f'Player {player} timed out. Removing player from the game...')
                     self.__remove_player(player)
 
@@ -276,7 +277,7 @@ class DriverUI:
         """
         print(f"Driver {player} connected!")
 
-        self.__latest_driver_heartbeats[player] = time.time()
+        self.__latest_driver_heartbeats[player] = get_clock().time()
         if not self.__checking_heartbeats_flag:
             self.__run_async_task(self.__check_driver_heartbeat_timeout())
             self.__checking_heartbeats_flag = True
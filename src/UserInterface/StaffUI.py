@@ -583,7 +583,10 @@ class StaffUI:
                     'game_cfg_playing_time_limit_min': int(new_settings.get('game_cfg_playing_time_limit_min'))},
                 "environment": {
                     'env_auto_discover_anki_cars': new_settings.get('env_auto_discover_anki_cars') == 'on',
-                    'env_vehicle_scale': int(new_settings.get('env_vehicle_scale'))},
+                    'env_vehicle_scale': int(new_settings.get('env_vehicle_scale')),
+                    'env_event_driven_physical_cars': new_settings.get('env_event_driven_physical_cars') == 'on',
+                    'env_ble_write_without_response': new_settings.get('env_ble_write_without_response') == 'on',
+                    'env_vectorized_simulation': new_settings.get('env_vectorized_simulation') == 'on'},
                 "hacking_protection": {
                     'protection_duration_s': int(new_settings.get('protection_duration_s'))},
                 "item": {
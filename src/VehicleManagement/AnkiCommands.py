@@ -0,0 +1,68 @@
+# Copyright 2024 IAV GmbH
+#
+# This file is part of the IAV Distortion project an interactive
+# and educational showcase designed to demonstrate the need
+# of automotive cybersecurity in a playful, engaging manner.
+# and is released under the "Apache 2.0". Please see the LICENSE
+# file that should have been included as part of this package.
+#
+import struct
+
+# IDs of the commands sent to the Anki cars
+DISCONNECT: int = 0x0d
+VERSION_REQUEST: int = 0x18
+BATTERY_REQUEST: int = 0x1a
+SET_SPEED: int = 0x24
+CHANGE_LANE: int = 0x25
+SET_ROAD_OFFSET: int = 0x2c
+UPDATE_ROAD_OFFSET: int = 0x2d
+TURN: int = 0x32
+SDK_MODE: int = 0x90
+
+# complete frames: the size of the rest of the frame, the ID of the command and its parameters. They can be used to
+# decode the commands as well, e.g. by an emulated car
+SPEED_FRAME: struct.Struct = struct.Struct("<BBHHH")
+LANE_FRAME: struct.Struct = struct.Struct("<BBHHf")
+TURN_FRAME: struct.Struct = struct.Struct("<BBHH")
+ROAD_OFFSET_FRAME: struct.Struct = struct.Struct("<BBf")
+
+
+def _encode_constant(command_id: int, *parameters: int) -> bytes:
+    return bytes((1 + len(parameters), command_id, *parameters))
+
+
+VERSION_REQUEST_FRAME: bytes = _encode_constant(VERSION_REQUEST)
+BATTERY_REQUEST_FRAME: bytes = _encode_constant(BATTERY_REQUEST)
+UPDATE_ROAD_OFFSET_FRAME: bytes = _encode_constant(UPDATE_ROAD_OFFSET)
+DISCONNECT_FRAME: bytes = _encode_constant(DISCONNECT)
+SDK_MODE_ON_FRAME: bytes = _encode_constant(SDK_MODE, 0x01, 0x01)
+SDK_MODE_OFF_FRAME: bytes = _encode_constant(SDK_MODE, 0x01, 0x00)
+
+
+def encode_speed(speed: int, acceleration: int, respect_speed_limit: bool) -> bytes:
+    """
+    Encodes the frame that sets the speed in mm/s with the acceleration in mm/s^2
+    """
+    return SPEED_FRAME.pack(SPEED_FRAME.size - 1, SET_SPEED, speed, acceleration, respect_speed_limit)
+
+
+def encode_lane_change(speed: int, acceleration: int, offset: float) -> bytes:
+    """
+    Encodes the frame that changes the lane to the offset in mm from the center of the road with the speed in mm/s
+    and the acceleration in mm/s^2
+    """
+    return LANE_FRAME.pack(LANE_FRAME.size - 1, CHANGE_LANE, speed, acceleration, offset)
+
+
+def encode_turn(direction: int, trigger: int) -> bytes:
+    """
+    Encodes the frame that makes the car turn
+    """
+    return TURN_FRAME.pack(TURN_FRAME.size - 1, TURN, direction, trigger)
+
+
+def encode_road_offset(offset: float) -> bytes:
+    """
+    Encodes the frame that sets the offset in mm from the center of the road the car assumes it drives on
+    """
+    return ROAD_OFFSET_FRAME.pack(ROAD_OFFSET_FRAME.size - 1, SET_ROAD_OFFSET, offset)
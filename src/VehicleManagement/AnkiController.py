@@ -7,13 +7,19 @@
 # file that should have been included as part of this package.
 #
 import asyncio
-import struct
 import logging
-from typing import Callable, Coroutine, Any
+from typing import Callable, Coroutine, Any, Protocol, runtime_checkable
 
 import Constants
+from EnvironmentManagement.Clock import get_clock
+from VehicleManagement.AnkiCommands import encode_speed, encode_lane_change, encode_turn, encode_road_offset, \
+    VERSION_REQUEST_FRAME, BATTERY_REQUEST_FRAME, UPDATE_ROAD_OFFSET_FRAME, DISCONNECT_FRAME, SDK_MODE_ON_FRAME, \
+    SDK_MODE_OFF_FRAME
+from VehicleManagement.AnkiMessages import create_decoder, PAYLOAD_START, VERSION_RESPONSE, BATTERY_RESPONSE, \
+    LOCATION_UPDATE, TRANSITION_UPDATE, OFFSET_UPDATE, VersionMessage, BatteryMessage, LocationMessage, \
+    TransitionMessage, OffsetMessage
+from VehicleManagement.BleCommandQueue import BleCommandQueue, CommandPriority
 from VehicleManagement.VehicleController import VehicleController, Turns, TurnTrigger
-from bleak import BleakClient
 from bleak.exc import BleakError
 from bleak.backends.characteristic import BleakGATTCharacteristic
 
@@ -21,30 +27,97 @@ logger = logging.getLogger(__name__)
 
 ble_connection_logger = logging.getLogger('ble_connection_logging')
 ble_connection_logger.setLevel(logging.DEBUG)
-file_handler = logging.FileHandler('ble-connection-trace.log')
+file_handler = logging.FileHandler('ble-connection-trace.log', delay=True)
 formatter = logging.Formatter('%(asctime)s: %(message)s')
 file_handler.setFormatter(formatter)
 ble_connection_logger.addHandler(file_handler)
 
+# commands that only carry the latest value of something, so a lost one is corrected by the next one
+_UNACKNOWLEDGED_COMMANDS: frozenset[str] = frozenset({'speed', 'road_offset'})
+# commands that don't change the speed of the car
+_SPEED_KEEPING_COMMANDS: frozenset[str] = frozenset({'speed', 'version', 'battery', 'road_offset', 'update_offset'})
+
+
+@runtime_checkable
+class BleClient(Protocol):
+    """
+    Part of the `BleakClient` the controller uses. Stand-ins for a car (e.g. the `EmulatedAnkiCar` of the load tests)
+    only need to implement this
+    """
+    @property
+    def address(self) -> str: ...
+
+    @property
+    def is_connected(self) -> bool: ...
+
+    async def connect(self, **kwargs: Any) -> bool: ...
+
+    async def start_notify(self, char_specifier: Any, callback: Callable[[Any, bytearray], Any],
+                           **kwargs: Any) -> None: ...
+
+    async def stop_notify(self, char_specifier: Any) -> None: ...
+
+    async def write_gatt_char(self, char_specifier: Any, data: bytes | bytearray, response: bool) -> None: ...
+
 
 class AnkiController(VehicleController):
     """
     Controller class for the BLE interface for the Anki cars
-    """
-    def __init__(self) -> None:
 
+    All commands are written by one writer task per car that takes them from a bounded priority queue (see
+    `BleCommandQueue`). A stop is sent before everything else, lane changes and turns are never dropped and only the
+    latest speed update is sent.
+
+    With `write_without_response` speed updates and road offsets are written without waiting for a GATT response,
+    which saves a round trip per command. Stops and commands that change the state of the car are still acknowledged.
+    Since the car doesn't confirm the unacknowledged writes, at most `max_unacknowledged_writes` of them are written
+    in a row before the next one is acknowledged again, and they are at least `min_unacknowledged_write_interval`
+    seconds apart, so the buffers of the connection can't fill up.
+
+    The frames of the commands are encoded by `AnkiCommands`. A speed update that is identical to the last
+    acknowledged one isn't sent again, as long as nothing else is waiting or was sent since then.
+    """
+    def __init__(self, write_without_response: bool = False, max_unacknowledged_writes: int = 8,
+                 min_unacknowledged_write_interval: float = 0.0075) -> None:
+        """
+        Parameters
+        ----------
+        write_without_response: bool
+            Whether speed updates and road offsets are written without a GATT response.
+        max_unacknowledged_writes: int
+            Maximum amount of writes without response in a row.
+        min_unacknowledged_write_interval: float
+            Minimum time in seconds between the start of a write without response and the previous write. The
+            default is the shortest connection interval of BLE.
+        """
         super().__init__()
-        self.task_in_progress: bool = False
 
-        self.__location_callback: Callable[[tuple[Any]], None]
-        self.__transition_callback: Callable[[tuple[Any]], None]
-        self.__offset_callback: Callable[[tuple[Any]], None]
-        self.__version_callback: Callable[[tuple[Any]], None]
-        self.__battery_callback: Callable[[tuple[Any]], None]
+        # unpack function, minimum size, record constructor and callback by the ID of the notification
+        self.__message_handlers: dict[int, tuple[Callable[[Any, int], tuple], int, Callable[[tuple], Any],
+                                                 Callable[[Any], None]]] = dict()
+        # amount of received notifications with an unknown ID by their ID
+        self.__unknown_message_counts: dict[int, int] = dict()
+        self.__malformed_message_count: int = 0
         self.__ble_not_reachable_callback: Callable[[], None]
-
-        self.__latest_command: bytes | None = None
-        self.__command_in_progress: bool = False
+        self.__latency_callback: Callable[[float], None] | None = None
+
+        # monotonic time at which the last notification was received
+        self.__last_notification_time: float | None = None
+
+        self.__command_queue: BleCommandQueue = BleCommandQueue()
+        self.__writer_running: bool = False
+        # amount of written commands and the sum of their write latencies in seconds by the name of their kind
+        self.__write_counts: dict[str, int] = dict()
+        self.__write_latency_sums: dict[str, float] = dict()
+
+        self.__write_without_response: bool = write_without_response
+        self.__max_unacknowledged_writes: int = max_unacknowledged_writes
+        self.__min_unacknowledged_write_interval: float = min_unacknowledged_write_interval
+        self.__unacknowledged_writes: int = 0
+        self.__last_write_time: float | None = None
+        # last acknowledged speed frame, as long as no command changed the speed since then
+        self.__last_speed_frame: bytes | None = None
+        self.__skipped_speed_updates: int = 0
 
         return
 
@@ -63,29 +136,52 @@ class AnkiController(VehicleController):
         asyncio.create_task(task)
         # TODO: Log error, if the coroutine doesn't end successfully
 
-    async def __process_latest_command(self) -> None:
-        """
-        Process the most recent command.
+    async def __process_commands(self) -> None:
+        """
+        Writes the queued commands one after another, the one with the highest priority first. The task ends when
+        the queue is empty and is started again by the next command.
+        """
+        while True:
+            entry = self.__command_queue.get_nowait()
+            if entry is None:
+                break
+            name, command = entry
+            if name not in _SPEED_KEEPING_COMMANDS:
+                self.__last_speed_frame = None
+            response = not self.__may_write_without_response(name)
+            if not response and self.__last_write_time is not None:
+                remaining_time = self.__last_write_time + self.__min_unacknowledged_write_interval - get_clock().time()
+                if remaining_time > 0:
+                    await get_clock().sleep(remaining_time)
+            start_time = get_clock().time()
+            self.__last_write_time = start_time
+            if await self.__send_command_task(command, response):
+                self.__unacknowledged_writes = 0 if response else self.__unacknowledged_writes + 1
+                if name == 'speed':
+                    # the car might have missed an unacknowledged speed update, so it's sent again next time
+                    self.__last_speed_frame = command if response else None
+                self.__write_counts[name] = self.__write_counts.get(name, 0) + 1
+                self.__write_latency_sums[name] = (self.__write_latency_sums.get(name, 0)
+                                                   + get_clock().time() - start_time)
+        self.__writer_running = False
+        return
 
-        As long as new commands are received while another command is
-        processed the most recent command will be precessed next.
+    def __may_write_without_response(self, name: str) -> bool:
         """
-        while self.__latest_command is not None:
-            current_command = self.__latest_command
-            self.__latest_command = None
-            task = asyncio.create_task(self.__send_command_task(current_command))
-            await task
-        self.__command_in_progress = False
-        return
+        Checks whether a command of the given kind may be written without response now
+        """
+        return (self.__write_without_response and name in _UNACKNOWLEDGED_COMMANDS
+                and self.__unacknowledged_writes < self.__max_unacknowledged_writes)
 
     def set_callbacks(self,
-                      location_callback: Callable[[tuple[Any]], None],
-                      transition_callback: Callable[[tuple[Any]], None],
-                      offset_callback: Callable[[tuple[Any]], None],
-                      version_callback: Callable[[tuple[Any]], None],
-                      battery_callback: Callable[[tuple[Any]], None]) -> None:
+                      location_callback: Callable[[LocationMessage], None],
+                      transition_callback: Callable[[TransitionMessage], None],
+                      offset_callback: Callable[[OffsetMessage], None],
+                      version_callback: Callable[[VersionMessage], None],
+                      battery_callback: Callable[[BatteryMessage], None]) -> None:
         """
-        Sets callback functions.
+        Sets callback functions. The callbacks get the decoded notifications as records (see `AnkiMessages`), which
+        are tuples as well.
 
         Parameters
         ----------
@@ -102,11 +198,13 @@ class AnkiController(VehicleController):
         car_not_reachable_callback: Callable
             Callback function executed on car not reachable event.
         """
-        self.__location_callback = location_callback
-        self.__transition_callback = transition_callback
-        self.__offset_callback = offset_callback
-        self.__version_callback = version_callback
-        self.__battery_callback = battery_callback
+        callbacks: dict[int, Callable[[Any], None]] = {LOCATION_UPDATE: location_callback,
+                                                       TRANSITION_UPDATE: transition_callback,
+                                                       OFFSET_UPDATE: offset_callback,
+                                                       VERSION_RESPONSE: version_callback,
+                                                       BATTERY_RESPONSE: battery_callback}
+        self.__message_handlers = {message_id: (*create_decoder(message_id), callback)
+                                   for message_id, callback in callbacks.items()}
         return
 
     def set_ble_not_reachable_callback(self, ble_not_reachable_callback: Callable[[], None]) -> None:
@@ -115,14 +213,62 @@ class AnkiController(VehicleController):
         """
         self.__ble_not_reachable_callback: Callable[[], None] = ble_not_reachable_callback
 
-    async def connect_to_vehicle(self, ble_client: BleakClient, start_notification: bool = True) -> bool:
+    def set_latency_callback(self, latency_callback: Callable[[float], None] | None) -> None:
+        """
+        Sets a callback that gets the measured latency in seconds of the connection for every command that was
+        acknowledged by the car. The latency is estimated as half of the time until the acknowledgement arrived
+        """
+        self.__latency_callback = latency_callback
+
+    def get_command_statistics(self) -> dict[str, dict[str, float]]:
+        """
+        Gets the statistics of the BLE commands by the name of their kind ('speed', 'stop', 'lane', 'turn', 'version',
+        'battery', 'sdk_mode', 'road_offset', 'update_offset' and 'disconnect'): the amount of written commands
+        ('written'), their average write latency in seconds ('average_latency'), the amount of commands that were
+        dropped because the queue was full ('dropped') and for speed updates the amount that were replaced by a newer
+        one ('coalesced') and the amount that were skipped, because the car already drives with that speed
+        ('skipped')
+        """
+        dropped_counts = self.__command_queue.get_dropped_counts()
+        statistics: dict[str, dict[str, float]] = dict()
+        for name in set(self.__write_counts) | set(dropped_counts):
+            written = self.__write_counts.get(name, 0)
+            statistics[name] = {'written': written,
+                                'average_latency': self.__write_latency_sums.get(name, 0) / written if written else 0,
+                                'dropped': dropped_counts.get(name, 0)}
+        if self.__command_queue.get_coalesced_count() > 0 or self.__skipped_speed_updates > 0:
+            speed_statistics = statistics.setdefault('speed', {'written': 0, 'average_latency': 0, 'dropped': 0})
+            speed_statistics['coalesced'] = self.__command_queue.get_coalesced_count()
+            speed_statistics['skipped'] = self.__skipped_speed_updates
+        return statistics
+
+    def get_unknown_message_counts(self) -> dict[int, int]:
+        """
+        Gets the amount of received notifications that were ignored, because their ID is unknown, by their ID
+        """
+        return dict(self.__unknown_message_counts)
+
+    def get_malformed_message_count(self) -> int:
+        """
+        Gets the amount of received notifications that were ignored, because they were too short for their ID
+        """
+        return self.__malformed_message_count
+
+    def get_last_notification_time(self) -> float | None:
+        """
+        Gets the monotonic time (see `Clock.time`) at which the last notification was received. While a callback for
+        a notification is executed, this is the time of that notification
+        """
+        return self.__last_notification_time
+
+    async def connect_to_vehicle(self, ble_client: BleClient, start_notification: bool = True) -> bool:
         """
         Establishes BLE connection to Anki car.
 
         Parameters
         ----------
-        ble_client: BleakClient
-            Client to connect to.
+        ble_client: BleClient
+            Client to connect to, usually a `BleakClient`.
         start_notification: bool
             Flag to start clients notification service.
 
@@ -132,7 +278,7 @@ class AnkiController(VehicleController):
             True, if connection established successfully.
             False, if connection failed.
         """
-        if ble_client is None or not isinstance(ble_client, BleakClient):
+        if ble_client is None or not isinstance(ble_client, BleClient):
             logger.debug("Invalid client.")
             return False
 
@@ -155,44 +301,37 @@ class AnkiController(VehicleController):
             logger.debug(f"Bleak Error: {e}")
             return False
 
-    def __send_command(self, command: bytes) -> None:
-        """
-        Constructs coroutine that will be created as async task.
-
-        Parameters
-        ----------
-        command: bytes
-            Command to be sent to the client.
-        """
-        self.__run_async_task(self.__send_command_task(command))
-        return
-
-    def __send_latest_command(self, command: bytes) -> None:
+    def __send_command(self, command: bytes, name: str, priority: CommandPriority = CommandPriority.CONTROL) -> None:
         """
-        Stores most recent command and starts loop to run most recent task if loop is not running.
+        Adds a command to the queue and starts the writer task, if it isn't running.
 
         Parameters
         ----------
         command: bytes
-            Command to be sent to the client.
-        """
-        self.__latest_command = command
-        if not self.__command_in_progress:
-            self.__command_in_progress = True
-            self.__run_async_task(self.__process_latest_command())
+            Complete frame of the command to be sent to the client.
+        name: str
+            Name of the kind of the command, used for the statistics.
+        priority: CommandPriority
+            Priority of the command.
+        """
+        self.__command_queue.put(name, command, priority)
+        if not self.__writer_running:
+            self.__writer_running = True
+            self.__run_async_task(self.__process_commands())
         return
 
-    async def __send_command_task(self, command: bytes) -> bool:
+    async def __send_command_task(self, command: bytes, response: bool = True) -> bool:
         """
         Sends BLE command asynchronously.
 
-        Constructs final BLE command. Sends BLE command if no other task is still being progressed. If another task is
-        in progress, the current command is dropped.
+        Sends a BLE command. Commands are only sent by the writer task, so only one command is sent at a time.
 
         Parameters
         ----------
         command: bytes
-            Command to be sent via bluetooth.
+            Complete frame of the command to be sent via bluetooth.
+        response: bool
+            Whether the car has to acknowledge the command. The latency is only measured for acknowledged commands.
 
         Returns
         -------
@@ -202,25 +341,23 @@ class AnkiController(VehicleController):
         """
         success = False
 
-        if self.task_in_progress:
-            return success
-        else:
-            self.task_in_progress = True
-            final_command = struct.pack("B", len(command)) + command
-
-            try:
-                await self._connected_car.write_gatt_char("BE15BEE1-6186-407E-8381-0BD89C4D8DF4", final_command, True)
-                success = True
-                self.task_in_progress = False
-            except (BleakError, OSError):
-                success = False
-                self.task_in_progress = False
-                ble_connection_logger.warning('%s | Car isn\'t reachable anymore',
-                                              self._connected_car.address)
-                if self.__ble_not_reachable_callback is not None:
-                    self.__ble_not_reachable_callback()
-
-            return success
+        try:
+            start_time = get_clock().time()
+            await self._connected_car.write_gatt_char("BE15BEE1-6186-407E-8381-0BD89C4D8DF4", command, response)
+            success = True
+            if response and self.__latency_callback is not None:
+                self.__latency_callback((get_clock().time() - start_time) / 2)
+        except (BleakError, OSError):
+            success = False
+            self.__last_speed_frame = None
+            # the car won't receive the waiting commands either
+            self.__command_queue.clear()
+            ble_connection_logger.warning('%s | Car isn\'t reachable anymore',
+                                          self._connected_car.address)
+            if self.__ble_not_reachable_callback is not None:
+                self.__ble_not_reachable_callback()
+
+        return success
 
     async def __start_notifications_now(self) -> bool:
         """
@@ -285,9 +422,15 @@ class AnkiController(VehicleController):
         speed_int = int(Constants.MAX_ANKI_SPEED * velocity / 100)
         accel_int = acceleration
 
-        command = struct.pack("<BHHH", 0x24, speed_int, accel_int, limit_int)
-        logger.debug("Changed speed to %i", speed_int)
-        self.__send_latest_command(command)
+        command = encode_speed(speed_int, accel_int, limit_int)
+        if speed_int == 0:
+            logger.debug("Changed speed to %i", speed_int)
+            self.__send_command(command, 'stop', CommandPriority.SAFETY)
+        elif command == self.__last_speed_frame and len(self.__command_queue) == 0:
+            self.__skipped_speed_updates += 1
+        else:
+            logger.debug("Changed speed to %i", speed_int)
+            self.__send_command(command, 'speed', CommandPriority.SPEED)
         return True
 
     def change_lane_to(self, change_direction: int, velocity: int, acceleration: int = 1000) -> bool:
@@ -311,9 +454,9 @@ class AnkiController(VehicleController):
         """
         speed_int = int(Constants.MAX_ANKI_SPEED * velocity / 100)
         lane_direction = Constants.TRACK_LANE_WIDTH * change_direction
-        command = struct.pack("<BHHf", 0x25, speed_int, acceleration, lane_direction)
+        command = encode_lane_change(speed_int, acceleration, lane_direction)
         logger.debug("Changed lane direction %i", lane_direction)
-        self.__send_command(command)
+        self.__send_command(command, 'lane')
         return True
 
     def do_turn_with(self, direction: Turns,
@@ -333,8 +476,7 @@ class AnkiController(VehicleController):
         bool
             True
         """
-        command = struct.pack("<BHH", 0x32, direction.value[0], turntrigger.value[0])
-        self.__send_command(command)
+        self.__send_command(encode_turn(direction.value[0], turntrigger.value[0]), 'turn')
         return True
 
     def request_version(self) -> bool:
@@ -346,8 +488,7 @@ class AnkiController(VehicleController):
         bool
             True
         """
-        command = struct.pack("<B", 0x18)
-        self.__send_command(command)
+        self.__send_command(VERSION_REQUEST_FRAME, 'version', CommandPriority.INFO)
         return True
 
     def request_battery(self) -> bool:
@@ -359,8 +500,7 @@ class AnkiController(VehicleController):
         bool
             True
         """
-        command = struct.pack("<B", 0x1a)
-        self.__send_command(command)
+        self.__send_command(BATTERY_REQUEST_FRAME, 'battery', CommandPriority.INFO)
         return True
 
     async def _setup_car(self, start_notification: bool) -> bool:
@@ -399,13 +539,10 @@ class AnkiController(VehicleController):
         bool
             True
         """
-        command_parameter: int
         if value:
-            command_parameter = 0x01
+            self.__send_command(SDK_MODE_ON_FRAME, 'sdk_mode')
         else:
-            command_parameter = 0x00
-        command = struct.pack("<BBB", 0x90, 0x01, command_parameter)
-        self.__send_command(command)
+            self.__send_command(SDK_MODE_OFF_FRAME, 'sdk_mode')
         return True
 
     def __set_road_offset_on(self, value: float = 0.0) -> bool:
@@ -422,8 +559,7 @@ class AnkiController(VehicleController):
         bool
             True
         """
-        command = struct.pack("<Bf", 0x2c, value)
-        self.__send_command(command)
+        self.__send_command(encode_road_offset(value), 'road_offset')
         return True
 
     def _update_road_offset(self) -> bool:
@@ -435,8 +571,7 @@ class AnkiController(VehicleController):
         bool
             True
         """
-        command = struct.pack("<B", 0x2d)
-        self.__send_command(command)
+        self.__send_command(UPDATE_ROAD_OFFSET_FRAME, 'update_offset')
         return True
 
     async def __disconnect_from_vehicle(self) -> bool:
@@ -450,14 +585,14 @@ class AnkiController(VehicleController):
         """
         await self.__stop_notifications_now()
 
-        command = struct.pack("<B", 0xd)
-        self.__send_command(command)
+        self.__send_command(DISCONNECT_FRAME, 'disconnect')
         ble_connection_logger.debug('%s | Normally disconnecting', self._connected_car.address)
         return True
 
     def __on_receive_data(self, sender: BleakGATTCharacteristic, data: bytearray) -> None:
         """
-        Processes received data and runs regarding callback functions according to data type.
+        Decodes received data and runs the callback function of its message ID (see `set_callbacks`). The payload
+        is unpacked directly from the received buffer without copying it.
 
         Parameters
         ----------
@@ -466,35 +601,19 @@ class AnkiController(VehicleController):
         data: bytearray
             Received data payload.
         """
-        command_id = hex(data[1])
-
-        # Version
-        if command_id == "0x19":
-            version_tuple = struct.unpack_from("<BB", data, 2)
-            # new_data = data.hex(" ", 1)
-            # version_tuple = tuple(new_data[6:11])
-            self.__version_callback(version_tuple)
-
-        # Battery
-        elif command_id == "0x1b":
-            battery_tuple = struct.unpack_from("<H", data, 2)
-            # new_data = data.hex(" ", 1)
-            # battery_tuple = tuple(new_data[6:12])
-            self.__battery_callback(battery_tuple)
-
-        elif command_id == "0x27":
-            location_tuple = struct.unpack_from("<BBfHB", data, 2)
-            self.__location_callback(location_tuple)
-
-        elif command_id == "0x29":
-            transition_tuple = struct.unpack_from("<BBfB", data, 2)
-            self.__transition_callback(transition_tuple)
-
-        elif command_id == "0x2d":
-            offset_tuple = struct.unpack_from("<f", data, 2)
-            self.__offset_callback(offset_tuple)
-
-        else:
-            _ = data.hex(" ", 1)
-
+        self.__last_notification_time = get_clock().time()
+        if len(data) < 2:
+            self.__malformed_message_count += 1
+            return
+        message_id = data[1]
+        handler = self.__message_handlers.get(message_id)
+        if handler is None:
+            self.__unknown_message_counts[message_id] = self.__unknown_message_counts.get(message_id, 0) + 1
+            return
+        unpack_from, minimum_size, make_record, callback = handler
+        if len(data) < minimum_size:
+            self.__malformed_message_count += 1
+            logger.debug("Ignored a notification with ID 0x%02x that is too short: %s", message_id, data.hex(" ", 1))
+            return
+        callback(make_record(unpack_from(data, PAYLOAD_START)))
         return
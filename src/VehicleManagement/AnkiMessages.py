@@ -0,0 +1,80 @@
+# Copyright 2024 IAV GmbH
+#
+# This file is part of the IAV Distortion project an interactive
+# and educational showcase designed to demonstrate the need
+# of automotive cybersecurity in a playful, engaging manner.
+# and is released under the "Apache 2.0". Please see the LICENSE
+# file that should have been included as part of this package.
+#
+import struct
+from functools import partial
+from typing import NamedTuple, Callable, Any
+
+# IDs of the notifications sent by the Anki cars
+VERSION_RESPONSE: int = 0x19
+BATTERY_RESPONSE: int = 0x1b
+LOCATION_UPDATE: int = 0x27
+TRANSITION_UPDATE: int = 0x29
+OFFSET_UPDATE: int = 0x2d
+
+# every message starts with its size and its ID, the payload follows
+PAYLOAD_START: int = 2
+
+
+class VersionMessage(NamedTuple):
+    version_low: int
+    version_high: int
+
+
+class BatteryMessage(NamedTuple):
+    battery_level: int
+
+
+class LocationMessage(NamedTuple):
+    location: int
+    piece: int
+    offset: float
+    speed: int
+    flags: int
+
+
+class TransitionMessage(NamedTuple):
+    piece: int
+    previous_piece: int
+    offset: float
+    direction: int
+
+
+class OffsetMessage(NamedTuple):
+    offset: float
+
+
+# payload format and record type of every known notification
+MESSAGE_TYPES: dict[int, tuple[struct.Struct, type[tuple]]] = {
+    VERSION_RESPONSE: (struct.Struct("<BB"), VersionMessage),
+    BATTERY_RESPONSE: (struct.Struct("<H"), BatteryMessage),
+    LOCATION_UPDATE: (struct.Struct("<BBfHB"), LocationMessage),
+    TRANSITION_UPDATE: (struct.Struct("<BBfB"), TransitionMessage),
+    OFFSET_UPDATE: (struct.Struct("<f"), OffsetMessage)}
+
+
+def create_decoder(message_id: int) -> tuple[Callable[[Any, int], tuple], int, Callable[[tuple], Any]]:
+    """
+    Gets what is needed to decode a whole notification with the given ID into its record: the function that unpacks
+    the payload from a buffer at an offset (`PAYLOAD_START`), the minimum size of the notification and the function
+    that creates the record from the unpacked values. Raises a KeyError, if the ID is unknown
+    """
+    payload_struct, record_type = MESSAGE_TYPES[message_id]
+    # tuple.__new__ skips the argument handling of the generated constructor of the record
+    return payload_struct.unpack_from, PAYLOAD_START + payload_struct.size, partial(tuple.__new__, record_type)
+
+
+def encode_message(message_id: int, *values: Any) -> bytearray:
+    """
+    Encodes a whole notification with the given ID and payload values like a car sends it, e.g. for an emulated car.
+    Raises a KeyError, if the ID is unknown
+    """
+    payload_struct, _ = MESSAGE_TYPES[message_id]
+    message = bytearray((PAYLOAD_START - 1 + payload_struct.size, message_id))
+    message += payload_struct.pack(*values)
+    return message
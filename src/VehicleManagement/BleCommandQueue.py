@@ -0,0 +1,137 @@
+# Copyright 2024 IAV GmbH
+#
+# This file is part of the IAV Distortion project an interactive
+# and educational showcase designed to demonstrate the need
+# of automotive cybersecurity in a playful, engaging manner.
+# and is released under the "Apache 2.0". Please see the LICENSE
+# file that should have been included as part of this package.
+#
+import logging
+from collections import deque
+from enum import IntEnum
+
+logger = logging.getLogger(__name__)
+
+
+class CommandPriority(IntEnum):
+    """
+    Priorities of the BLE commands. Commands with a lower value are sent first
+    """
+    # commands that stop the car
+    SAFETY = 0
+    # commands that change the state of the car, like lane changes, turns and the setup. They are never dropped
+    CONTROL = 1
+    # speed updates. Only the latest one is kept
+    SPEED = 2
+    # requests for information like the version or the battery. They are dropped first if the queue is full
+    INFO = 3
+
+
+class BleCommandQueue:
+    """
+    Bounded priority queue of the BLE commands of one car. Commands of the same priority are sent in the order
+    they were added. Speed updates are coalesced, so only the latest one waits in the queue. If the queue is full,
+    the oldest commands with the lowest priority that may be dropped (speed updates and information requests) are
+    removed. Safety and control commands are always accepted, even if the queue is full.
+    """
+
+    def __init__(self, capacity: int = 16):
+        """
+        Parameters
+        ----------
+        capacity: int
+            Maximum amount of waiting commands before commands are dropped
+        """
+        self._capacity: int = capacity
+        self._queues: dict[CommandPriority, deque[tuple[str, bytes]]] = {priority: deque()
+                                                                         for priority in CommandPriority}
+        self._size: int = 0
+        self._dropped: dict[str, int] = dict()
+        self._coalesced: int = 0
+
+    def put(self, name: str, frame: bytes, priority: CommandPriority) -> None:
+        """
+        Adds a command to the queue
+
+        Parameters
+        ----------
+        name: str
+            Name of the kind of the command, used for the statistics
+        frame: bytes
+            Complete frame of the command as it's written to the car, including the length byte (see
+            `AnkiCommands`)
+        priority: CommandPriority
+            Priority of the command
+        """
+        if priority == CommandPriority.SAFETY:
+            # pending speed updates would undo the stop
+            self._coalesced += len(self._queues[CommandPriority.SPEED])
+            self._remove_all(CommandPriority.SPEED)
+        elif priority == CommandPriority.SPEED and len(self._queues[CommandPriority.SPEED]) > 0:
+            self._queues[CommandPriority.SPEED][0] = (name, frame)
+            self._coalesced += 1
+            return
+
+        if self._size >= self._capacity and not self._drop_one(priority):
+            if priority in (CommandPriority.SAFETY, CommandPriority.CONTROL):
+                logger.warning("The BLE command queue is full. Adding the %s command anyway", name)
+            else:
+                self._count_drop(name)
+                return
+        self._queues[priority].append((name, frame))
+        self._size += 1
+
+    def get_nowait(self) -> tuple[str, bytes] | None:
+        """
+        Removes the command with the highest priority from the queue and returns its name and the frame. Returns
+        None, if the queue is empty
+        """
+        for queue in self._queues.values():
+            if len(queue) > 0:
+                self._size -= 1
+                return queue.popleft()
+        return None
+
+    def clear(self) -> None:
+        """
+        Removes all waiting commands without counting them as dropped
+        """
+        for priority in CommandPriority:
+            self._remove_all(priority)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get_dropped_counts(self) -> dict[str, int]:
+        """
+        Gets the amount of dropped commands by the name of their kind
+        """
+        return dict(self._dropped)
+
+    def get_coalesced_count(self) -> int:
+        """
+        Gets the amount of speed updates that were replaced by a newer one before they were sent
+        """
+        return self._coalesced
+
+    def _drop_one(self, priority: CommandPriority) -> bool:
+        """
+        Drops the oldest command with the lowest priority that may be dropped and that is lower than or equal to
+        the given priority. Returns whether a command was dropped
+        """
+        for droppable in (CommandPriority.INFO, CommandPriority.SPEED):
+            queue = self._queues[droppable]
+            if droppable >= priority and len(queue) > 0:
+                name, _ = queue.popleft()
+                self._size -= 1
+                self._count_drop(name)
+                return True
+        return False
+
+    def _count_drop(self, name: str) -> None:
+        self._dropped[name] = self._dropped.get(name, 0) + 1
+        logger.debug("Dropped a %s command, because the BLE command queue is full", name)
+
+    def _remove_all(self, priority: CommandPriority) -> None:
+        self._size -= len(self._queues[priority])
+        self._queues[priority].clear()
@@ -0,0 +1,347 @@
+# Copyright 2024 IAV GmbH
+#
+# This file is part of the IAV Distortion project an interactive
+# and educational showcase designed to demonstrate the need
+# of automotive cybersecurity in a playful, engaging manner.
+# and is released under the "Apache 2.0". Please see the LICENSE
+# file that should have been included as part of this package.
+#
+import asyncio
+import logging
+import random
+from collections import deque
+from typing import Any, Callable, Coroutine
+
+from bleak.exc import BleakError
+
+import Constants
+from EnvironmentManagement.Clock import get_clock
+from LocationService.LocationService import LocationService, SimulationClock
+from LocationService.Track import FullTrack
+from LocationService.Trigo import Position, Angle
+from VehicleManagement.AnkiCommands import SPEED_FRAME, LANE_FRAME, ROAD_OFFSET_FRAME, DISCONNECT, VERSION_REQUEST, \
+    BATTERY_REQUEST, SET_SPEED, CHANGE_LANE, SET_ROAD_OFFSET, UPDATE_ROAD_OFFSET, TURN, SDK_MODE
+from VehicleManagement.AnkiMessages import encode_message, VERSION_RESPONSE, BATTERY_RESPONSE, LOCATION_UPDATE, \
+    TRANSITION_UPDATE, OFFSET_UPDATE
+
+logger = logging.getLogger(__name__)
+
+# commands a car ignores until the SDK mode is enabled
+_DRIVING_COMMANDS: frozenset[int] = frozenset({SET_SPEED, CHANGE_LANE, TURN, SET_ROAD_OFFSET, UPDATE_ROAD_OFFSET})
+
+
+class _DelayedChannel:
+    """
+    Runs coroutines after a delay in the order they were added, like a BLE connection delivers packets in order
+    """
+
+    def __init__(self) -> None:
+        self._pending: deque[tuple[float, Coroutine[Any, Any, None]]] = deque()
+        self._last_due: float = 0
+        self._task: asyncio.Task[None] | None = None
+        # increased by `clear`, so a coroutine that was already taken out of the queue gets dropped as well
+        self._generation: int = 0
+
+    def put(self, delay: float, coroutine: Coroutine[Any, Any, None]) -> None:
+        """
+        Runs the coroutine after the delay in seconds, but not before the coroutines that were added earlier
+        """
+        self._last_due = max(get_clock().time() + delay, self._last_due)
+        self._pending.append((self._last_due, coroutine))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def clear(self) -> None:
+        """
+        Drops all coroutines that didn't run yet
+        """
+        self._generation += 1
+        self._last_due = 0
+        for _, coroutine in self._pending:
+            coroutine.close()
+        self._pending.clear()
+
+    async def _run(self) -> None:
+        clock = get_clock()
+        try:
+            while len(self._pending) > 0:
+                generation = self._generation
+                due, coroutine = self._pending.popleft()
+                remaining_time = due - clock.time()
+                if remaining_time > 0:
+                    await clock.sleep(remaining_time)
+                if generation != self._generation:
+                    coroutine.close()
+                    continue
+                try:
+                    await coroutine
+                except Exception:
+                    logger.exception("A delayed coroutine of an emulated car failed")
+        finally:
+            self._task = None
+
+
+class EmulatedAnkiCar:
+    """
+    Software stand-in for the `BleakClient` of an Anki car, so the physical path (`AnkiController`, `PhysicalCar`
+    and `PhysicalLocationService`) can be tested and load tested without cars.
+
+    It accepts the same GATT writes as a car (speed, lane change, U-Turn, SDK mode, road offset, version and
+    battery requests and disconnect) and drives a `LocationService` over the track with them. While driving it
+    sends a transition notification (0x29) every time it enters a piece and `locations_per_piece` location
+    notifications (0x27) evenly spread over every piece with the physical ID of the piece. Like a real car, it
+    ignores driving commands until the SDK mode is enabled. The track needs the physical IDs of the pieces (e.g. from
+    a scanned track), otherwise the notifications report the ID 0.
+
+    Commands and notifications are delayed by `latency` and a random part up to `jitter` in seconds and arrive in
+    the order they were sent. Every notification is lost with the probability `loss`.
+    """
+
+    def __init__(self,
+                 address: str,
+                 track: FullTrack,
+                 simulation_clock: SimulationClock | None = None,
+                 latency: float = 0.02,
+                 jitter: float = 0.01,
+                 loss: float = 0,
+                 locations_per_piece: int = 3,
+                 battery_level: int = 3900,
+                 version: int = 0x2e50,
+                 seed: int | None = None):
+        """
+        Parameters
+        ----------
+        address: str
+            MAC address the car reports
+        track: FullTrack
+            Track the car drives on. It starts at the beginning of the first piece
+        simulation_clock: SimulationClock | None
+            Clock that drives the simulation of the car. If None, the simulation runs in its own task
+        latency: float
+            Minimum delay in seconds of commands and notifications
+        jitter: float
+            Maximum random delay in seconds that is added to the latency
+        loss: float
+            Probability that a notification is lost
+        locations_per_piece: int
+            Amount of location notifications per piece
+        battery_level: int
+            Battery level in mV the car reports
+        version: int
+            Firmware version the car reports
+        seed: int | None
+            Seed of the random delays and losses
+        """
+        self.address: str = address
+        self._track: FullTrack = track
+        self._latency: float = latency
+        self._jitter: float = jitter
+        self._loss: float = loss
+        self._locations_per_piece: int = locations_per_piece
+        self._battery_level: int = battery_level
+        self._version: int = version
+        self._random: random.Random = random.Random(seed)
+
+        self._location_service: LocationService = LocationService(track, simulation_clock=simulation_clock)
+        self._location_service.add_on_update_callback(self._on_location_update)
+        self._connected: bool = False
+        self._sdk_mode: bool = False
+        self._notification_callback: Callable[[Any, bytearray], None] | None = None
+        self._to_car: _DelayedChannel = _DelayedChannel()
+        self._to_client: _DelayedChannel = _DelayedChannel()
+        # writes with response that wait for the car to get the command
+        self._pending_acknowledgements: set[asyncio.Future[None]] = set()
+
+        self._piece_index: int | None = None
+        self._entry_progress: float = 0
+        # amount of location notifications that were sent on the current piece
+        self._locations_sent: int = 0
+        self._offset: float = 0
+
+        self._sent_notifications: int = 0
+        self._lost_notifications: int = 0
+
+        self._command_handlers: dict[int, Callable[[bytes], Coroutine[Any, Any, None]]] = {
+            SDK_MODE: self._set_sdk_mode,
+            VERSION_REQUEST: self._send_version,
+            BATTERY_REQUEST: self._send_battery_level,
+            DISCONNECT: self._disconnect_by_command,
+            SET_SPEED: self._set_speed,
+            CHANGE_LANE: self._change_lane,
+            TURN: self._turn,
+            SET_ROAD_OFFSET: self._set_road_offset,
+            UPDATE_ROAD_OFFSET: self._send_road_offset}
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def connect(self, **_: Any) -> bool:
+        """
+        Connects to the car and starts driving the simulation. The car stands still until it gets a speed command
+        """
+        self._connected = True
+        # the car stands still after connecting, even if it was driving before it was disconnected
+        await self._location_service.set_speed_percent(0)
+        self._location_service.start()
+        return True
+
+    async def disconnect(self) -> bool:
+        """
+        Disconnects from the car. The car stops and the commands and notifications that weren't delivered are dropped
+        """
+        self._disconnect()
+        return True
+
+    async def start_notify(self, _: Any, callback: Callable[[Any, bytearray], None], **__: Any) -> None:
+        """
+        Sets the function that gets the notifications. Like with a `BleakClient`, it gets the sender (always None)
+        and the data
+        """
+        self._notification_callback = callback
+
+    async def stop_notify(self, _: Any) -> None:
+        self._notification_callback = None
+
+    async def write_gatt_char(self, _: Any, data: bytes | bytearray, response: bool = False) -> None:
+        """
+        Sends a command to the car. With a response the write waits until the car got the command and the
+        acknowledgement arrived back
+        """
+        if not self._connected:
+            raise BleakError(f"Emulated car {self.address} isn't connected")
+        if not response:
+            self._to_car.put(self._get_delay(), self._handle_command(bytes(data)))
+            return
+        received: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._pending_acknowledgements.add(received)
+        self._to_car.put(self._get_delay(), self._handle_command(bytes(data), received))
+        try:
+            await received
+        finally:
+            self._pending_acknowledgements.discard(received)
+        await get_clock().sleep(self._get_delay())
+
+    def get_sent_notification_count(self) -> int:
+        """
+        Gets the amount of notifications the car sent, including the lost ones
+        """
+        return self._sent_notifications
+
+    def get_lost_notification_count(self) -> int:
+        """
+        Gets the amount of notifications that were lost
+        """
+        return self._lost_notifications
+
+    def _disconnect(self) -> None:
+        self._connected = False
+        self._sdk_mode = False
+        self._location_service.stop()
+        self._to_car.clear()
+        self._to_client.clear()
+        for received in self._pending_acknowledgements:
+            if not received.done():
+                received.set_exception(BleakError(f"Emulated car {self.address} was disconnected"))
+
+    def _get_delay(self) -> float:
+        return self._latency + self._random.uniform(0, self._jitter)
+
+    async def _handle_command(self, data: bytes, received: asyncio.Future[None] | None = None) -> None:
+        """
+        Executes a command when it arrives at the car
+        """
+        try:
+            await self._execute_command(data)
+        except Exception:
+            logger.exception("The emulated car %s couldn't execute the command %s", self.address, data.hex(" ", 1))
+        if received is not None and not received.done():
+            received.set_result(None)
+
+    async def _execute_command(self, data: bytes) -> None:
+        command_id = data[1]
+        handler = self._command_handlers.get(command_id)
+        if handler is None:
+            logger.debug("The emulated car %s got the unknown command 0x%02x", self.address, command_id)
+        elif command_id in _DRIVING_COMMANDS and not self._sdk_mode:
+            logger.debug("The emulated car %s ignores the command 0x%02x outside of the SDK mode", self.address,
+                         command_id)
+        else:
+            await handler(data)
+
+    async def _set_sdk_mode(self, data: bytes) -> None:
+        self._sdk_mode = data[3] == 0x01
+
+    async def _send_version(self, _: bytes) -> None:
+        self._notify(VERSION_RESPONSE, self._version & 0xff, self._version >> 8)
+
+    async def _send_battery_level(self, _: bytes) -> None:
+        self._notify(BATTERY_RESPONSE, self._battery_level)
+
+    async def _disconnect_by_command(self, _: bytes) -> None:
+        self._disconnect()
+
+    async def _set_speed(self, data: bytes) -> None:
+        _, _, speed, acceleration, _ = SPEED_FRAME.unpack(data)
+        await self._location_service.set_speed_percent(speed * 100 / Constants.MAX_ANKI_SPEED, acceleration)
+
+    async def _change_lane(self, data: bytes) -> None:
+        _, _, speed, acceleration, offset = LANE_FRAME.unpack(data)
+        await self._location_service.set_speed_percent(speed * 100 / Constants.MAX_ANKI_SPEED, acceleration)
+        await self._location_service.set_offset_int(offset / Constants.TRACK_LANE_WIDTH)
+
+    async def _turn(self, _: bytes) -> None:
+        await self._location_service.do_uturn()
+
+    async def _set_road_offset(self, data: bytes) -> None:
+        _, _, self._offset = ROAD_OFFSET_FRAME.unpack(data)
+
+    async def _send_road_offset(self, _: bytes) -> None:
+        self._notify(OFFSET_UPDATE, self._offset)
+
+    def _on_location_update(self, _: Position | None, __: Angle, data: dict[str, Any]) -> None:
+        """
+        Sends the notifications for the new position of the simulation
+        """
+        offset = self._location_service.get_arc_length_offset()
+        index, progress = self._track.from_arc_length(self._location_service.get_arc_length(), offset)
+        self._offset = data['offset']
+        if self._piece_index is None:
+            self._piece_index = index
+            self._entry_progress = progress
+            return
+        if index != self._piece_index:
+            direction = 0 if data['going_clockwise'] else 1
+            self._notify(TRANSITION_UPDATE, self._get_physical_id(index), self._get_physical_id(self._piece_index),
+                         self._offset, direction)
+            self._piece_index = index
+            self._entry_progress = progress
+            self._locations_sent = 0
+            return
+        # the locations are in the middle of equally long parts of the piece
+        length = self._track.get_piece_length(index, offset)
+        while self._locations_sent < self._locations_per_piece and abs(progress - self._entry_progress) \
+                >= (self._locations_sent + 0.5) / self._locations_per_piece * length:
+            self._notify(LOCATION_UPDATE, self._locations_sent, self._get_physical_id(index), self._offset,
+                         int(data['speed']), 0)
+            self._locations_sent += 1
+
+    def _get_physical_id(self, index: int) -> int:
+        physical_id = self._track.get_entry_tupel(index)[0].get_physical_id()
+        return 0 if physical_id is None else physical_id
+
+    def _notify(self, message_id: int, *values: Any) -> None:
+        """
+        Sends a notification to the client, unless it's lost
+        """
+        if not self._connected or self._notification_callback is None:
+            return
+        self._sent_notifications += 1
+        if self._random.random() < self._loss:
+            self._lost_notifications += 1
+            return
+        self._to_client.put(self._get_delay(), self._deliver(encode_message(message_id, *values)))
+
+    async def _deliver(self, message: bytearray) -> None:
+        if self._notification_callback is not None:
+            self._notification_callback(None, message)
@@ -0,0 +1,108 @@
+# Copyright 2024 IAV GmbH
+#
+# This file is part of the IAV Distortion project an interactive
+# and educational showcase designed to demonstrate the need
+# of automotive cybersecurity in a playful, engaging manner.
+# and is released under the "Apache 2.0". Please see the LICENSE
+# file that should have been included as part of this package.
+#
+"""
+Runs the game loop without UI and without physical cars on a virtual clock as fast as the CPU allows.
+Meant for load studies, e.g. simulating a 5 minute race with all virtual vehicles in a few seconds.
+
+Usage (from the src directory, the track is taken from config_file.json):
+    python headless_simulation.py --duration 300 --cars 8
+"""
+import argparse
+import asyncio
+import logging
+import time
+from sys import stdout
+from typing import Any
+
+from EnvironmentManagement.Clock import VirtualClock, set_clock
+from EnvironmentManagement.EnvironmentManager import EnvironmentManager
+from Items.ItemGenerator import ItemGenerator
+from VehicleManagement.FleetController import FleetController
+
+logger = logging.getLogger(__name__)
+
+
+async def run_headless(duration: float, car_count: int, speed_percent: float = 50,
+                       step: float = 1) -> dict[str, Any]:
+    """
+    Runs the game with virtual vehicles for the given amount of virtual seconds.
+
+    Parameters
+    ----------
+    duration: float
+        Virtual time in seconds to simulate
+    car_count: int
+        Amount of virtual vehicles to add. Limited by the virtual vehicles in the configuration
+    speed_percent: float
+        Speed the players request for their vehicles
+    step: float
+        Virtual time in seconds that is simulated at once before the control is given back to the caller
+
+    Returns
+    -------
+    dict[str, Any]
+        Statistics of the run: simulated virtual seconds, needed real seconds, simulation ticks, overruns and
+        the amount of vehicles that still have a player at the end
+    """
+    clock = VirtualClock()
+    set_clock(clock)
+
+    environment_mng = EnvironmentManager(FleetController())
+    # there is no UI that has to be informed about changes
+    environment_mng.set_staff_ui_update_callback(lambda *_: None)
+    environment_mng.set_publish_removed_player_callback(lambda *_: None)
+    environment_mng.set_publish_player_active_callback(lambda *_: None)
+    if environment_mng.get_track() is None:
+        raise ValueError("The configuration doesn't contain a track to drive on")
+    item_generator = ItemGenerator(environment_mng.get_item_collision_detector(), environment_mng.get_track())
+    environment_mng.add_item_generator(item_generator)
+    await item_generator.start_item_generation()
+
+    for i in range(0, car_count):
+        if environment_mng.add_virtual_vehicle() == "undefined":
+            break
+        environment_mng.put_player_on_next_free_spot(f"headless player {i}")
+    for vehicle in environment_mng.get_vehicle_list():
+        vehicle.request_speed_percent(speed_percent)
+
+    real_start = time.perf_counter()
+    simulated: float = 0
+    while simulated < duration:
+        current_step = min(step, duration - simulated)
+        await clock.advance(current_step)
+        simulated += current_step
+    real_duration = time.perf_counter() - real_start
+
+    simulation_clock = environment_mng.get_simulation_clock()
+    statistics = {
+        'virtual_seconds': simulated,
+        'real_seconds': real_duration,
+        'ticks': simulation_clock.get_tick_count(),
+        'overruns': simulation_clock.get_overrun_count(),
+        'vehicles': len(environment_mng.get_vehicle_list()),
+        'vehicles_with_player': len(environment_mng.get_controlled_cars_list())}
+    for vehicle in list(environment_mng.get_vehicle_list()):
+        environment_mng.remove_vehicle_by_id(vehicle.get_vehicle_id())
+    return statistics
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run IAV Distortion headless on a virtual clock")
+    parser.add_argument('--duration', type=float, default=300, help="virtual seconds to simulate")
+    parser.add_argument('--cars', type=int, default=8, help="amount of virtual vehicles")
+    parser.add_argument('--speed', type=float, default=50, help="requested speed in percent")
+    args = parser.parse_args()
+
+    logging.basicConfig(encoding='utf-8', level=logging.WARNING, format='%(asctime)s - %(levelname)s: %(message)s',
+                        handlers=[logging.StreamHandler(stream=stdout)])
+
+    result = asyncio.run(run_headless(args.duration, args.cars, speed_percent=args.speed))
+    print(f"Simulated {result['virtual_seconds']:.0f} s with {result['vehicles']} vehicles "
+          f"in {result['real_seconds']:.2f} s ({result['ticks']} ticks, {result['overruns']} overruns, "
+          f"{result['vehicles_with_player']} vehicles still have a player)")
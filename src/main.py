@@ -35,7 +35,9 @@ def create_app(admin_password: str):
 
     config_handler = ConfigurationHandler()
     fleet_ctrl = FleetController()
-    environment_mng = EnvironmentManager(fleet_ctrl)
+    environment_mng = EnvironmentManager(fleet_ctrl, track_artifact_file='track_artifact.bin',
+                                         speed_profile_file='speed_profiles.json',
+                                         piece_length_file='piece_lengths.json')
     vehicles = environment_mng.get_vehicle_list()
     behaviour_ctrl = BehaviourController(vehicles)
     cybersecurity_mng = CyberSecurityManager(environment_mng)
@@ -0,0 +1,59 @@
+"""
+Compares the time needed for one simulation step of a LocationService that calculates the positions with the track
+pieces and one that looks them up in a baked track.
+
+Run from the repository root with:
+    PYTHONPATH=src python test/Benchmarks/BakedTrack_Benchmark.py
+"""
+import timeit
+
+from LocationService.LocationService import LocationService
+from LocationService.Track import TrackPieceType, FullTrack
+from LocationService.TrackPieces import TrackBuilder
+
+RESOLUTIONS: list[float | None] = [None, 50, 10, 2]
+STEPS: int = 20000
+REPEAT: int = 20
+
+
+def get_track() -> FullTrack:
+    return TrackBuilder() \
+        .append(TrackPieceType.STRAIGHT_WE) \
+        .append(TrackPieceType.CURVE_WS) \
+        .append(TrackPieceType.CURVE_NW) \
+        .append(TrackPieceType.STRAIGHT_EW) \
+        .append(TrackPieceType.CURVE_EN) \
+        .append(TrackPieceType.CURVE_SE) \
+        .build()
+
+
+def create_service(track: FullTrack, resolution: float | None) -> LocationService:
+    service = LocationService(track, baked_track_resolution=resolution)
+    service._set_offset_mm(22.5)
+    service._actual_offset = service._target_offset
+    return service
+
+
+def main() -> None:
+    track = get_track()
+    services = [create_service(track, resolution) for resolution in RESOLUTIONS]
+    # the variants are measured alternately and the fastest run is used to reduce the influence of other processes
+    durations = [float('inf')] * len(services)
+    for _ in range(0, REPEAT):
+        for i, service in enumerate(services):
+            # 600 mm/s with 24 ticks per second
+            duration = timeit.timeit(lambda: service._run_simulation_step(25), number=STEPS)
+            durations[i] = min(durations[i], duration / STEPS)
+
+    print(f"{'resolution':>10} | {'samples':>8} | {'error bound':>11} | {'time per step':>13}")
+    for resolution, duration in zip(RESOLUTIONS, durations):
+        if resolution is None:
+            print(f"{'exact':>10} | {'-':>8} | {'-':>11} | {duration * 1e6:10.2f} us")
+            continue
+        baked_track = track.get_baked_track(resolution)
+        print(f"{resolution:>7} mm | {baked_track.get_sample_count():>8} | {baked_track.get_error_bound():8.4f} mm "
+              f"| {duration * 1e6:10.2f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Measures the time from a speed input until the command is written to a stand-in for the BLE client, for acknowledged
+writes and writes without response at different input rates.
+
+The stand-in models a connection with a fixed connection interval: a write without response is sent with the next
+connection event, an acknowledged write needs another one for the response. Inputs that are replaced by a newer one
+before they are written are counted as coalesced and their latency is the time until the newer value was written.
+
+Run from the repository root with:
+    PYTHONPATH=src python test/Benchmarks/BleWriteLatency_Benchmark.py
+"""
+import asyncio
+import statistics
+import struct
+import time
+
+import Constants
+from VehicleManagement.AnkiController import AnkiController, ble_connection_logger, file_handler
+
+INPUT_RATES: list[int] = [10, 20, 50]
+CONNECTION_INTERVAL: float = 0.03
+DURATION: float = 3
+
+
+class StandInBleClient:
+    """
+    Records the time at which every speed value was written
+    """
+    def __init__(self):
+        self.address = 'stand-in'
+        self.write_times: dict[int, float] = dict()
+        self._start: float = time.monotonic()
+
+    async def _wait_for_connection_event(self) -> None:
+        elapsed = time.monotonic() - self._start
+        await asyncio.sleep(CONNECTION_INTERVAL - elapsed % CONNECTION_INTERVAL)
+
+    async def write_gatt_char(self, _: str, data: bytes, response: bool) -> None:
+        await self._wait_for_connection_event()
+        if response:
+            await self._wait_for_connection_event()
+        if data[1] == 0x24:
+            self.write_times[struct.unpack_from('<H', data, 2)[0]] = time.monotonic()
+
+    async def stop_notify(self, _: str) -> None:
+        return
+
+
+async def measure(rate: int, write_without_response: bool) -> tuple[list[float], int]:
+    controller = AnkiController(write_without_response=write_without_response)
+    client = StandInBleClient()
+    controller._connected_car = client
+    input_times: list[tuple[int, float]] = []
+    # distinct speeds, so every write can be matched to its input
+    for i in range(int(rate * DURATION)):
+        velocity = 10 + i * 0.5
+        input_times.append((int(Constants.MAX_ANKI_SPEED * velocity / 100), time.monotonic()))
+        controller.change_speed_to(velocity)
+        await asyncio.sleep(1 / rate)
+    await asyncio.sleep(0.5)
+
+    latencies = []
+    coalesced = 0
+    next_write_time = None
+    # the latency of an input is the time until it or a newer value was written
+    for speed_int, input_time in reversed(input_times):
+        write_time = client.write_times.get(speed_int)
+        if write_time is None:
+            coalesced += 1
+            write_time = next_write_time
+        else:
+            next_write_time = write_time
+        if write_time is not None:
+            latencies.append(write_time - input_time)
+    return latencies, coalesced
+
+
+async def main() -> None:
+    # the stand-in connections shouldn't be written to the connection trace in the working directory
+    ble_connection_logger.removeHandler(file_handler)
+    print(f"connection interval {CONNECTION_INTERVAL * 1000:.0f} ms")
+    print(f"{'input rate':>10} | {'mode':>22} | {'mean':>8} | {'p95':>8} | {'max':>8} | {'coalesced':>9}")
+    for rate in INPUT_RATES:
+        for write_without_response in [False, True]:
+            latencies, coalesced = await measure(rate, write_without_response)
+            latencies.sort()
+            mode = 'write without response' if write_without_response else 'acknowledged'
+            print(f"{rate:>7} Hz | {mode:>22} | {statistics.mean(latencies) * 1000:5.1f} ms "
+                  f"| {latencies[int(len(latencies) * 0.95)] * 1000:5.1f} ms | {latencies[-1] * 1000:5.1f} ms "
+                  f"| {coalesced:>9}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Measures the load of the physical path (AnkiController, PhysicalCar and PhysicalLocationService) with emulated Anki
+cars that drive on an oval track with 14 pieces. For every amount of cars they drive in real time and the time needed
+for the ticks of the simulation clock, the amount of notifications and the CPU usage of the process are reported.
+
+Run from the repository root with:
+    PYTHONPATH=src python test/Benchmarks/EmulatedCars_Benchmark.py
+"""
+import asyncio
+import statistics
+import time
+from typing import Any
+
+from DataModel.PhysicalCar import PhysicalCar
+from EnvironmentManagement.EnvironmentManager import EnvironmentManager
+from LocationService.Track import TrackPieceType, FullTrack
+from LocationService.TrackPieces import TrackBuilder
+from VehicleManagement.AnkiController import ble_connection_logger, file_handler
+from VehicleManagement.FleetController import FleetController
+
+CAR_COUNTS: list[int] = [16, 32, 64]
+DURATION: float = 10
+
+
+class BenchmarkConfiguration:
+    """
+    Configuration that is only kept in memory, so the configuration file isn't changed
+    """
+    def __init__(self, track: FullTrack):
+        self._configuration: dict[str, Any] = {'virtual_cars_pics': {}, 'environment': {},
+                                               'track': track.get_as_json_list()}
+
+    def get_configuration(self) -> dict[str, Any]:
+        return self._configuration
+
+    def write_configuration(self, new_config: dict[str, Any]) -> None:
+        self._configuration.update(new_config)
+
+
+def get_track() -> FullTrack:
+    # an oval with long straights. The physical IDs don't repeat with a period, so the cars can be localised
+    straight_ids = [36, 39, 40, 48, 51, 57, 36, 40, 39, 51]
+    curve_ids = [17, 18, 20, 23]
+    builder = TrackBuilder()
+    for piece_id in straight_ids[:5]:
+        builder.append(TrackPieceType.STRAIGHT_WE, piece_id)
+    builder.append(TrackPieceType.CURVE_WS, curve_ids[0]).append(TrackPieceType.CURVE_NW, curve_ids[1])
+    for piece_id in straight_ids[5:]:
+        builder.append(TrackPieceType.STRAIGHT_EW, piece_id)
+    builder.append(TrackPieceType.CURVE_EN, curve_ids[2]).append(TrackPieceType.CURVE_SE, curve_ids[3])
+    return builder.build()
+
+
+async def measure(count: int) -> None:
+    env_manager = EnvironmentManager(FleetController(), BenchmarkConfiguration(get_track()))
+    addresses = await env_manager.add_emulated_cars(count)
+    vehicles = [vehicle for vehicle in env_manager.get_vehicle_list() if isinstance(vehicle, PhysicalCar)]
+    for i, vehicle in enumerate(vehicles):
+        vehicle.request_speed_percent(30 + i % 5 * 10)
+
+    simulation_clock = env_manager._simulation_clock
+    tick_durations: list[float] = []
+    simulation_clock.add_on_tick_callback(lambda: tick_durations.append(simulation_clock.get_last_tick_duration()))
+    overruns = simulation_clock.get_overrun_count()
+    emulated_cars = [vehicle._controller._connected_car for vehicle in vehicles]
+    notifications = sum(car.get_sent_notification_count() for car in emulated_cars)
+    start_cpu, start = time.process_time(), time.monotonic()
+    await asyncio.sleep(DURATION)
+    cpu, duration = time.process_time() - start_cpu, time.monotonic() - start
+
+    notifications = sum(car.get_sent_notification_count() for car in emulated_cars) - notifications
+    localised = sum(1 for vehicle in vehicles if vehicle._location_service.get_estimated_speed() is not None)
+    print(f"{count:>4} | {statistics.mean(tick_durations) * 1000:8.2f} ms | {max(tick_durations) * 1000:8.2f} ms "
+          f"| {simulation_clock.get_overrun_count() - overruns:>8} | {notifications / duration:>8.0f} "
+          f"| {cpu / duration * 100:6.1f} % | {localised:>4}/{count}")
+    for address in addresses:
+        env_manager.remove_vehicle_by_id(address)
+
+
+async def main() -> None:
+    # the emulated connections shouldn't be written to the connection trace in the working directory
+    ble_connection_logger.removeHandler(file_handler)
+    print(f"{'cars':>4} | {'mean tick':>11} | {'max tick':>11} | {'overruns':>8} | {'notif./s':>8} | {'CPU':>8} "
+          f"| {'localised':>9}")
+    for count in CAR_COUNTS:
+        await measure(count)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+"""
+Measures the time the PhysicalLocationService needs to process the location events of a physical car that drives on
+tracks of different lengths, starting with an unknown position.
+
+Run from the repository root with:
+    PYTHONPATH=src python test/Benchmarks/PhysicalLocalisation_Benchmark.py
+"""
+import logging
+import random
+import time
+
+from LocationService.PhysicalLocationService import PhysicalLocationService
+from LocationService.Track import TrackPieceType, FullTrack
+from LocationService.TrackPieces import TrackBuilder
+
+TRACK_LENGTHS: list[int] = [6, 50, 200, 800]
+# location events per run. Every location event is followed by a transition event
+EVENTS: int = 32
+REPEAT: int = 5
+
+
+def get_track(length: int) -> FullTrack:
+    """
+    Builds a track whose physical IDs are drawn from a small set, so a lot of them are duplicated
+    """
+    generator = random.Random(length)
+    builder = TrackBuilder()
+    for _ in range(0, length):
+        builder.append(TrackPieceType.STRAIGHT_WE, generator.randrange(17, 41))
+    return builder.build()
+
+
+def run(track: FullTrack, start: int, direction: int) -> float:
+    """
+    Lets a car drive from a piece in a direction and returns the time per location event. The transition events in
+    between aren't measured
+    """
+    service = PhysicalLocationService(track)
+    track_len = track.get_len()
+    physical_ids = [track.get_entry_tupel(i)[0].get_physical_id() for i in range(0, track_len)]
+    duration = 0.0
+    for event in range(0, EVENTS):
+        start_time = time.perf_counter()
+        service.notify_location_event(physical_ids[(start + direction * event) % track_len], 0, 0, 0)
+        duration += time.perf_counter() - start_time
+        service.notify_transition_event(0)
+    return duration / EVENTS
+
+
+def main() -> None:
+    # the service logs every ambiguous position and every reset of the history
+    logging.disable(logging.WARNING)
+    print(f"{'pieces':>6} | {'time per event':>14}")
+    for length in TRACK_LENGTHS:
+        track = get_track(length)
+        generator = random.Random(0)
+        duration = min(run(track, generator.randrange(0, length), generator.choice([1, -1]))
+                       for _ in range(0, REPEAT))
+        print(f"{length:>6} | {duration * 1e6:11.2f} us")
+
+
+if __name__ == '__main__':
+    main()
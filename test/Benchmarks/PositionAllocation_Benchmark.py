@@ -0,0 +1,70 @@
+"""
+Counts the objects that are created in one simulation tick of a virtual car, including the item collision
+detection and the location update of the vehicle.
+
+Run from the src directory (the item collision detection needs the configuration file) with:
+    PYTHONPATH=. python ../test/Benchmarks/PositionAllocation_Benchmark.py
+"""
+import asyncio
+import sys
+import tracemalloc
+from collections import Counter
+
+from DataModel.VirtualCar import VirtualCar
+from Items.ItemCollisionDetection import ItemCollisionDetector
+from LocationService.LocationService import LocationService
+from LocationService.Track import TrackPieceType
+from LocationService.TrackPieces import TrackBuilder
+from LocationService.Trigo import Position, Angle
+
+TICKS: int = 2400
+
+
+def count_created_objects(counter: Counter) -> None:
+    """
+    Wraps the constructors of the geometry classes to count how often they are called
+    """
+    for cls in [Position, Angle]:
+        original_init = cls.__init__
+
+        def counting_init(self, *args, __original_init=original_init, **kwargs):
+            counter[type(self).__name__] += 1
+            __original_init(self, *args, **kwargs)
+        cls.__init__ = counting_init
+
+
+async def main() -> None:
+    track = TrackBuilder() \
+        .append(TrackPieceType.STRAIGHT_WE) \
+        .append(TrackPieceType.CURVE_WS) \
+        .append(TrackPieceType.CURVE_NW) \
+        .append(TrackPieceType.STRAIGHT_EW) \
+        .append(TrackPieceType.CURVE_EN) \
+        .append(TrackPieceType.CURVE_SE) \
+        .build()
+    location_service = LocationService(track)
+    vehicle = VirtualCar('benchmark', location_service, disable_item_removal=True)
+    vehicle.set_virtual_location_update_callback(lambda *_: None)
+    item_collision_detector = ItemCollisionDetector()
+    location_service.add_on_update_callback(
+        lambda pos, rot, _: item_collision_detector.notify_new_vehicle_position(vehicle, pos, rot))
+    location_service._set_speed_mm(600, acceleration=1000)
+    location_service._set_offset_mm(22.5)
+
+    counter: Counter = Counter()
+    count_created_objects(counter)
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(0, TICKS):
+        await location_service._run_tick()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"objects created per tick (over {TICKS} ticks):")
+    for name, count in sorted(counter.items()):
+        print(f"    {name:>10}: {count / TICKS:.2f}")
+    print(f"leftover blocks: {sys.getallocatedblocks() - blocks_before}, traced peak: {peak} bytes")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+"""
+Compares the time needed for one simulation tick of the per car LocationService with the VectorizedSimulation
+for different fleet sizes.
+
+Run from the repository root with:
+    PYTHONPATH=src python test/Benchmarks/VectorizedSimulation_Benchmark.py
+"""
+import asyncio
+import time
+
+from LocationService.LocationService import LocationService
+from LocationService.Track import TrackPieceType, FullTrack
+from LocationService.TrackPieces import TrackBuilder
+from LocationService.VectorizedSimulation import VectorizedSimulation
+
+FLEET_SIZES: list[int] = [10, 100, 250, 500]
+TICKS: int = 240
+
+
+def get_track() -> FullTrack:
+    return TrackBuilder() \
+        .append(TrackPieceType.STRAIGHT_WE) \
+        .append(TrackPieceType.CURVE_WS) \
+        .append(TrackPieceType.CURVE_NW) \
+        .append(TrackPieceType.STRAIGHT_EW) \
+        .append(TrackPieceType.CURVE_EN) \
+        .append(TrackPieceType.CURVE_SE) \
+        .build()
+
+
+async def benchmark_location_services(track: FullTrack, fleet_size: int) -> float:
+    services: list[LocationService] = []
+    for i in range(0, fleet_size):
+        service = LocationService(track)
+        service._set_speed_mm(200 + i % 1000, acceleration=1000)
+        service._set_offset_mm(22.5 * (i % 7 - 3))
+        services.append(service)
+
+    start = time.perf_counter()
+    for _ in range(0, TICKS):
+        for service in services:
+            await service._run_simulation_step_threadsafe()
+    return (time.perf_counter() - start) / TICKS
+
+
+def benchmark_vectorized_simulation(track: FullTrack, fleet_size: int) -> float:
+    simulation = VectorizedSimulation(track, initial_capacity=fleet_size)
+    for i in range(0, fleet_size):
+        index = simulation.add_car()
+        simulation.set_speed_mm(index, 200 + i % 1000, acceleration=1000)
+        simulation.set_offset_mm(index, 22.5 * (i % 7 - 3))
+
+    start = time.perf_counter()
+    for _ in range(0, TICKS):
+        simulation.step()
+    return (time.perf_counter() - start) / TICKS
+
+
+async def main() -> None:
+    track = get_track()
+    print(f"{'cars':>6} | {'per car [ms/tick]':>18} | {'vectorized [ms/tick]':>21} | {'speedup':>8}")
+    for fleet_size in FLEET_SIZES:
+        per_car = await benchmark_location_services(track, fleet_size)
+        vectorized = benchmark_vectorized_simulation(track, fleet_size)
+        print(f"{fleet_size:>6} | {per_car * 1000:>18.3f} | {vectorized * 1000:>21.3f} | {per_car / vectorized:>7.1f}x")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -84,3 +84,16 @@ def test_on_driving_data_change() -> None:
 
     # Assert
     receive_callback_mock.assert_called_once()
+
+
+def test_transition_timestamp_is_forwarded() -> None:
+    location_service_mock = MagicMock()
+    controller = MagicMock()
+    controller.get_last_notification_time.return_value = 12.5
+    car = PhysicalCar('123', controller, location_service_mock, disable_item_removal=True)
+
+    car._receive_transition((0, 0, 10, 0))
+    location_service_mock.notify_transition_event.assert_called_once_with(10, 12.5)
+
+    location_service_mock.get_ble_latency.return_value = 0.02
+    assert car.get_ble_latency() == 0.02
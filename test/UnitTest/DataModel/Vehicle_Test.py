@@ -1,4 +1,3 @@
-import asyncio
 from time import sleep
 from unittest.mock import MagicMock
 
@@ -7,6 +6,7 @@ import pytest
 from DataModel.Effects.HackingProtection import HackingProtection
 from DataModel.Effects.VehicleEffect import VehicleEffect
 from DataModel.Vehicle import Vehicle
+from EnvironmentManagement.Clock import Clock, VirtualClock, set_clock
 from Items.Item import Item
 from LocationService.LocationService import LocationService
 from VehicleManagement.FleetController import FleetController
@@ -14,6 +14,14 @@ from VehicleManagement.FleetController import FleetController
 dummy_uuid = "FA:14:67:0F:39:FE"
 
 
+@pytest.fixture
+def virtual_clock():
+    clock = VirtualClock()
+    set_clock(clock)
+    yield clock
+    set_clock(Clock())
+
+
 @pytest.fixture
 def init_vehicle():
     location_service_mock = MagicMock(spec=LocationService)
@@ -55,9 +63,8 @@ def test_vehicle_cant_have_same_effect_twice(init_vehicle):
     assert len(car._effects) == 1
 
 
-@pytest.mark.slow
 @pytest.mark.asyncio
-async def test_vehicle_removes_effect():
+async def test_vehicle_removes_effect(virtual_clock):
     """
     This tests that vehicle effects are cleaned up, if they are told to
     """
@@ -68,5 +75,20 @@ async def test_vehicle_removes_effect():
 
     assert len(vehicle._effects) == 0
     vehicle._effects.append(mock_effect)
-    await asyncio.sleep(5)
+    await virtual_clock.advance(5)
     assert len(vehicle._effects) == 0
+
+
+@pytest.mark.asyncio
+async def test_hacking_protection_ends_after_duration(virtual_clock, init_vehicle):
+    """
+    This tests that the hacking protection ends after its duration passed on the clock of the game
+    """
+    effect = HackingProtection()
+    init_vehicle.apply_effect(effect)
+    duration = (effect._end_time - virtual_clock.now()).total_seconds()
+
+    await virtual_clock.advance(duration - 1)
+    assert not effect.effect_should_end(init_vehicle)
+    await virtual_clock.advance(2)
+    assert effect.effect_should_end(init_vehicle)
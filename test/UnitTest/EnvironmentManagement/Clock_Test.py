@@ -0,0 +1,73 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from EnvironmentManagement.Clock import Clock, VirtualClock, get_clock, set_clock
+
+
+@pytest.fixture
+def virtual_clock():
+    clock = VirtualClock(start=datetime(2024, 1, 1))
+    set_clock(clock)
+    yield clock
+    set_clock(Clock())
+
+
+@pytest.mark.asyncio
+async def test_sleepers_wake_up_in_order(virtual_clock: VirtualClock):
+    """
+    Test that sleeping tasks are woken up in the order of their wake up time with the matching virtual time
+    """
+    wake_ups: list[tuple[str, float]] = []
+
+    async def sleeper(name: str, seconds: float):
+        await virtual_clock.sleep(seconds)
+        wake_ups.append((name, virtual_clock.time()))
+
+    tasks = [asyncio.create_task(sleeper("late", 30)), asyncio.create_task(sleeper("early", 10)),
+             asyncio.create_task(sleeper("too late", 100))]
+    await virtual_clock.advance(60)
+
+    assert wake_ups == [("early", 10), ("late", 30)]
+    assert virtual_clock.time() == 60
+    assert virtual_clock.now() == datetime(2024, 1, 1) + timedelta(seconds=60)
+    assert virtual_clock.get_sleeper_count() == 1
+    for task in tasks:
+        task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_periodic_task_runs_faster_than_realtime(virtual_clock: VirtualClock):
+    """
+    Test that a loop sleeping on the game clock runs once per interval of virtual time without real waiting
+    """
+    iterations: list[float] = []
+
+    async def periodic():
+        while True:
+            await get_clock().sleep(0.5)
+            iterations.append(get_clock().time())
+
+    task = asyncio.create_task(periodic())
+    real_start = time.perf_counter()
+    await virtual_clock.advance(300)
+    task.cancel()
+
+    assert len(iterations) == 600
+    assert iterations[-1] == pytest.approx(300)
+    assert time.perf_counter() - real_start < 5
+
+
+@pytest.mark.asyncio
+async def test_cancelled_sleepers_are_skipped(virtual_clock: VirtualClock):
+    """
+    Test that a cancelled sleep doesn't break advancing the time
+    """
+    task = asyncio.create_task(virtual_clock.sleep(5))
+    await asyncio.sleep(0)
+    task.cancel()
+    await virtual_clock.advance(10)
+    assert task.cancelled()
+    assert virtual_clock.get_sleeper_count() == 0
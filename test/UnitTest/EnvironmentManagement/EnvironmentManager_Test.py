@@ -4,16 +4,26 @@ from unittest.mock import Mock, MagicMock
 
 from DataModel.PhysicalCar import PhysicalCar
 from DataModel.VirtualCar import VirtualCar
+from EnvironmentManagement.Clock import Clock, VirtualClock, set_clock
 from EnvironmentManagement.EnvironmentManager import EnvironmentManager, RemovalReason
 from EnvironmentManagement.ConfigurationHandler import ConfigurationHandler
 from LocationService.LocationService import LocationService
 from LocationService.Track import TrackPieceType, FullTrack
 from LocationService.TrackPieces import TrackBuilder
+from LocationService.VectorizedSimulation import VectorizedLocationService
 from VehicleManagement.FleetController import FleetController
 from DataModel.Vehicle import Vehicle
 from VehicleMovementManagement.BehaviourController import BehaviourController
 
 
+@pytest.fixture
+def virtual_clock():
+    clock = VirtualClock()
+    set_clock(clock)
+    yield clock
+    set_clock(Clock())
+
+
 @pytest.fixture(scope="module")
 def initialise_dependencies():
     fleet_ctrl_mock = Mock(spec=FleetController)
@@ -153,8 +163,8 @@ class TestAddNewPlayer:
 
 class TestPutPlayerOnNextFreeSpot:
     @pytest.mark.asyncio
-    @pytest.mark.slow
-    async def test_with_playing_time_check(self, get_mut_with_one_minute_playing_time, get_one_dummy_vehicle):
+    async def test_with_playing_time_check(self, virtual_clock, get_mut_with_one_minute_playing_time,
+                                           get_one_dummy_vehicle):
         # Arrange
         vehicle1: Vehicle = get_one_dummy_vehicle
         mut: EnvironmentManager = get_mut_with_one_minute_playing_time
@@ -169,19 +179,19 @@ class TestPutPlayerOnNextFreeSpot:
             pytest.fail("preconditions in vehicle list not correct.")
 
         # Assert
-        await asyncio.sleep(59)
+        await virtual_clock.advance(59)
         used_cars = mut.get_mapped_cars()
         assert len(used_cars) == 1
         assert used_cars[0]["player"] == "dummyplayer1"
         assert used_cars[0]["car"] == vehicle1.get_vehicle_id()
 
-        await asyncio.sleep(12)  # greater than playing time checking interval is 10 s
+        await virtual_clock.advance(12)  # greater than playing time checking interval is 10 s
         used_cars = mut.get_mapped_cars()
         assert len(used_cars) == 0
 
     @pytest.mark.asyncio
-    @pytest.mark.slow
-    async def test_without_playing_time_check(self, get_mut_with_endless_playing_time, get_one_dummy_vehicle):
+    async def test_without_playing_time_check(self, virtual_clock, get_mut_with_endless_playing_time,
+                                              get_one_dummy_vehicle):
         # Arrange
         vehicle1: Vehicle = get_one_dummy_vehicle
         mut: EnvironmentManager = get_mut_with_endless_playing_time
@@ -196,13 +206,13 @@ class TestPutPlayerOnNextFreeSpot:
             pytest.fail("preconditions in vehicle list not correct.")
 
         # Assert
-        await asyncio.sleep(59)
+        await virtual_clock.advance(59)
         used_cars = mut.get_mapped_cars()
         assert len(used_cars) == 1
         assert used_cars[0]["player"] == "dummyplayer1"
         assert used_cars[0]["car"] == vehicle1.get_vehicle_id()
 
-        await asyncio.sleep(12)  # greater than playing time checking interval is 10 s
+        await virtual_clock.advance(12)  # greater than playing time checking interval is 10 s
         used_cars = mut.get_mapped_cars()
         assert len(used_cars) == 1
         assert used_cars[0]["player"] == "dummyplayer1"
@@ -438,6 +448,9 @@ def test_track_notify():
 
     virtual_location_service.notify_new_track.assert_called()
     physical_location_service.notify_new_track.assert_called()
+    # the physical cars share the learned piece lengths of the new track
+    physical_location_service.set_length_calibration.assert_called_with(
+        env_manager._track_registry.get_length_calibration())
     item_generator.notify_new_track.assert_called()
 
 
@@ -492,3 +505,77 @@ def test_vehicle_cant_be_added_twice(get_two_dummy_vehicles):
     env_manager._add_to_active_vehicle_list(new_vehicle_2)
     env_manager._add_to_active_vehicle_list(new_vehicle_2)
     assert len(env_manager._active_anki_cars) == 2
+
+
+@pytest.mark.asyncio
+async def test_emulated_cars_are_localised(virtual_clock):
+    """
+    Tests that emulated cars are connected like physical cars and that their location services find their position
+    from the notifications
+    """
+    configuration_handler_mock = Mock(spec=ConfigurationHandler)
+    configuration_handler_mock.get_configuration.return_value = {"virtual_cars_pics": {}, "environment": {}}
+    env_manager = EnvironmentManager(Mock(spec=FleetController), configuration_handler_mock)
+    assert await env_manager.add_emulated_cars(16) == []
+
+    track: FullTrack = TrackBuilder() \
+        .append(TrackPieceType.STRAIGHT_WE, 40) \
+        .append(TrackPieceType.CURVE_WS, 18) \
+        .append(TrackPieceType.CURVE_NW, 23) \
+        .append(TrackPieceType.STRAIGHT_EW, 39) \
+        .append(TrackPieceType.CURVE_EN, 17) \
+        .append(TrackPieceType.CURVE_SE, 20) \
+        .build()
+    configuration_handler_mock.get_configuration.return_value["track"] = track.get_as_json_list()
+    addresses = await env_manager.add_emulated_cars(16)
+    assert len(set(addresses)) == 16
+    vehicles = env_manager.get_vehicle_list()
+    assert [vehicle.vehicle_id for vehicle in vehicles] == addresses
+    assert all(isinstance(vehicle, PhysicalCar) for vehicle in vehicles)
+    # all cars learn the piece lengths of the track together
+    calibration = env_manager._track_registry.get_length_calibration()
+    assert all(vehicle._location_service.get_length_calibration() is calibration for vehicle in vehicles)
+
+    for vehicle in vehicles:
+        vehicle.request_speed_percent(40)
+    await virtual_clock.advance(15)
+    for vehicle in vehicles:
+        assert vehicle._location_service.get_estimated_speed() == pytest.approx(480, abs=50)
+    for address in addresses:
+        env_manager.remove_vehicle_by_id(address)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("vectorized", [(True), (False)])
+async def test_vectorized_simulation_switch(vectorized: bool):
+    """
+    Tests that the virtual vehicles share one vectorized simulation, if it's enabled in the configuration
+    """
+    track: FullTrack = TrackBuilder() \
+        .append(TrackPieceType.STRAIGHT_WE) \
+        .append(TrackPieceType.CURVE_WS) \
+        .append(TrackPieceType.CURVE_NW) \
+        .append(TrackPieceType.STRAIGHT_EW) \
+        .append(TrackPieceType.CURVE_EN) \
+        .append(TrackPieceType.CURVE_SE) \
+        .build()
+    configuration_handler_mock = Mock(spec=ConfigurationHandler)
+    configuration_handler_mock.get_configuration.return_value = {
+        "virtual_cars_pics": {"Virtual Vehicle 1": "1.svg", "Virtual Vehicle 2": "2.svg"},
+        "environment": {"env_vectorized_simulation": vectorized},
+        "track": track.get_as_json_list()}
+    env_manager = EnvironmentManager(Mock(spec=FleetController), configuration_handler_mock)
+    env_manager.set_staff_ui_update_callback(lambda *_: None)
+    env_manager.add_virtual_vehicle()
+    env_manager.add_virtual_vehicle()
+
+    location_services = [vehicle._location_service for vehicle in env_manager.get_vehicle_list()]
+    assert len(location_services) == 2
+    if vectorized:
+        assert all(isinstance(service, VectorizedLocationService) for service in location_services)
+        assert env_manager._vectorized_simulation.get_car_count() == 2
+    else:
+        assert all(type(service) is LocationService for service in location_services)
+        assert env_manager._vectorized_simulation is None
+    for vehicle in env_manager.get_vehicle_list():
+        env_manager.remove_vehicle_by_id(vehicle.vehicle_id)
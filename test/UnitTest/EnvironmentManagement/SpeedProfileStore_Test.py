@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from EnvironmentManagement.Clock import Clock, VirtualClock, set_clock
+from EnvironmentManagement.SpeedProfileStore import SpeedProfileStore
+
+
+@pytest.fixture
+def virtual_clock():
+    clock = VirtualClock()
+    set_clock(clock)
+    yield clock
+    set_clock(Clock())
+
+
+def test_profiles_are_kept_per_car(tmp_path):
+    file = str(tmp_path / 'speed_profiles.json')
+    store = SpeedProfileStore(file)
+    profile = store.get_profile('aa:bb:cc:dd:ee:ff')
+    assert store.get_profile('AA:BB:CC:DD:EE:FF') is profile
+    assert store.get_profile('11:22:33:44:55:66') is not profile
+
+    profile.add_sample(500, 600)
+    store.save()
+
+    loaded = SpeedProfileStore(file).get_profile('AA:BB:CC:DD:EE:FF')
+    assert loaded.get_actual_speed(500) == pytest.approx(600)
+    assert SpeedProfileStore(file).get_profile('11:22:33:44:55:66').get_actual_speed(500) is None
+
+
+@pytest.mark.asyncio
+async def test_updates_are_saved_in_intervals(tmp_path, virtual_clock: VirtualClock):
+    file = tmp_path / 'speed_profiles.json'
+    store = SpeedProfileStore(str(file), save_interval=30)
+    profile = store.get_profile('AA:BB:CC:DD:EE:FF')
+
+    # the first update is saved right away, the following ones only after the interval
+    profile.add_sample(500, 600)
+    assert file.exists()
+    profile.add_sample(500, 400)
+    assert SpeedProfileStore(str(file)).get_profile('AA:BB:CC:DD:EE:FF').get_sample_count() == 1
+
+    await virtual_clock.advance(30)
+    profile.add_sample(500, 500)
+    assert SpeedProfileStore(str(file)).get_profile('AA:BB:CC:DD:EE:FF').get_sample_count() == 3
+
+
+def test_invalid_file_is_ignored(tmp_path):
+    file = tmp_path / 'speed_profiles.json'
+    file.write_text('{no json')
+    assert SpeedProfileStore(str(file)).get_profile('AA:BB:CC:DD:EE:FF').get_actual_speed(500) is None
+
+    file.write_text(json.dumps({'format_version': 1, 'profiles': {'AA:BB:CC:DD:EE:FF': {'5': 'x'}}}))
+    assert SpeedProfileStore(str(file)).get_profile('AA:BB:CC:DD:EE:FF').get_actual_speed(500) is None
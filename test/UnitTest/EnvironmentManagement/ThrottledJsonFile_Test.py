@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+from EnvironmentManagement.Clock import Clock, VirtualClock, set_clock
+from EnvironmentManagement.ThrottledJsonFile import ThrottledJsonFile
+
+
+@pytest.fixture
+def virtual_clock():
+    clock = VirtualClock()
+    set_clock(clock)
+    yield clock
+    set_clock(Clock())
+
+
+@pytest.mark.asyncio
+async def test_changes_are_written_at_most_once_per_interval(tmp_path, virtual_clock: VirtualClock):
+    file = str(tmp_path / 'values.json')
+    content = {'value': 1}
+    json_file = ThrottledJsonFile(file, 'values', lambda: content, save_interval=10)
+    assert json_file.read() is None
+
+    json_file.on_change()
+    assert json_file.read() == {'value': 1}
+
+    content = {'value': 2}
+    json_file.on_change()
+    assert json_file.read() == {'value': 1}
+    await virtual_clock.advance(10)
+    json_file.on_change()
+    assert json_file.read() == {'value': 2}
+    assert not os.path.exists(file + '.tmp')
+
+
+def test_nothing_is_written_without_changes_or_content(tmp_path):
+    file = str(tmp_path / 'values.json')
+    json_file = ThrottledJsonFile(file, 'values', lambda: None)
+    json_file.save()
+    json_file.on_change()
+    assert not os.path.exists(file)
+
+    content = {'value': 1}
+    json_file = ThrottledJsonFile(file, 'values', lambda: content)
+    json_file.on_change()
+    content = {'value': 2}
+    json_file.on_change()
+    json_file.discard_changes()
+    json_file.save()
+    assert json_file.read() == {'value': 1}
+
+
+def test_invalid_file_is_ignored(tmp_path):
+    file = str(tmp_path / 'values.json')
+    with open(file, 'w') as output:
+        output.write('{"value":')
+    assert ThrottledJsonFile(file, 'values', lambda: None).read() is None
+    assert ThrottledJsonFile(None, 'values', lambda: None).read() is None
+    with open(file, 'w') as output:
+        json.dump([1], output)
+    assert ThrottledJsonFile(file, 'values', lambda: None).read() == [1]
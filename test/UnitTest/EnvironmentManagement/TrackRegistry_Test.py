@@ -0,0 +1,119 @@
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+
+from EnvironmentManagement.ConfigurationHandler import ConfigurationHandler
+from EnvironmentManagement.EnvironmentManager import EnvironmentManager
+from EnvironmentManagement.TrackRegistry import TrackRegistry
+from LocationService.PieceLengthCalibration import MIN_SAMPLES
+from LocationService.Track import TrackPieceType
+from LocationService.TrackPieces import TrackBuilder
+from LocationService.TrackSerialization import parse_list_of_dicts_to_full_track, full_track_to_list_of_dicts
+from VehicleManagement.FleetController import FleetController
+
+
+def get_track_list() -> list[dict]:
+    track = TrackBuilder() \
+        .append(TrackPieceType.STRAIGHT_WE, 36) \
+        .append(TrackPieceType.CURVE_WS, 18) \
+        .append(TrackPieceType.CURVE_NW, 18) \
+        .append(TrackPieceType.STRAIGHT_EW, 39) \
+        .append(TrackPieceType.CURVE_EN, 17) \
+        .append(TrackPieceType.CURVE_SE, 17) \
+        .build()
+    return full_track_to_list_of_dicts(track)
+
+
+@pytest.fixture
+def config_mock() -> Mock:
+    config_mock = Mock(spec=ConfigurationHandler)
+    config_mock.get_configuration.return_value = {'track': get_track_list()}
+    return config_mock
+
+
+def test_track_is_parsed_once(config_mock: Mock):
+    registry = TrackRegistry(config_mock)
+    with patch('EnvironmentManagement.TrackRegistry.parse_list_of_dicts_to_full_track',
+               wraps=parse_list_of_dicts_to_full_track) as parse_mock:
+        track = registry.get_track()
+        assert track is not None
+        assert registry.get_track() is track
+        assert registry.get_versioned_track() == (1, track)
+
+        # the configuration was read again after something else was written to it
+        config_mock.get_configuration.return_value = {'track': get_track_list(), 'other': {}}
+        assert registry.get_track() is track
+        assert registry.get_version() == 1
+    parse_mock.assert_called_once()
+
+
+def test_changed_configuration_is_parsed(config_mock: Mock):
+    registry = TrackRegistry(config_mock)
+    track = registry.get_track()
+
+    changed_list = get_track_list()[1:]
+    config_mock.get_configuration.return_value = {'track': changed_list}
+    new_track = registry.get_track()
+    assert new_track is not track
+    assert new_track.get_len() == track.get_len() - 1
+    assert registry.get_version() == 2
+
+    config_mock.get_configuration.return_value = {}
+    assert registry.get_track() is None
+    assert registry.get_version() == 3
+
+
+def test_piece_length_calibration_is_kept_per_track(config_mock: Mock, tmp_path):
+    calibration_file = str(tmp_path / 'piece_lengths.json')
+    registry = TrackRegistry(config_mock, calibration_file=calibration_file)
+    track = registry.get_track()
+    for _ in range(0, MIN_SAMPLES):
+        registry.get_length_calibration().add_sample(0, 0, 600, track.get_piece_length(0, 0))
+    registry.save_calibration()
+
+    loaded = TrackRegistry(config_mock, calibration_file=calibration_file)
+    assert loaded.get_length_calibration().get_factor(0, 0) * track.get_piece_length(0, 0) == pytest.approx(600)
+
+    # the lengths aren't used for another track
+    config_mock.get_configuration.return_value = {'track': get_track_list()[1:]}
+    other = TrackRegistry(config_mock, calibration_file=calibration_file)
+    assert other.get_length_calibration().get_sample_count() == 0
+    # a changed track gets a new calibration
+    loaded.get_track()
+    assert loaded.get_length_calibration().get_sample_count() == 0
+
+
+def test_store_track(config_mock: Mock):
+    registry = TrackRegistry(config_mock)
+    registry.get_track()
+    new_track = TrackBuilder() \
+        .append(TrackPieceType.STRAIGHT_WE) \
+        .append(TrackPieceType.CURVE_WS) \
+        .build()
+
+    assert registry.store_track(new_track) == 2
+    config_mock.write_configuration.assert_called_once_with(
+        new_config={'track': full_track_to_list_of_dicts(new_track)})
+    # the handler reads the written configuration again, which results in an equal list
+    config_mock.get_configuration.return_value = {'track': full_track_to_list_of_dicts(new_track)}
+    assert registry.get_track() is new_track
+    assert registry.get_version() == 2
+
+
+@pytest.mark.asyncio
+async def test_vehicles_share_the_track(config_mock: Mock):
+    config_mock.get_configuration.return_value = {
+        'virtual_cars_pics': {'Virtual Vehicle 1': 'a.webp', 'Virtual Vehicle 2': 'b.webp'},
+        'track': get_track_list()}
+    env_manager = EnvironmentManager(MagicMock(spec=FleetController), config_mock)
+    env_manager.set_staff_ui_update_callback(MagicMock())
+    track = env_manager.get_track()
+
+    assert env_manager.add_virtual_vehicle() == 'Virtual Vehicle 1'
+    assert env_manager.add_virtual_vehicle() == 'Virtual Vehicle 2'
+    for vehicle in env_manager.get_vehicle_list():
+        assert vehicle._location_service._track is track
+    assert env_manager.get_track_version() == 1
+
+    for vehicle in list(env_manager.get_vehicle_list()):
+        env_manager.remove_vehicle_by_id(vehicle.get_vehicle_id())
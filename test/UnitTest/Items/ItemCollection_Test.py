@@ -1,5 +1,7 @@
 from unittest.mock import Mock
 
+import pytest
+
 from DataModel.Vehicle import Vehicle
 from Items.Item import Item
 from Items.ItemCollisionDetection import ItemCollisionDetector
@@ -67,3 +69,40 @@ def test_callbacks_are_executed():
 
     mut.clear_items()
     item_changed_callback.assert_called()
+
+
+@pytest.mark.parametrize("use_batch_geometry", [(True), (False)])
+def test_all_vehicles_against_all_items(monkeypatch, use_batch_geometry: bool):
+    """
+    This tests that checking all queued vehicles at once collects every item in reach exactly once, with and
+    without the batch geometry of numpy
+    """
+    if use_batch_geometry:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr("Items.ItemCollisionDetection.is_batch_geometry_available", lambda: False)
+    configuration_handler_mock = Mock(spec=ConfigurationHandler)
+    configuration_handler_mock.get_configuration.return_value = {"item": {"item_max_count": 3}}
+    items = []
+    for x in [100, 500, 900]:
+        item = Mock(spec=Item)
+        item.get_position.return_value = Position(x, 100)
+        items.append(item)
+    mut = ItemCollisionDetector(configuration_handler_mock)
+    mut._items.extend(items)
+
+    first_vehicle = Mock(spec=Vehicle)
+    second_vehicle = Mock(spec=Vehicle)
+    far_vehicle = Mock(spec=Vehicle)
+    mut.queue_vehicle_position(first_vehicle, Position(110, 100))
+    mut.queue_vehicle_position(far_vehicle, Position(2000, 2000))
+    mut.queue_vehicle_position(second_vehicle, Position(895, 95))
+    # is in reach of the same item as the first vehicle, but the first vehicle collects it
+    mut.queue_vehicle_position(second_vehicle, Position(100, 110))
+    mut.check_collisions()
+
+    first_vehicle.notify_item_collected.assert_called_once_with(items[0])
+    second_vehicle.notify_item_collected.assert_called_once_with(items[2])
+    far_vehicle.notify_item_collected.assert_not_called()
+    assert mut.get_current_items() == [items[1]]
+    assert len(mut._queued_vehicles) == 0
@@ -0,0 +1,101 @@
+import math
+
+import pytest
+
+from LocationService.BakedTrack import BakedTrack
+from LocationService.LocationService import LocationService
+from LocationService.Track import TrackPieceType, FullTrack
+from LocationService.TrackPieces import TrackBuilder
+from LocationService.Trigo import Position
+
+
+@pytest.fixture
+def track() -> FullTrack:
+    return TrackBuilder() \
+        .append(TrackPieceType.STRAIGHT_WE) \
+        .append(TrackPieceType.CURVE_WS) \
+        .append(TrackPieceType.CURVE_NW) \
+        .append(TrackPieceType.STRAIGHT_EW) \
+        .append(TrackPieceType.CURVE_EN) \
+        .append(TrackPieceType.CURVE_SE) \
+        .build()
+
+
+def angle_difference(first: float, second: float) -> float:
+    return abs((first - second + 180) % 360 - 180)
+
+
+@pytest.mark.parametrize("resolution", [(50), (10), (2)])
+def test_positions_within_error_bound(track: FullTrack, resolution: float):
+    """
+    Test that the interpolated positions and directions are never further away from the exact ones than the bounds
+    """
+    baked_track = BakedTrack(track, resolution)
+    for index in range(0, track.get_len()):
+        piece, global_offset = track.get_entry_tupel(index)
+        for offset in [-67.5, -50, -22.5, 0, 10, 22.5, 45, 67.5]:
+            length = piece.get_length(offset)
+            for step in range(0, 101):
+                progress = length * step / 100
+                x, y, angle = baked_track.get_pose(index, progress, offset)
+                expected_x, expected_y = piece.get_position_xy(progress, offset)
+                distance = math.hypot(x - expected_x - global_offset.get_x(), y - expected_y - global_offset.get_y())
+                assert distance <= baked_track.get_error_bound() + 1e-9
+
+                before = Position(*piece.get_position_xy(max(progress - 0.001, 0), offset))
+                expected_heading = before.calculate_angle_deg_to_xy(*piece.get_position_xy(
+                    min(progress + 0.001, length), offset))
+                assert angle_difference(angle.get_deg(), expected_heading) <= baked_track.get_heading_error_bound() \
+                    + 0.01
+
+
+def test_error_bound_shrinks_with_resolution(track: FullTrack):
+    coarse = BakedTrack(track, 50)
+    fine = BakedTrack(track, 10)
+    assert fine.get_sample_count() > coarse.get_sample_count()
+    assert fine.get_error_bound() < coarse.get_error_bound()
+    assert fine.get_error_bound() < 0.1
+    assert fine.get_heading_error_bound() < 1
+
+
+def test_reversed_direction(track: FullTrack):
+    baked_track = BakedTrack(track, 10)
+    _, _, angle = baked_track.get_pose(0, 100, 0)
+    _, _, reversed_angle = baked_track.get_pose(0, 100, 0, reverse=True)
+    assert angle.get_deg() == pytest.approx(90)
+    assert reversed_angle.get_deg() == pytest.approx(270)
+
+
+def test_invalid_resolution(track: FullTrack):
+    with pytest.raises(ValueError):
+        BakedTrack(track, 0)
+
+
+def test_baked_track_is_shared(track: FullTrack):
+    assert track.get_baked_track(10) is track.get_baked_track(10)
+    assert track.get_baked_track(10) is not track.get_baked_track(20)
+
+
+@pytest.mark.asyncio
+async def test_location_service_with_baked_track(track: FullTrack):
+    """
+    Test that the simulation with a baked track stays within the error bound of the simulation that calculates the
+    positions, including lane changes
+    """
+    exact = LocationService(track)
+    baked = LocationService(track, baked_track_resolution=10)
+    error_bound = track.get_baked_track(10).get_error_bound()
+    for service in [exact, baked]:
+        service._set_speed_mm(600, acceleration=1000)
+    for tick in range(0, 24 * 20):
+        if tick % 48 == 0:
+            for service in [exact, baked]:
+                service._set_offset_mm(22.5 * (tick // 48 % 7 - 3))
+        old_offset = exact._actual_offset
+        exact_position, exact_rotation = await exact._run_simulation_step_threadsafe()
+        baked_position, rotation = await baked._run_simulation_step_threadsafe()
+        assert exact_position.distance_to(baked_position) <= error_bound + 1e-9
+        if old_offset == exact._actual_offset:
+            # the exact simulation uses the direction between two steps and the baked one the direction of the
+            # track, which differ by half of the curvature of one step
+            assert angle_difference(exact_rotation.get_deg(), rotation.get_deg()) < 5
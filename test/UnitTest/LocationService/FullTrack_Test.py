@@ -62,3 +62,193 @@ def test_track_size_calculation(small_track: FullTrack, big_track: FullTrack):
 
     assert pytest.approx(track_square_size * 7) == size_big['used_space_vertically']
     assert pytest.approx(track_square_size * 4) == size_big['used_space_horizontally']
+
+
+@pytest.mark.parametrize("offset", [(0), (22.5), (-67.5), (13.7)])
+def test_cumulative_lengths_match_pieces(small_track: FullTrack, offset: float):
+    """
+    Test that the cumulative length table matches the sum of the piece lengths for arbitrary offsets
+    """
+    expected = 0
+    for i in range(0, small_track.get_len()):
+        assert small_track.get_distance_to_piece(i, offset) == pytest.approx(expected)
+        piece, _ = small_track.get_entry_tupel(i)
+        expected += piece.get_length(offset)
+    assert small_track.get_track_length(offset) == pytest.approx(expected)
+
+
+def walk_pieces(track: FullTrack, index: int, progress: float, distance: float, offset: float) -> tuple[int, float]:
+    """
+    Moves along the track by visiting every piece, like the simulation did before using the length table
+    """
+    direction = 1 if distance >= 0 else -1
+    while True:
+        piece, _ = track.get_entry_tupel(index)
+        leftover, _ = piece.process_update(progress, distance, offset)
+        if leftover == 0:
+            return index, progress + distance
+        index = (index + direction) % track.get_len()
+        next_piece, _ = track.get_entry_tupel(index)
+        progress = 0 if direction == 1 else next_piece.get_length(offset)
+        distance = leftover
+
+
+@pytest.mark.parametrize("offset", [(0), (40), (-25)])
+@pytest.mark.parametrize("distance_in_laps", [(0), (0.001), (0.3), (1), (2.5), (-0.001), (-0.4), (-3.2)])
+def test_move_along_matches_piece_walk(small_track: FullTrack, offset: float, distance_in_laps: float):
+    """
+    Test that moving along the track with the length table ends at the same place as walking over every piece
+    """
+    distance = distance_in_laps * small_track.get_track_length(offset)
+    for index in range(0, small_track.get_len()):
+        piece, _ = small_track.get_entry_tupel(index)
+        progress = piece.get_length(offset) / 3
+        expected_index, expected_progress = walk_pieces(small_track, index, progress, distance, offset)
+        new_index, new_progress = small_track.move_along(index, progress, distance, offset)
+        assert new_index == expected_index
+        assert new_progress == pytest.approx(expected_progress, abs=1e-6)
+
+
+def test_move_along_stays_on_piece_at_border(small_track: FullTrack):
+    """
+    Test that ending exactly at the border of a piece keeps the car on the piece it was on
+    """
+    piece_length = small_track.get_entry_tupel(0)[0].get_length(0)
+    assert small_track.move_along(0, 0, piece_length, 0) == (0, piece_length)
+    assert small_track.move_along(1, 10, -10, 0) == (1, 0)
+
+
+@pytest.mark.parametrize("offset", [(0), (45), (-67.5)])
+def test_arc_length_round_trip(big_track: FullTrack, offset: float):
+    """
+    Test that converting a position to the arc length coordinate and back gives the same position
+    """
+    for index in range(0, big_track.get_len()):
+        piece, _ = big_track.get_entry_tupel(index)
+        for progress in [0, piece.get_length(offset) / 2, piece.get_length(offset) * 0.99]:
+            s = big_track.to_arc_length(index, progress, offset)
+            new_index, new_progress = big_track.from_arc_length(s, offset)
+            assert new_index == index
+            assert new_progress == pytest.approx(progress)
+            if progress == 0:
+                # after wrapping around rounding errors can move positions at the border to the previous piece
+                continue
+            # values of other laps are wrapped around
+            lap_index, lap_progress = big_track.from_arc_length(s - 2 * big_track.get_track_length(offset), offset)
+            assert lap_index == index
+            assert lap_progress == pytest.approx(progress, abs=1e-6)
+
+
+def test_signed_distance_on_loop(small_track: FullTrack):
+    """
+    Test that the signed distance takes the shorter way around the closed track
+    """
+    lap_length = small_track.get_track_length(0)
+    assert small_track.get_signed_distance(100, 300, 0) == pytest.approx(200)
+    assert small_track.get_signed_distance(300, 100, 0) == pytest.approx(-200)
+    assert small_track.get_signed_distance(lap_length - 50, 50, 0) == pytest.approx(100)
+    assert small_track.get_signed_distance(50, lap_length - 50, 0) == pytest.approx(-100)
+    assert small_track.get_forward_distance(50, lap_length - 50, 0) == pytest.approx(lap_length - 100)
+
+
+@pytest.mark.parametrize("offset,direction", [(0, 1), (0, -1), (-67.5, 1), (22.5, -1)])
+def test_distance_between_matches_piece_walk(big_track: FullTrack, offset: float, direction: int):
+    """
+    Test that the distance between two positions is the shorter one of the walks over the pieces in both directions
+    """
+    track_len = big_track.get_len()
+    for index_from in range(0, track_len):
+        for index_to in range(0, track_len):
+            progress_from = big_track.get_piece_length(index_from, offset) / 3
+            progress_to = big_track.get_piece_length(index_to, offset) / 2
+            if index_from == index_to:
+                expected = (progress_to - progress_from) * direction
+            else:
+                # walk over the pieces in the direction
+                ahead = big_track.get_piece_length(index_from, offset) - progress_from if direction == 1 \
+                    else progress_from
+                i = (index_from + direction) % track_len
+                while i != index_to:
+                    ahead += big_track.get_piece_length(i, offset)
+                    i = (i + direction) % track_len
+                ahead += progress_to if direction == 1 else big_track.get_piece_length(index_to, offset) - progress_to
+                behind = ahead - big_track.get_track_length(offset)
+                expected = ahead if abs(ahead) <= abs(behind) else behind
+            distance = big_track.get_distance_between(index_from, progress_from, index_to, progress_to, offset,
+                                                      direction)
+            assert distance == pytest.approx(expected)
+
+
+def test_convert_arc_length_between_offsets(small_track: FullTrack):
+    """
+    Test that converting between offsets keeps the relative progress on the piece
+    """
+    curve, _ = small_track.get_entry_tupel(1)
+    s_inner = small_track.to_arc_length(1, curve.get_length(-40) / 4, -40)
+    s_outer = small_track.convert_arc_length(s_inner, -40, 40)
+    index, progress = small_track.from_arc_length(s_outer, 40)
+    assert index == 1
+    assert progress == pytest.approx(curve.get_length(40) / 4)
+
+
+@pytest.mark.parametrize("offset", [(0), (22.5), (-67.5)])
+def test_position_xy_matches_process_update(big_track: FullTrack, offset: float):
+    """
+    Test that the tuple variant of the piece positions matches the positions of process_update
+    """
+    for index in range(0, big_track.get_len()):
+        piece, _ = big_track.get_entry_tupel(index)
+        for progress in [0, piece.get_length(offset) / 3, piece.get_length(offset)]:
+            _, position = piece.process_update(progress, 0, offset)
+            assert piece.get_position_xy(progress, offset) == position.get_as_tuple()
+
+
+def test_physical_piece_lookup():
+    track = TrackBuilder() \
+        .append(TrackPieceType.STRAIGHT_WE, 36) \
+        .append(TrackPieceType.CURVE_WS, 18) \
+        .append(TrackPieceType.CURVE_NW, 20) \
+        .append(TrackPieceType.STRAIGHT_EW, 39) \
+        .append(TrackPieceType.CURVE_EN, 18) \
+        .append(TrackPieceType.CURVE_SE) \
+        .build()
+
+    assert track.contains_physical_piece(18)
+    assert track.contains_physical_piece(39)
+    assert not track.contains_physical_piece(17)
+    assert track.get_indices_of_physical_piece(18) == [1, 4]
+    assert track.get_indices_of_physical_piece(20) == [2]
+    assert track.get_indices_of_physical_piece(17) == []
+
+
+@pytest.mark.parametrize("offset", [(-67.5), (-22.5), (0), (45), (67.5), (10), (-90)])
+def test_piece_length_table_matches_pieces(big_track: FullTrack, offset: float):
+    """
+    Test that the lengths from the table (lanes) and the calculated ones (other offsets) match the pieces
+    """
+    for index in range(0, big_track.get_len()):
+        piece, _ = big_track.get_entry_tupel(index)
+        assert big_track.get_piece_length(index, offset) == pytest.approx(piece.get_length(offset))
+
+
+def test_bounding_boxes_cover_used_space(small_track: FullTrack):
+    boxes = [small_track.get_bounding_box(index) for index in range(0, small_track.get_len())]
+
+    assert min(box[0] for box in boxes) == pytest.approx(0)
+    assert min(box[1] for box in boxes) == pytest.approx(0)
+    assert max(box[2] for box in boxes) == pytest.approx(559 * 3)
+    assert max(box[3] for box in boxes) == pytest.approx(559 * 2)
+    for index, box in enumerate(boxes):
+        _, offset = small_track.get_entry_tupel(index)
+        assert box[0] < offset.get_x() < box[2]
+        assert box[1] < offset.get_y() < box[3]
+
+
+def test_serialized_representations(small_track: FullTrack):
+    html_list = small_track.get_as_list()
+    assert html_list is small_track.get_as_list()
+    assert len(html_list) == small_track.get_len()
+    for index, element in enumerate(html_list):
+        piece, offset = small_track.get_entry_tupel(index)
+        assert element == {'offset': offset.to_dict(), 'piece': piece.to_html_dict()}
+        assert small_track.get_as_json_list()[index] == piece.to_json_dict()
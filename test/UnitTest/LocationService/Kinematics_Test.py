@@ -0,0 +1,67 @@
+import math
+
+import pytest
+
+from LocationService.Kinematics import integrate_speed, integrate_lane_change, get_length_mean_factor, \
+    integrate_speed_batch, integrate_lane_change_batch, get_length_mean_factor_batch
+
+
+@pytest.mark.parametrize("speed,target_speed,acceleration", [(0, 800, 300), (800, 100, 500), (200, 200, 100),
+                                                             (500, 0, 0)])
+def test_one_speed_step_equals_many_small_steps(speed, target_speed, acceleration):
+    expected_speed, expected_distance = speed, 0.0
+    for _ in range(0, 1000):
+        expected_speed, distance = integrate_speed(expected_speed, target_speed, acceleration, 0.003)
+        expected_distance += distance
+    new_speed, distance = integrate_speed(speed, target_speed, acceleration, 3)
+    assert new_speed == pytest.approx(expected_speed)
+    assert distance == pytest.approx(expected_distance)
+
+
+def test_speed_is_integrated_exactly():
+    # 1 s accelerating from 0 to 300 and 1 s at 300
+    assert integrate_speed(0, 300, 300, 2) == pytest.approx((300, 150 + 300))
+    assert integrate_speed(300, 0, 600, 0.25) == pytest.approx((150, 56.25))
+
+
+def test_lane_change_is_split():
+    rate = 0.3
+    longitudinal = math.sqrt(1 - rate * rate)
+    # the target is reached after 100 mm
+    assert integrate_lane_change(0, 30, 150, rate) == pytest.approx((30, 100 * longitudinal, 50))
+    assert integrate_lane_change(0, -30, 50, rate) == pytest.approx((-15, 50 * longitudinal, 0))
+    assert integrate_lane_change(10, 10, 50, rate) == (10, 0, 50)
+
+    offset, changing_way, straight_way = 0, 0.0, 0.0
+    for _ in range(0, 100):
+        offset, changing, straight = integrate_lane_change(offset, 30, 1.5, rate)
+        changing_way += changing
+        straight_way += straight
+    assert (offset, changing_way, straight_way) == pytest.approx((30, 100 * longitudinal, 50))
+
+
+def test_length_mean_factor():
+    assert get_length_mean_factor(100, 100) == 1
+    # integrating the progress in small steps results in the same factor
+    steps = 10_000
+    progress_fraction = sum(1 / (100 + 50 * (step + 0.5) / steps) for step in range(0, steps)) / steps
+    assert get_length_mean_factor(100, 150) == pytest.approx(progress_fraction * 150)
+
+
+def test_batch_functions_match_scalar_functions():
+    np = pytest.importorskip("numpy")
+    speeds = [(0, 800, 300), (800, 100, 500), (200, 200, 100), (500, 0, 0), (300, 0, 600)]
+    new_speed, distance = integrate_speed_batch(*(np.array(values, dtype=float) for values in zip(*speeds)), 0.25)
+    for i, (speed, target_speed, acceleration) in enumerate(speeds):
+        assert (new_speed[i], distance[i]) == pytest.approx(integrate_speed(speed, target_speed, acceleration, 0.25))
+
+    lane_changes = [(0, 30, 150), (0, -30, 50), (10, 10, 50), (-20, 0, 0)]
+    results = integrate_lane_change_batch(*(np.array(values, dtype=float) for values in zip(*lane_changes)), 0.3)
+    for i, (offset, target_offset, distance) in enumerate(lane_changes):
+        expected = integrate_lane_change(offset, target_offset, distance, 0.3)
+        assert tuple(result[i] for result in results) == pytest.approx(expected)
+
+    lengths = [(100, 100), (100, 150), (150, 100), (0, 100)]
+    factors = get_length_mean_factor_batch(*(np.array(values, dtype=float) for values in zip(*lengths)))
+    for i, (old_length, new_length) in enumerate(lengths):
+        assert factors[i] == pytest.approx(get_length_mean_factor(old_length, new_length))
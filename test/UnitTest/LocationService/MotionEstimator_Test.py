@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from LocationService.MotionEstimator import MotionEstimator, DEFAULT_LATENCY
+
+
+def test_speed_converges_despite_jitter():
+    """
+    Test that the speed is estimated from transitions that arrive with a varying delay
+    """
+    estimator = MotionEstimator()
+    generator = random.Random(0)
+    piece_length = 559
+    speed = 600
+    for transition in range(0, 60):
+        jitter = generator.uniform(0, 0.03)
+        estimator.notify_transition(piece_length, transition * piece_length / speed + jitter)
+    assert estimator.get_speed() == pytest.approx(speed, rel=0.05)
+    assert 0 < estimator.get_jitter() < 0.03
+
+    # the extrapolated distance grows with the estimated speed
+    now = 60 * piece_length / speed
+    assert estimator.get_distance_since_transition(now + 0.1) - estimator.get_distance_since_transition(now) \
+        == pytest.approx(0.1 * estimator.get_speed())
+
+
+def test_speed_follows_changes():
+    estimator = MotionEstimator()
+    timestamp = 0
+    for speed in [300, 800]:
+        for _ in range(0, 30):
+            timestamp += 559 / speed
+            estimator.notify_transition(559, timestamp)
+        assert estimator.get_speed() == pytest.approx(speed, rel=0.01)
+
+
+def test_first_transitions_use_reported_speed():
+    estimator = MotionEstimator()
+    assert estimator.get_speed() is None
+    assert estimator.get_distance_since_transition(0) is None
+
+    estimator.notify_transition(559, 10, reported_speed=500)
+    assert estimator.get_speed() == 500
+    latency = estimator.get_latency()
+    # the car entered the piece one latency before the message arrived
+    assert estimator.get_distance_since_transition(10) == pytest.approx(500 * latency)
+
+    estimator.reset()
+    estimator.notify_transition(559, 20)
+    assert estimator.get_speed() is None
+    estimator.notify_transition(559, 21)
+    assert estimator.get_speed() == pytest.approx(559)
+
+
+def test_latency_samples_are_smoothed():
+    estimator = MotionEstimator(latency_alpha=0.5)
+    assert estimator.get_latency() == DEFAULT_LATENCY
+    estimator.add_latency_sample(0.02)
+    assert estimator.get_latency() == pytest.approx(0.02)
+    estimator.add_latency_sample(0.04)
+    assert estimator.get_latency() == pytest.approx(0.03)
+    # invalid samples are ignored
+    estimator.add_latency_sample(-1)
+    assert estimator.get_latency() == pytest.approx(0.03)
+
+    # the latency stays after a reset
+    estimator.reset()
+    assert estimator.get_latency() == pytest.approx(0.03)
@@ -1,8 +1,11 @@
 import math
 
 import pytest
+from unittest.mock import patch
 
+from EnvironmentManagement.Clock import Clock, VirtualClock, set_clock
 from LocationService.PhysicalLocationService import PhysicalLocationService
+from LocationService.SpeedProfile import SpeedProfile
 from LocationService.Track import FullTrack, TrackPieceType
 from LocationService.TrackPieces import TrackBuilder
 
@@ -25,6 +28,14 @@ def get_physical_location_service() -> PhysicalLocationService:
     return service
 
 
+@pytest.fixture
+def virtual_clock():
+    clock = VirtualClock()
+    set_clock(clock)
+    yield clock
+    set_clock(Clock())
+
+
 @pytest.fixture
 def get_physical_location_service_duplicate_ids() -> PhysicalLocationService:
     track: FullTrack = TrackBuilder() \
@@ -51,88 +62,167 @@ def test_length_calculation_same_piece(get_physical_location_service):
 
     real_start_distance = service._progress_on_current_piece
 
-    same_piece_distance = service._calculate_distance_on_same_piece(real_start_distance + 10)
+    same_piece_distance = service.get_distance_to_position(0, real_start_distance + 10)
     assert pytest.approx(10) == same_piece_distance
 
-    same_piece_distance = service._calculate_distance_on_same_piece(real_start_distance - 10)
+    same_piece_distance = service.get_distance_to_position(0, real_start_distance - 10)
     assert pytest.approx(-10) == same_piece_distance
 
     # change direction manually
     service._direction_mult *= -1
 
     # The results should be the other way around here
-    same_piece_distance = service._calculate_distance_on_same_piece(real_start_distance + 10)
+    same_piece_distance = service.get_distance_to_position(0, real_start_distance + 10)
     assert pytest.approx(-10) == same_piece_distance
 
-    same_piece_distance = service._calculate_distance_on_same_piece(real_start_distance - 10)
+    same_piece_distance = service.get_distance_to_position(0, real_start_distance - 10)
     assert pytest.approx(10) == same_piece_distance
 
 
 def test_forward_backward_calculation(get_physical_location_service):
     """
-    This tests whether both the forward and backward calculations are correct for both driving directions
+    This tests whether the distances in and against the driving direction are correct for both driving directions
     """
     service = get_physical_location_service
     service._progress_on_current_piece = 400
 
-    other_index = 2
-    other_progress = 350
-
+    # the other position is closer in the default direction
     real_forward_distance = STRAIGHT_PIECE_LENGTH_MIDDLE - 400 + CURVE_LENGTH_MIDDLE + 350
-    real_backward_distance = CURVE_LENGTH_MIDDLE - 350 + STRAIGHT_PIECE_LENGTH_MIDDLE + 2 * CURVE_LENGTH_MIDDLE + 400
-    real_backward_distance *= -1
+    assert pytest.approx(real_forward_distance) == service.get_distance_to_position(2, 350)
 
-    assert pytest.approx(real_forward_distance) == service._calculate_distance_to_position_forward(other_index,
-                                                                                                   other_progress)
-
-    assert pytest.approx(real_backward_distance) == service._calculate_distance_to_position_backward(other_index,
-                                                                                                     other_progress)
+    # the other position is closer against the default direction
+    real_backward_distance = (400 + CURVE_LENGTH_MIDDLE - 300) * -1
+    assert pytest.approx(real_backward_distance) == service.get_distance_to_position(5, 300)
 
     # change direction manually
     service._direction_mult *= -1
 
-    # since the driving direction changed these 2 should have swapped results since the direction changed
-    # and their sign should be the opposite
-    assert pytest.approx(real_backward_distance * -1) == service._calculate_distance_to_position_forward(other_index,
-                                                                                                         other_progress)
-
-    assert pytest.approx(real_forward_distance * -1) == service._calculate_distance_to_position_backward(other_index,
-                                                                                                         other_progress)
+    # since the driving direction changed the shorter ways are the same but their sign should be the opposite
+    assert pytest.approx(real_forward_distance * -1) == service.get_distance_to_position(2, 350)
+    assert pytest.approx(real_backward_distance * -1) == service.get_distance_to_position(5, 300)
 
 
 def test_calculation_brings_right_tesult(get_physical_location_service):
     """
-    This tests whether the general `_calculate_distance_to_position` function returns the results from the correct
-    specific function
+    This tests whether the shorter way around the track is chosen, even if it passes the start of the track
     """
     service = get_physical_location_service
+    service._current_piece_index = 4
     service._progress_on_current_piece = 20
+    lap_length = service._track.get_track_length(0)
 
-    same_piece_result = service._calculate_distance_on_same_piece(30)
-    automatically_chosen = service._calculate_distance_to_position(service._current_piece_index, 30)
-    assert pytest.approx(same_piece_result) == automatically_chosen
+    to_end = CURVE_LENGTH_MIDDLE - 20
+    assert pytest.approx(to_end + 300) == service.get_distance_to_position(5, 300)
+    assert pytest.approx(to_end + CURVE_LENGTH_MIDDLE + 300) == service.get_distance_to_position(0, 300)
+    assert pytest.approx(-(20 + STRAIGHT_PIECE_LENGTH_MIDDLE - 300)) == service.get_distance_to_position(3, 300)
+    distance_to_second_piece = to_end + CURVE_LENGTH_MIDDLE + STRAIGHT_PIECE_LENGTH_MIDDLE + 300
+    assert pytest.approx(distance_to_second_piece - lap_length) == service.get_distance_to_position(1, 300)
 
-    forward_results = service._calculate_distance_to_position_forward(1, 300)
-    automatically_chosen = service._calculate_distance_to_position(1, 300)
-    assert pytest.approx(forward_results) == automatically_chosen
+    service._direction_mult *= -1
 
-    backward_result = service._calculate_distance_to_position_backward(5, 300)
-    automatically_chosen = service._calculate_distance_to_position(5, 300)
-    assert pytest.approx(backward_result) == automatically_chosen
+    assert pytest.approx(20 + STRAIGHT_PIECE_LENGTH_MIDDLE - 300) == service.get_distance_to_position(3, 300)
+    assert pytest.approx(-(to_end + CURVE_LENGTH_MIDDLE + 300)) == service.get_distance_to_position(0, 300)
 
-    service._direction_mult *= -1
 
-    same_piece_result = service._calculate_distance_on_same_piece(30)
-    automatically_chosen = service._calculate_distance_to_position(service._current_piece_index, 30)
-    assert pytest.approx(same_piece_result) == automatically_chosen
+def test_transition_event_corrects_speed(get_physical_location_service):
+    """
+    Test that the speed correction uses the distance between the simulation and the physical car
+    """
+    service = get_physical_location_service
+    service._physical_piece = 0
+    service._progress_on_current_piece = STRAIGHT_PIECE_LENGTH_MIDDLE - 50
+    service._actual_speed = 200
+    service.notify_transition_event(0)
+    # the car is 10mm on the next piece and the simulation 50mm before it
+    assert service._physical_piece == 1
+    assert pytest.approx(60 / service._CORRECTION_TIME) == service._speed_correcture
 
-    forward_results = service._calculate_distance_to_position_forward(5, 300)
-    automatically_chosen = service._calculate_distance_to_position(5, 300)
-    assert pytest.approx(forward_results) == automatically_chosen
 
-    backward_result = service._calculate_distance_to_position_backward(1, 300)
-    automatically_chosen = service._calculate_distance_to_position(1, 300)
-    assert pytest.approx(backward_result) == automatically_chosen
+@pytest.mark.asyncio
+async def test_transition_timestamps_estimate_speed(get_physical_location_service, virtual_clock: VirtualClock):
+    """
+    Test that the speed correction follows the speed estimated from the transition timestamps and extrapolates the
+    position of the car to the current time
+    """
+    service = get_physical_location_service
+    service.add_ble_latency_sample(0.03)
+    service._physical_piece = 0
+    # the car reports 500 mm/s but drives 600 mm/s
+    service._target_speed = 500
+    speed = 600
+    timestamp = 0.0
+    for _ in range(0, 30):
+        timestamp += service._track.get_piece_length(service._physical_piece, 0) / speed
+        service.notify_transition_event(0, timestamp)
+    assert service.get_estimated_speed() == pytest.approx(speed, rel=0.01)
+    assert service.get_ble_latency() == pytest.approx(0.03)
+
+    # the simulation is at the start of the next piece, when the message is processed 20ms after it was received
+    service._current_piece_index = (service._physical_piece + 1) % service._track.get_len()
+    service._progress_on_current_piece = 0
+    timestamp += service._track.get_piece_length(service._physical_piece, 0) / speed
+    await virtual_clock.advance(timestamp + 0.02 - virtual_clock.time())
+    service.notify_transition_event(0, timestamp)
+    assert service._physical_piece == service._current_piece_index
+    # the car entered the piece 50ms ago
+    expected_distance = speed * 0.05
+    assert pytest.approx(100 + expected_distance / service._CORRECTION_TIME, rel=0.05) == service._speed_correcture
+
+
+def test_speed_profile_is_learned_and_used(get_physical_location_service):
+    """
+    Test that the calibration is learned from the estimated speed and corrects the speed of the next connection
+    before its speed was estimated
+    """
+    service = get_physical_location_service
+    service._physical_piece = 0
+    service._target_speed = 500
+    speed = 600
+    timestamp = 0.0
+    for _ in range(0, 30):
+        timestamp += service._track.get_piece_length(service._physical_piece, 0) / speed
+        service.notify_transition_event(0, timestamp)
+    profile = service.get_speed_profile()
+    assert profile.get_sample_count() > 0
+    assert profile.get_actual_speed(500) == pytest.approx(speed, rel=0.02)
+
+    new_service = PhysicalLocationService(service._track, simulation_ticks_per_second=1)
+    new_service.set_speed_profile(profile)
+    new_service.notify_location_event(40, 0, 0, 500)
+    assert new_service._speed_correcture == pytest.approx(speed - 500, rel=0.1)
+
+
+def test_piece_lengths_are_learned(get_physical_location_service):
+    """
+    Test that a piece that is longer than its nominal length is learned from the transition timestamps and slows
+    down the simulation on it
+    """
+    service = get_physical_location_service
+    track = service._track
+    profile = SpeedProfile()
+    profile.add_sample(500, 500)
+    service.set_speed_profile(profile)
+    service._physical_piece = 0
+    service._target_speed = 500
+    # the first piece is 10% longer than its nominal length
+    lengths = [track.get_piece_length(index, 0) for index in range(0, track.get_len())]
+    lengths[0] *= 1.1
+    timestamp = 0.0
+    for _ in range(0, 5 * track.get_len()):
+        timestamp += lengths[service._physical_piece] / 500
+        service.notify_transition_event(0, timestamp)
+    # the lengths and the speed profile can only be learned relative to each other, so the time needed for a piece
+    # is right but not necessarily its length
+    for index in [0, 1]:
+        time_on_piece = service._get_effective_piece_length(index, 0) / profile.get_actual_speed(500)
+        assert time_on_piece == pytest.approx(lengths[index] / 500, rel=0.01)
+
+    service._current_piece_index = 0
+    service._progress_on_current_piece = 0
+    service._run_simulation_step(100)
+    factor = service.get_length_calibration().get_factor(0, 0)
+    assert factor > 1
+    assert service._progress_on_current_piece == pytest.approx(100 / factor)
 
 
 def test_unknown_piece_results_in_early_return(get_physical_location_service):
@@ -191,9 +281,10 @@ def test_piece_history_collection(get_physical_location_service_duplicate_ids):
     service.notify_transition_event(0)
     service.notify_location_event(18, 0, 0, 0)
     history = service._piece_history
-    assert history[0] == 40
-    assert history[1] == 18
-    assert history[4] == 18
+    assert history.get(0) == 40
+    assert history.get(1) == 18
+    assert history.get(4) == 18
+    assert history.get_entry_count() == 3
 
 
 def test_piece_history_resetting_when_not_matching(get_physical_location_service_duplicate_ids):
@@ -209,7 +300,8 @@ def test_piece_history_resetting_when_not_matching(get_physical_location_service
     # This needs to be 40
     service.notify_location_event(18, 0, 0, 0)
     history = service._piece_history
-    assert history.count(None) == 6
+    assert history.get_entry_count() == 0
+    assert service._position_candidates is None
 
 
 def test_piece_history_resetting_when_history_has_other_data(get_physical_location_service_duplicate_ids):
@@ -226,16 +318,17 @@ def test_piece_history_resetting_when_history_has_other_data(get_physical_locati
     service.notify_location_event(18, 0, 0, 0)
 
     history = service._piece_history
-    assert history.count(None) == 5
+    assert history.get_entry_count() == 1
+    assert history.get_current() == 18
 
 
 def test_piece_history_length_is_always_right(get_physical_location_service_duplicate_ids):
     """
-    Test that the history always has enough None|int data to avoid out of bounds accesses
+    Test that the history always has one slot for every piece of the track
     """
     service = get_physical_location_service_duplicate_ids
-    assert service._piece_history.count(None) == 6
-    assert len(service._piece_history) == 6
+    assert service._piece_history.get_entry_count() == 0
+    assert service._piece_history.get_size() == 6
 
     service.notify_location_event(40, 0, 0, 0)
     service.notify_transition_event(0)
@@ -244,11 +337,11 @@ def test_piece_history_length_is_always_right(get_physical_location_service_dupl
     service.notify_transition_event(0)
     service.notify_transition_event(0)
     service.notify_location_event(18, 0, 0, 0)
-    assert len(service._piece_history) == 6
+    assert service._piece_history.get_size() == 6
 
     service._reset_piece_history()
-    assert service._piece_history.count(None) == 6
-    assert len(service._piece_history) == 6
+    assert service._piece_history.get_entry_count() == 0
+    assert service._piece_history.get_size() == 6
 
 
 def test_find_physical_location(get_physical_location_service_duplicate_ids):
@@ -291,14 +384,19 @@ def test_history_matching_for_offset(get_physical_location_service_duplicate_ids
     Test that the history can or can't get matched to the track correctly based on a given offset
     """
     service = get_physical_location_service_duplicate_ids
-    service._piece_history = [None, None, 40, 18, None, None]
-    assert service._test_history_matches_track_with_offset(4, 1)
-    assert service._test_history_matches_track_with_offset(1, 1)
-    assert not service._test_history_matches_track_with_offset(0, 1)
+    service._piece_history.advance(2)
+    service.notify_location_event(40, 0, 0, 0)
+    service.notify_transition_event(0)
+    service.notify_location_event(18, 0, 0, 0)
+    candidates = service._position_candidates
+    assert (4, 1) in candidates
+    assert (1, 1) in candidates
+    assert (0, 1) not in candidates
 
     # backwards search
-    assert service._test_history_matches_track_with_offset(5, -1)
-    assert not service._test_history_matches_track_with_offset(2, -1)
+    assert (5, -1) in candidates
+    assert (2, -1) not in candidates
+    assert len(candidates) == 3
 
 
 def test_history_matching_backwards(get_physical_location_service_duplicate_ids):
@@ -307,19 +405,105 @@ def test_history_matching_backwards(get_physical_location_service_duplicate_ids)
     and also changing the piece history appropriately
     """
     service = get_physical_location_service_duplicate_ids
-    service._piece_history = [20, 18, 40, 18, 18, 40]
-    old_list = service._piece_history.copy()
-    old_piece_index = service._piece_history_index
     old_driving_direction = service._direction_mult
 
+    # drive the track backwards from the last piece
     service.notify_location_event(20, 0, 0, 0)
+    service.notify_transition_event(0)
+    old_piece_index = service._piece_history.get_position()
+    service.notify_location_event(18, 0, 0, 0)
+
+    history = service._piece_history
+    assert old_driving_direction * -1 == service._direction_mult
+    assert service._physical_piece == 4
+    # the history is mirrored, so it counts in the new driving direction
+    assert (6 - old_piece_index) % 6 == history.get_position()
+    assert history.get(0) == 20
+    assert history.get(5) == 18
+
+    # the next pieces still match
+    service.notify_transition_event(0)
+    assert service._physical_piece == 3
+    service.notify_location_event(40, 0, 0, 0)
+    assert service._physical_piece == 3
+    assert service._position_candidates == {(5, 1)}
+
+
+@pytest.mark.asyncio
+async def test_event_driven_position_is_calculated_from_events(virtual_clock: VirtualClock):
+    """
+    Test that in event driven mode the position is extrapolated from the last transition and only published while
+    the car moves
+    """
+    track: FullTrack = TrackBuilder() \
+        .append(TrackPieceType.STRAIGHT_WE, 40) \
+        .append(TrackPieceType.CURVE_WS, 18) \
+        .append(TrackPieceType.CURVE_NW, 23) \
+        .append(TrackPieceType.STRAIGHT_EW, 39) \
+        .append(TrackPieceType.CURVE_EN, 17) \
+        .append(TrackPieceType.CURVE_SE, 20) \
+        .build()
+    service = PhysicalLocationService(track, simulation_ticks_per_second=1, event_driven=True)
+    published = []
+    service.add_on_update_callback(lambda pos, rot, data: published.append(pos))
+    service._physical_piece = 0
+    service._target_speed = 400
+
+    service.notify_transition_event(0, virtual_clock.time())
+    assert service._anchor is not None
+    await virtual_clock.advance(0.5)
+    await service._run_tick()
+    assert service._current_piece_index == 1
+    latency = service.get_ble_latency()
+    assert service._progress_on_current_piece == pytest.approx(400 * (0.5 + latency))
+    assert len(published) == 1
+
+    # the reported speed drops to 0, so the car stands still at the current position
+    service.notify_location_event(18, 0, 0, 0)
+    await service._run_tick()
+    assert len(published) == 2
+    await virtual_clock.advance(0.5)
+    await service._run_tick()
+    assert len(published) == 2
+    assert service._progress_on_current_piece == pytest.approx(400 * (0.5 + latency))
 
-    new_list = service._piece_history
-    new_list_reversed = new_list.copy()
-    new_list_reversed.reverse()
-    new_piece_index = service._piece_history_index
-    new_driving_direction = service._direction_mult
 
-    assert old_driving_direction * -1 == new_driving_direction
-    assert old_list == new_list_reversed
-    assert 6 - old_piece_index == new_piece_index
+@pytest.mark.asyncio
+async def test_event_driven_position_is_only_calculated_on_events_and_requests(virtual_clock: VirtualClock):
+    """
+    Test that in event driven mode the ticks between two events don't calculate the position, while a consumer can
+    still get the current position with `get_frame`
+    """
+    track: FullTrack = TrackBuilder() \
+        .append(TrackPieceType.STRAIGHT_WE, 40) \
+        .append(TrackPieceType.CURVE_WS, 18) \
+        .append(TrackPieceType.CURVE_NW, 23) \
+        .append(TrackPieceType.STRAIGHT_EW, 39) \
+        .append(TrackPieceType.CURVE_EN, 17) \
+        .append(TrackPieceType.CURVE_SE, 20) \
+        .build()
+    service = PhysicalLocationService(track, simulation_ticks_per_second=1, event_driven=True)
+    published = []
+    service.add_on_update_callback(lambda pos, rot, data: published.append(pos))
+    service._physical_piece = 0
+    service._target_speed = 400
+    service.notify_transition_event(0, virtual_clock.time())
+    await service._run_tick()
+    assert len(published) == 1
+
+    with patch.object(service, '_get_anchored_position', wraps=service._get_anchored_position) as anchored, \
+            patch.object(service, '_update_position', wraps=service._update_position) as update:
+        for _ in range(0, 5):
+            await virtual_clock.advance(0.1)
+            await service._run_tick()
+        assert anchored.call_count == 0
+        assert update.call_count == 0
+        assert len(published) == 1
+
+        pos, _ = service.get_frame()
+        assert anchored.call_count == 1
+        assert pos.distance_to(published[0]) == pytest.approx(400 * 0.5, rel=0.05)
+
+        service.notify_location_event(18, 0, 0, 400)
+        await service._run_tick()
+        assert len(published) == 2
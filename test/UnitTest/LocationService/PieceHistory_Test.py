@@ -0,0 +1,57 @@
+import pytest
+
+from LocationService.PieceHistory import PieceHistory
+
+
+def test_entries_are_stored_per_position():
+    history = PieceHistory(4)
+    history.set_current(17)
+    history.advance(1)
+    history.set_current(18)
+    history.advance(-2)
+    assert history.get_position() == 3
+    assert history.get_current() is None
+    assert history.get(0) == 17
+    assert history.get(1) == 18
+    assert history.get(5) == 18
+    assert history.get_entry_count() == 2
+
+    # overwriting an entry doesn't add another one
+    history.advance(2)
+    history.set_current(20)
+    assert history.get(1) == 20
+    assert history.get_entry_count() == 2
+
+
+def test_clear_removes_all_entries():
+    history = PieceHistory(3)
+    for physical_id in [17, 18, 20]:
+        history.set_current(physical_id)
+        history.advance(1)
+    history.clear()
+    assert history.get_entry_count() == 0
+    assert [history.get(i) for i in range(0, 3)] == [None, None, None]
+
+    history.set_current(36)
+    assert history.get_entry_count() == 1
+    assert [history.get(i) for i in range(0, 3)] == [36, None, None]
+
+
+def test_mirror_negates_positions():
+    history = PieceHistory(5)
+    for physical_id in [10, 11, 12]:
+        history.set_current(physical_id)
+        history.advance(1)
+    history.mirror()
+    assert history.get_position() == 2
+    assert [history.get(i) for i in range(0, 5)] == [10, None, None, 12, 11]
+
+    history.set_current(13)
+    history.mirror()
+    assert history.get_position() == 3
+    assert [history.get(i) for i in range(0, 5)] == [10, 11, 12, 13, None]
+
+
+def test_size_has_to_be_positive():
+    with pytest.raises(ValueError):
+        PieceHistory(0)
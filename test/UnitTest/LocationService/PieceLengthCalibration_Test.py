@@ -0,0 +1,40 @@
+import pytest
+
+import Constants
+from LocationService.PieceLengthCalibration import PieceLengthCalibration, MIN_SAMPLES
+
+
+def test_factor_is_used_after_enough_samples():
+    calibration = PieceLengthCalibration()
+    for sample in range(0, MIN_SAMPLES):
+        assert calibration.get_factor(2, 0) == 1
+        assert calibration.add_sample(2, 0, 580 + 20 * sample, 559)
+    assert calibration.get_factor(2, 0) == pytest.approx(600 / 559)
+    # offsets close to the lane use the same factor, other lanes and pieces aren't changed
+    assert calibration.get_factor(2, 10) == pytest.approx(600 / 559)
+    assert calibration.get_factor(2, Constants.TRACK_LANE_WIDTH) == 1
+    assert calibration.get_factor(1, 0) == 1
+
+
+def test_outliers_are_ignored():
+    updates = []
+    calibration = PieceLengthCalibration()
+    calibration.add_on_update_callback(updates.append)
+    assert not calibration.add_sample(0, 0, 2000, 559)
+    assert not calibration.add_sample(0, 0, 100, 559)
+    assert calibration.get_sample_count() == 0
+    assert calibration.add_sample(0, 0, 570, 559)
+    assert updates == [calibration]
+
+
+def test_dict_conversion():
+    calibration = PieceLengthCalibration()
+    for _ in range(0, MIN_SAMPLES):
+        calibration.add_sample(3, -3 * Constants.TRACK_LANE_WIDTH, 300, 280)
+    copy = PieceLengthCalibration.from_dict(calibration.to_dict())
+    assert copy.to_dict() == calibration.to_dict()
+    # offsets outside of the track belong to the outermost lane
+    assert copy.get_factor(3, -100) == pytest.approx(300 / 280)
+
+    with pytest.raises(ValueError):
+        PieceLengthCalibration.from_dict({'3': [1, 1]})
@@ -0,0 +1,15 @@
+import pytest
+
+from LocationService.RunningAverages import RunningAverages
+from LocationService.SpeedProfile import SpeedProfile
+
+
+def test_key_conversion_has_to_be_implemented():
+    class WithoutKeyConversion(RunningAverages[int]):
+        pass
+
+    with pytest.raises(TypeError):
+        RunningAverages()
+    with pytest.raises(TypeError):
+        WithoutKeyConversion()
+    assert SpeedProfile().get_sample_count() == 0
@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import pytest
+
+from LocationService.LocationService import LocationService, SimulationClock
+from LocationService.Track import TrackPieceType, FullTrack
+from LocationService.TrackPieces import TrackBuilder
+
+
+def get_two_straight_pieces() -> FullTrack:
+    track = TrackBuilder()\
+        .append(TrackPieceType.STRAIGHT_EW)\
+        .append(TrackPieceType.STRAIGHT_EW)\
+        .build()
+    return track
+
+
+@pytest.mark.asyncio
+async def test_services_use_clock_tick_rate():
+    """
+    Test that a location service driven by a clock uses the tick rate of the clock
+    """
+    clock = SimulationClock(ticks_per_second=10)
+    location_service = LocationService(get_two_straight_pieces(), simulation_ticks_per_second=1,
+                                       simulation_clock=clock)
+    assert location_service._simulation_ticks_per_second == 10
+
+
+@pytest.mark.asyncio
+async def test_single_tick_advances_all_services():
+    """
+    Test that one tick of the clock advances every registered service by exactly one step
+    """
+    clock = SimulationClock(ticks_per_second=1)
+    services = [LocationService(get_two_straight_pieces(), simulation_clock=clock) for _ in range(0, 8)]
+    for service in services:
+        service._set_speed_mm(10, acceleration=10)
+        service._actual_speed = 10
+        # register without starting the clock task to control the ticks manually
+        clock._location_services.append(service)
+
+    await clock._run_tick()
+    await clock._run_tick()
+    for service in services:
+        assert service._progress_on_current_piece == pytest.approx(20)
+    assert clock.get_tick_count() == 2
+
+
+@pytest.mark.asyncio
+async def test_register_starts_and_unregister_stops_clock():
+    """
+    Test that the clock only runs while there are services registered
+    """
+    clock = SimulationClock(ticks_per_second=100)
+    location_service = LocationService(get_two_straight_pieces(), simulation_clock=clock)
+    assert clock._task is None
+
+    location_service.start()
+    location_service.start()
+    assert clock._task is not None
+    assert clock.get_registered_services() == [location_service]
+
+    await asyncio.sleep(0.1)
+    assert clock.get_tick_count() > 0
+
+    location_service.stop()
+    assert clock._task is None
+    assert len(clock.get_registered_services()) == 0
+
+
+@pytest.mark.asyncio
+async def test_failing_service_does_not_stop_other_services():
+    """
+    Test that an exception in one service doesn't prevent the other services from being advanced
+    """
+    clock = SimulationClock(ticks_per_second=1)
+    broken_service = LocationService(get_two_straight_pieces(), simulation_clock=clock)
+
+    def raise_error(*_):
+        raise RuntimeError("broken callback")
+    broken_service.add_on_update_callback(raise_error)
+    working_service = LocationService(get_two_straight_pieces(), simulation_clock=clock)
+    working_service._set_speed_mm(10, acceleration=10)
+    working_service._actual_speed = 10
+    clock._location_services.extend([broken_service, working_service])
+
+    await clock._run_tick()
+    assert working_service._progress_on_current_piece == pytest.approx(10)
+
+
+@pytest.mark.asyncio
+async def test_overruns_are_reported():
+    """
+    Test that ticks that take longer than the tick interval are counted as overruns
+    """
+    clock = SimulationClock(ticks_per_second=100)
+    location_service = LocationService(get_two_straight_pieces(), simulation_clock=clock)
+
+    def block(*_):
+        # blocking on purpose to simulate an expensive simulation step
+        time.sleep(0.02)
+    location_service.add_on_update_callback(block)
+    location_service.start()
+    await asyncio.sleep(0.1)
+    location_service.stop()
+
+    assert clock.get_overrun_count() > 0
+    assert clock.get_last_tick_duration() >= 0.02
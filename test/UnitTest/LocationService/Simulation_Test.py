@@ -53,6 +53,7 @@ async def test_track_transistion():
     location_service = LocationService(get_two_straight_pieces(), simulation_ticks_per_second=1,
                                        start_immediately=False)
     location_service._set_speed_mm(1, acceleration=1)
+    location_service._actual_speed = 1
     for i in range(0, STRAIGHT_PIECE_LENGTH()):
         await location_service._run_simulation_step_threadsafe()
         # assert it moved 1 mm since this is the speed
@@ -81,6 +82,41 @@ async def test_acceleration(speed, acceleration):
         assert location_service._actual_speed == sum
 
 
+async def simulate_with_tick_rate(ticks_per_second: int, change_lanes: bool) -> LocationService:
+    """
+    Simulates 20 seconds of driving with speed and lane changes and returns the service
+    """
+    location_service = LocationService(get_loop_track(), simulation_ticks_per_second=ticks_per_second)
+    location_service._set_speed_mm(800, acceleration=300)
+    for step in range(0, 20 * ticks_per_second):
+        if change_lanes and step == 3 * ticks_per_second:
+            location_service._set_offset_mm(67.5)
+        if step == 9 * ticks_per_second:
+            location_service._set_speed_mm(300, acceleration=500)
+            if change_lanes:
+                location_service._set_offset_mm(-67.5)
+        await location_service._run_simulation_step_threadsafe()
+    return location_service
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ticks_per_second", [5, 10])
+async def test_low_tick_rate_matches_high_tick_rate(ticks_per_second: int):
+    """
+    Test that the trajectories of a low tick rate don't diverge from a high rate reference. Speed changes are exact,
+    only lane changes across the border of a curve are approximated
+    """
+    reference = await simulate_with_tick_rate(960, change_lanes=False)
+    location_service = await simulate_with_tick_rate(ticks_per_second, change_lanes=False)
+    assert location_service.get_arc_length() == pytest.approx(reference.get_arc_length(), abs=1e-6)
+
+    reference = await simulate_with_tick_rate(960, change_lanes=True)
+    location_service = await simulate_with_tick_rate(ticks_per_second, change_lanes=True)
+    assert location_service._actual_offset == reference._actual_offset
+    assert location_service.get_arc_length() == pytest.approx(reference.get_arc_length(), abs=5)
+    assert location_service._current_position.distance_to(reference._current_position) < 5
+
+
 def get_top_left_in_global(piece: TrackPiece, pos: Position) -> Position:
     x = pos.get_x() - piece.get_used_space_horiz() / 2
     y = pos.get_y() - piece.get_used_space_vert() / 2
@@ -199,3 +235,37 @@ async def test_position_rotation():
     # now we are on a straight piece again and should point right
     _, rot = await location_service._run_simulation_step_threadsafe()
     assert rot.get_deg() == 270
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("direction", [(1), (-1)])
+async def test_multiple_laps_in_one_step(direction: int):
+    """
+    Test that a single simulation step can move the car over many laps without visiting every piece
+    """
+    track = get_loop_track()
+    location_service = LocationService(track, simulation_ticks_per_second=1, start_immediately=False)
+    location_service._direction_mult = direction
+    lap_length = track.get_track_length(0)
+    start_position = location_service._current_position
+
+    location_service._run_simulation_step(direction * 10_000 * lap_length)
+
+    assert location_service._current_position.distance_to(start_position) < 1e-3
+
+
+@pytest.mark.asyncio
+async def test_arc_length_follows_driven_distance():
+    """
+    Test that the arc length coordinate of a car grows with the driven distance and wraps around after a lap
+    """
+    track = get_loop_track()
+    location_service = LocationService(track, simulation_ticks_per_second=1, start_immediately=False)
+    assert location_service.get_arc_length() == 0
+
+    location_service._run_simulation_step(1000)
+    assert location_service.get_arc_length() == pytest.approx(1000)
+
+    location_service._run_simulation_step(track.get_track_length(0))
+    assert location_service.get_arc_length() == pytest.approx(1000)
+    assert location_service.get_arc_length_offset() == 0
@@ -0,0 +1,44 @@
+import pytest
+
+from LocationService.SpeedProfile import SpeedProfile, BIN_WIDTH
+
+
+def test_empty_profile_has_no_speed():
+    profile = SpeedProfile()
+    assert profile.get_actual_speed(500) is None
+    assert profile.get_sample_count() == 0
+
+
+def test_samples_are_averaged_and_interpolated():
+    profile = SpeedProfile()
+    profile.add_sample(350, 300)
+    profile.add_sample(350, 400)
+    assert profile.get_sample_count() == 2
+    assert profile.get_actual_speed(350) == pytest.approx(350)
+    # outside of the learned ranges the ratio of the closest one is used
+    assert profile.get_actual_speed(800) == pytest.approx(800)
+
+    profile.add_sample(550, 660)
+    assert profile.get_actual_speed(550) == pytest.approx(660)
+    # halfway between the centers of both ranges the ratio is in the middle of both
+    assert profile.get_actual_speed(450) == pytest.approx(450 * 1.1)
+
+    # invalid samples are ignored
+    profile.add_sample(0, 100)
+    profile.add_sample(300, -1)
+    assert profile.get_sample_count() == 3
+
+
+def test_update_callback_and_dict_conversion():
+    profile = SpeedProfile()
+    updates = []
+    profile.add_on_update_callback(updates.append)
+    profile.add_sample(2 * BIN_WIDTH + 1, 2 * BIN_WIDTH + 1)
+    assert updates == [profile]
+
+    copy = SpeedProfile.from_dict(profile.to_dict())
+    assert copy.to_dict() == profile.to_dict()
+    assert copy.get_actual_speed(300) == pytest.approx(300)
+
+    with pytest.raises(ValueError):
+        SpeedProfile.from_dict({'a': [1, 1]})
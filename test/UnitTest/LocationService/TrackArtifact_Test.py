@@ -0,0 +1,130 @@
+import mmap
+import os
+from unittest.mock import Mock, patch
+
+import pytest
+
+from EnvironmentManagement.ConfigurationHandler import ConfigurationHandler
+from EnvironmentManagement.TrackRegistry import TrackRegistry
+from LocationService.Track import TrackPieceType, FullTrack
+from LocationService.TrackArtifact import get_track_checksum, load_track_artifact, write_track_artifact
+from LocationService.TrackPieces import TrackBuilder
+from LocationService.TrackSerialization import full_track_to_list_of_dicts
+
+
+@pytest.fixture
+def track() -> FullTrack:
+    return TrackBuilder() \
+        .append(TrackPieceType.START_PIECE_AFTER_LINE_WE, 33) \
+        .append(TrackPieceType.CURVE_WS, 18) \
+        .append(TrackPieceType.CURVE_NW, 18) \
+        .append(TrackPieceType.STRAIGHT_EW, 39) \
+        .append(TrackPieceType.CURVE_EN, 17) \
+        .append(TrackPieceType.CURVE_SE, 17) \
+        .append(TrackPieceType.START_PIECE_BEFORE_LINE_WE, 34) \
+        .build()
+
+
+@pytest.fixture
+def artifact_file(tmp_path) -> str:
+    return str(tmp_path / 'track_artifact.bin')
+
+
+def test_round_trip(track: FullTrack, artifact_file: str):
+    write_track_artifact(artifact_file, track, baked_track_resolutions=[10, 50])
+    loaded = load_track_artifact(artifact_file, get_track_checksum(full_track_to_list_of_dicts(track)))
+
+    assert loaded is not None
+    assert loaded == track
+    assert loaded.get_as_list() == track.get_as_list()
+    assert loaded.get_used_space_as_dict() == track.get_used_space_as_dict()
+    for offset in [-67.5, 0, 10]:
+        assert loaded.get_track_length(offset) == track.get_track_length(offset)
+    for resolution in [10, 50]:
+        baked_track = track.get_baked_track(resolution)
+        loaded_baked_track = loaded.get_baked_track(resolution)
+        assert loaded_baked_track.get_error_bound() == baked_track.get_error_bound()
+        for index in range(0, track.get_len()):
+            for progress in [0, 55.5, 100]:
+                expected = baked_track.get_pose(index, progress, 22.5)
+                assert loaded_baked_track.get_pose(index, progress, 22.5) == expected
+
+
+def test_tables_are_memory_mapped(track: FullTrack, artifact_file: str):
+    write_track_artifact(artifact_file, track)
+    loaded = load_track_artifact(artifact_file)
+    tables = loaded.get_tables()
+    assert isinstance(tables['cumulative_length_base'], memoryview)
+    for baked_tables in tables['baked_tracks'].values():
+        assert isinstance(baked_tables['x'], memoryview)
+
+
+def test_fallback_for_invalid_artifacts(track: FullTrack, artifact_file: str):
+    # missing
+    assert load_track_artifact(artifact_file) is None
+
+    # stale
+    write_track_artifact(artifact_file, track)
+    other_track = TrackBuilder() \
+        .append(TrackPieceType.STRAIGHT_WE) \
+        .append(TrackPieceType.CURVE_WS) \
+        .build()
+    assert load_track_artifact(artifact_file, get_track_checksum(full_track_to_list_of_dicts(other_track))) is None
+
+    # damaged
+    with open(artifact_file, 'r+b') as file:
+        file.truncate(os.path.getsize(artifact_file) // 2)
+    assert load_track_artifact(artifact_file) is None
+
+    # unknown format
+    with open(artifact_file, 'wb') as file:
+        file.write(b'{"track": []}')
+    assert load_track_artifact(artifact_file) is None
+
+
+def test_mapping_of_ignored_artifact_is_closed(track: FullTrack, artifact_file: str):
+    write_track_artifact(artifact_file, track)
+    mappings: list[mmap.mmap] = []
+    create_mapping = mmap.mmap
+
+    def record_mapping(*args, **kwargs) -> mmap.mmap:
+        mappings.append(create_mapping(*args, **kwargs))
+        return mappings[-1]
+
+    with patch('LocationService.TrackArtifact.mmap.mmap', side_effect=record_mapping):
+        # stale
+        assert load_track_artifact(artifact_file, b'\x00' * 32) is None
+        # damaged after the arrays were mapped
+        with patch.object(FullTrack, 'get_baked_track', side_effect=ValueError("damaged")):
+            assert load_track_artifact(artifact_file) is None
+        # used by the loaded track
+        assert load_track_artifact(artifact_file) == track
+    assert [mapping.closed for mapping in mappings] == [True, True, False]
+
+
+def test_registry_uses_artifact(track: FullTrack, artifact_file: str):
+    config_mock = Mock(spec=ConfigurationHandler)
+    config_mock.get_configuration.return_value = {'track': full_track_to_list_of_dicts(track)}
+
+    # the first start parses the track and writes the artifact
+    assert TrackRegistry(config_mock, artifact_file).get_track() == track
+    assert os.path.exists(artifact_file)
+
+    # the next start doesn't need to parse it
+    with patch('EnvironmentManagement.TrackRegistry.parse_list_of_dicts_to_full_track') as parse_mock:
+        loaded = TrackRegistry(config_mock, artifact_file).get_track()
+    parse_mock.assert_not_called()
+    assert loaded == track
+
+    # a changed track in the configuration isn't loaded from the stale artifact
+    config_mock.get_configuration.return_value = {'track': full_track_to_list_of_dicts(track)[1:]}
+    assert TrackRegistry(config_mock, artifact_file).get_track().get_len() == track.get_len() - 1
+
+
+def test_registry_writes_artifact_for_stored_track(track: FullTrack, artifact_file: str):
+    config_mock = Mock(spec=ConfigurationHandler)
+    config_mock.get_configuration.return_value = {}
+    registry = TrackRegistry(config_mock, artifact_file)
+    registry.store_track(track)
+
+    assert load_track_artifact(artifact_file, get_track_checksum(full_track_to_list_of_dicts(track))) == track
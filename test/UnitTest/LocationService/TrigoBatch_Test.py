@@ -0,0 +1,31 @@
+import pytest
+
+from LocationService.Trigo import Position
+
+# numpy is an optional dependency that is only needed for the batch geometry
+np = pytest.importorskip("numpy")
+from LocationService.Trigo import positions_to_array, pairwise_distances  # noqa: E402
+
+
+@pytest.fixture
+def positions() -> list[Position]:
+    return [Position(0, 0), Position(10, 0), Position(10, 10), Position(-5, 3.5), Position(-5, -20)]
+
+
+def test_positions_to_array(positions: list[Position]):
+    points = positions_to_array(positions)
+    assert points.shape == (len(positions), 2)
+    for i, position in enumerate(positions):
+        assert tuple(points[i]) == position.get_as_tuple()
+
+
+def test_pairwise_distances_match_position(positions: list[Position]):
+    """
+    Test that the pairwise distances match the distances of Position
+    """
+    points = positions_to_array(positions)
+    pairwise = pairwise_distances(points, points[:2])
+    assert pairwise.shape == (len(positions), 2)
+    for i, position in enumerate(positions):
+        assert pairwise[i, 0] == pytest.approx(position.distance_to(positions[0]))
+        assert pairwise[i, 1] == pytest.approx(position.distance_to(positions[1]))
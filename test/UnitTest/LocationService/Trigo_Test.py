@@ -1,6 +1,8 @@
+import math
+
 import pytest
 
-from LocationService.Trigo import Position
+from LocationService.Trigo import Position, Angle
 
 
 def test_direction_between_pieces():
@@ -20,3 +22,48 @@ def test_direction_between_pieces():
     assert pytest.approx(north.calculate_angle_to(south).get_deg()) == 180
     assert pytest.approx(east.calculate_angle_to(west).get_deg()) == 270
     assert pytest.approx(south.calculate_angle_to(north).get_deg()) == 0
+
+
+@pytest.mark.parametrize("degree", [(0), (90), (180), (270), (-90), (450), (12.5), (-33), (359.9)])
+def test_angle_trigonometry(degree: float):
+    """
+    Test that the cached sinus and cosinus match the trigonometric functions and are exact for quarter turns
+    """
+    angle = Angle(degree)
+    assert angle.get_sin() == pytest.approx(math.sin(math.radians(degree)), abs=1e-12)
+    assert angle.get_cos() == pytest.approx(math.cos(math.radians(degree)), abs=1e-12)
+    if degree % 90 == 0:
+        assert angle.get_quarter_turns() == (degree % 360) // 90
+        assert angle.get_sin() in (-1, 0, 1)
+        assert angle.get_cos() in (-1, 0, 1)
+    else:
+        assert angle.get_quarter_turns() is None
+
+
+@pytest.mark.parametrize("degree", [(0), (90), (180), (270), (-270), (45), (200)])
+def test_rotation_matches_rotation_matrix(degree: float):
+    """
+    Test that rotating a point (including the exact path for quarter turns) matches the rotation matrix
+    """
+    point = Position(3, -7)
+    point.rotate_around_0_0(Angle(degree))
+    rad = math.radians(degree)
+    assert point.get_x() == pytest.approx(3 * math.cos(rad) + 7 * math.sin(rad), abs=1e-12)
+    assert point.get_y() == pytest.approx(3 * math.sin(rad) - 7 * math.cos(rad), abs=1e-12)
+
+
+def test_position_tuple_and_in_place_variants():
+    """
+    Test that the variants without object creation give the same results as the ones creating objects
+    """
+    first = Position(3, 4)
+    second = Position(-1, 1)
+    assert not hasattr(first, '__dict__')
+    assert first.distance_to(second) == pytest.approx(5)
+    assert first.distance_to_xy(*second.get_as_tuple()) == first.distance_to(second)
+    assert first.calculate_angle_deg_to_xy(-1, 1) == first.calculate_angle_to(second).get_deg()
+
+    first.set_xy(-1, 1)
+    assert first.get_as_tuple() == (-1, 1)
+    assert Angle(30).rotate_xy(3, 4) == pytest.approx((3 * math.cos(math.radians(30)) - 4 * math.sin(math.radians(30)),
+                                                       3 * math.sin(math.radians(30)) + 4 * math.cos(math.radians(30))))
@@ -0,0 +1,147 @@
+import gc
+from unittest.mock import patch
+
+import pytest
+
+from LocationService.LocationService import LocationService, SimulationClock
+from LocationService.Track import TrackPieceType, FullTrack
+from LocationService.TrackPieces import TrackBuilder
+from LocationService.VectorizedSimulation import VectorizedSimulation, VectorizedLocationService
+
+
+def get_track_with_mirrored_curves() -> FullTrack:
+    track = TrackBuilder() \
+        .append(TrackPieceType.START_PIECE_BEFORE_LINE_WE) \
+        .append(TrackPieceType.START_PIECE_AFTER_LINE_WE) \
+        .append(TrackPieceType.CURVE_WS) \
+        .append(TrackPieceType.STRAIGHT_NS) \
+        .append(TrackPieceType.CURVE_NE) \
+        .append(TrackPieceType.CURVE_WN) \
+        .append(TrackPieceType.STRAIGHT_SN) \
+        .append(TrackPieceType.CURVE_SE) \
+        .append(TrackPieceType.STRAIGHT_WE) \
+        .append(TrackPieceType.CURVE_WS) \
+        .append(TrackPieceType.CURVE_NW) \
+        .append(TrackPieceType.STRAIGHT_EW) \
+        .append(TrackPieceType.STRAIGHT_EW) \
+        .append(TrackPieceType.STRAIGHT_EW) \
+        .append(TrackPieceType.CURVE_EN) \
+        .append(TrackPieceType.STRAIGHT_SN) \
+        .append(TrackPieceType.CURVE_SE) \
+        .build()
+    return track
+
+
+def angle_difference(first: float, second: float) -> float:
+    return abs((first - second + 180) % 360 - 180)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ticks_per_second", [(24), (5)])
+async def test_matches_location_service(ticks_per_second: int):
+    """
+    Test that the vectorized simulation calculates the same positions and angles as the per car simulation,
+    including lane changes and multiple piece transitions in one step
+    """
+    track = get_track_with_mirrored_curves()
+    simulation = VectorizedSimulation(track, simulation_ticks_per_second=ticks_per_second, initial_capacity=2)
+    car_settings = [(300, 0), (1200, 67.5), (800, -67.5), (50, 22.5), (3000, -45)]
+    reference_services: list[LocationService] = []
+    for speed, offset in car_settings:
+        reference = LocationService(track, simulation_ticks_per_second=ticks_per_second)
+        reference._set_speed_mm(speed, acceleration=500)
+        reference._set_offset_mm(offset)
+        reference_services.append(reference)
+        index = simulation.add_car()
+        simulation.set_speed_mm(index, speed, acceleration=500)
+        simulation.set_offset_mm(index, offset)
+
+    for step in range(0, 50 * ticks_per_second):
+        if step == 20 * ticks_per_second:
+            # change lanes to the other side of the track
+            for index, (_, offset) in enumerate(car_settings):
+                reference_services[index]._set_offset_mm(-offset)
+                simulation.set_offset_mm(index, -offset)
+        simulation.step()
+        for index, reference in enumerate(reference_services):
+            expected_pos, expected_angle = await reference._run_simulation_step_threadsafe()
+            assert simulation.get_position(index).distance_to(expected_pos) < 1e-6
+            assert angle_difference(simulation.get_angle(index).get_deg(), expected_angle.get_deg()) < 1e-6
+            assert simulation.get_arc_length(index) == pytest.approx(reference.get_arc_length(), abs=1e-6)
+
+
+def test_removed_cars_stop_moving():
+    """
+    Test that a removed car isn't simulated anymore while the other cars keep driving
+    """
+    simulation = VectorizedSimulation(get_track_with_mirrored_curves())
+    first = simulation.add_car()
+    second = simulation.add_car()
+    simulation.set_speed_mm(first, 500)
+    simulation.set_speed_mm(second, 500)
+    simulation.step()
+    simulation.remove_car(first)
+    removed_position = simulation.get_position(first)
+    simulation.step()
+
+    assert simulation.get_position(first).distance_to(removed_position) == 0
+    assert simulation.get_positions().shape == (2, 2)
+    assert simulation.get_position(second).distance_to(removed_position) > 0
+
+
+@pytest.mark.asyncio
+async def test_services_share_one_step_per_tick():
+    """
+    Test that all services driven by a clock only advance the vectorized simulation once per tick
+    """
+    clock = SimulationClock(ticks_per_second=24)
+    simulation = VectorizedSimulation(get_track_with_mirrored_curves(), simulation_clock=clock)
+    services = [VectorizedLocationService(simulation) for _ in range(0, 10)]
+    for service in services:
+        await service.set_speed_percent(50)
+        clock._location_services.append(service)
+
+    for _ in range(0, 3):
+        await clock._run_tick()
+    assert simulation.get_step_count() == 3
+
+    data: list[dict] = []
+    services[0].add_on_update_callback(lambda pos, rot, d: data.append(d))
+    await clock._run_tick()
+    assert data[0]['speed'] == pytest.approx(simulation._actual_speed[0])
+    assert data[0]['uturn_in_progress'] is False
+
+
+@pytest.mark.filterwarnings("error::pytest.PytestUnraisableExceptionWarning")
+def test_failed_service_is_deleted_cleanly():
+    """
+    Test that a service whose car couldn't be added doesn't fail when it's deleted
+    """
+    simulation = VectorizedSimulation(get_track_with_mirrored_curves(), simulation_clock=SimulationClock())
+    with patch.object(simulation, 'add_car', side_effect=ValueError("no space")):
+        with pytest.raises(ValueError):
+            VectorizedLocationService(simulation)
+    # a simulation without clock can't be used by location services
+    with pytest.raises(ValueError):
+        VectorizedLocationService(VectorizedSimulation(get_track_with_mirrored_curves()))
+    gc.collect()
+
+
+@pytest.mark.asyncio
+async def test_car_moves_on_first_tick():
+    """
+    Test that the clock advances the simulation before the services read their car, so a driving car moves on the
+    first tick
+    """
+    clock = SimulationClock(ticks_per_second=24)
+    simulation = VectorizedSimulation(get_track_with_mirrored_curves(), simulation_clock=clock)
+    service = VectorizedLocationService(simulation)
+    simulation.set_speed_mm(0, 500, acceleration=100_000)
+    clock._location_services.append(service)
+    positions: list = []
+    service.add_on_update_callback(lambda pos, rot, d: positions.append(pos))
+    start = simulation.get_position(0)
+
+    await clock._run_tick()
+    assert simulation.get_step_count() == 1
+    assert positions[0].distance_to(start) > 0
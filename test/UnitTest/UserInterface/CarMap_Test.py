@@ -0,0 +1,108 @@
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+from quart import Quart, render_template
+from socketio import AsyncServer
+
+from EnvironmentManagement.EnvironmentManager import EnvironmentManager
+from LocationService.Track import TrackPieceType, FullTrack
+from LocationService.TrackPieces import TrackBuilder
+from UserInterface.CarMap import CarMap
+
+TEMPLATE_FOLDER = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'src', 'UserInterface', 'templates')
+
+
+def get_track() -> FullTrack:
+    return TrackBuilder() \
+        .append(TrackPieceType.STRAIGHT_WE) \
+        .append(TrackPieceType.CURVE_WS) \
+        .append(TrackPieceType.CURVE_NW) \
+        .append(TrackPieceType.STRAIGHT_EW) \
+        .append(TrackPieceType.CURVE_EN) \
+        .append(TrackPieceType.CURVE_SE) \
+        .build()
+
+
+@pytest.fixture
+def car_map_app():
+    """
+    Prepare a Quart app that serves the car map
+    """
+    configuration = {
+        'virtual_cars_pics': {'Virtual Vehicle 1': 'Virtual_Vehicle_1.svg'},
+        'display_settings': {'disp_cm_slogan_text': 'Slogan'}}
+    environment_manager = MagicMock(spec=EnvironmentManager)
+    environment_manager.get_vehicle_list.return_value = []
+    environment_manager.get_track.return_value = get_track()
+    environment_manager.get_track_version.return_value = 1
+    environment_manager.get_car_color_map.return_value = {'Virtual Vehicle 2': ['#F93822', '#DAA03D']}
+    environment_manager.get_item_collision_detector.return_value.get_current_items.return_value = []
+
+    with patch('UserInterface.CarMap.ConfigurationHandler') as config_mock:
+        config_mock.return_value.get_configuration.return_value = configuration
+        car_map = CarMap(environment_manager, AsyncServer(async_mode='asgi'))
+
+    app = Quart(__name__, template_folder=TEMPLATE_FOLDER)
+    app.register_blueprint(car_map.get_blueprint(), url_prefix='/car_map')
+    return app, environment_manager, configuration
+
+
+@pytest.mark.asyncio
+async def test_page_is_rendered_once_per_track_version(car_map_app):
+    app, environment_manager, _ = car_map_app
+    client = app.test_client()
+    with patch('UserInterface.CarMap.render_template', wraps=render_template) as render_mock:
+        first = await client.get('/car_map')
+        second = await client.get('/car_map')
+        assert render_mock.call_count == 1
+
+        environment_manager.get_track_version.return_value = 2
+        environment_manager.get_track.return_value = TrackBuilder() \
+            .append(TrackPieceType.STRAIGHT_WE) \
+            .append(TrackPieceType.CURVE_WS) \
+            .append(TrackPieceType.CURVE_NW) \
+            .append(TrackPieceType.CURVE_EN) \
+            .append(TrackPieceType.CURVE_SE) \
+            .build()
+        third = await client.get('/car_map')
+        assert render_mock.call_count == 2
+
+    assert first.status_code == 200
+    assert await first.get_data() == await second.get_data()
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert third.headers['ETag'] != first.headers['ETag']
+
+
+@pytest.mark.asyncio
+async def test_unchanged_page_is_not_sent_again(car_map_app):
+    app, _, configuration = car_map_app
+    client = app.test_client()
+    first = await client.get('/car_map')
+    assert first.status_code == 200
+    assert 'Last-Modified' in first.headers
+
+    not_modified = await client.get('/car_map', headers={'If-None-Match': first.headers['ETag']})
+    assert not_modified.status_code == 304
+    assert await not_modified.get_data() == b''
+    not_modified = await client.get('/car_map', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert not_modified.status_code == 304
+
+    # changed display settings are a different page
+    configuration['display_settings'] = {'disp_cm_slogan_text': 'Another slogan'}
+    modified = await client.get('/car_map', headers={'If-None-Match': first.headers['ETag']})
+    assert modified.status_code == 200
+    assert modified.headers['ETag'] != first.headers['ETag']
+
+
+@pytest.mark.asyncio
+async def test_state_contains_current_items(car_map_app):
+    app, environment_manager, _ = car_map_app
+    item = MagicMock()
+    item.to_html_dict.return_value = {'x': 1.0, 'y': 2.0}
+    environment_manager.get_item_collision_detector.return_value.get_current_items.return_value = [item]
+
+    response = await app.test_client().get('/car_map/state')
+    assert response.status_code == 200
+    assert await response.get_json() == {'items': [{'x': 1.0, 'y': 2.0}]}
+    assert 'no-store' in response.headers['Cache-Control']
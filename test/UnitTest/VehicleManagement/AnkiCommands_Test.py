@@ -0,0 +1,19 @@
+import struct
+
+from VehicleManagement import AnkiCommands
+
+
+def test_frames_start_with_their_size():
+    assert AnkiCommands.encode_speed(600, 1000, True) == struct.pack("<BBHHH", 7, 0x24, 600, 1000, 1)
+    assert AnkiCommands.encode_lane_change(300, 1000, -44.5) == struct.pack("<BBHHf", 9, 0x25, 300, 1000, -44.5)
+    assert AnkiCommands.encode_turn(3, 0) == struct.pack("<BBHH", 5, 0x32, 3, 0)
+    assert AnkiCommands.encode_road_offset(0.0) == struct.pack("<BBf", 5, 0x2c, 0.0)
+
+
+def test_constant_frames():
+    assert AnkiCommands.VERSION_REQUEST_FRAME == b'\x01\x18'
+    assert AnkiCommands.BATTERY_REQUEST_FRAME == b'\x01\x1a'
+    assert AnkiCommands.UPDATE_ROAD_OFFSET_FRAME == b'\x01\x2d'
+    assert AnkiCommands.DISCONNECT_FRAME == b'\x01\x0d'
+    assert AnkiCommands.SDK_MODE_ON_FRAME == b'\x03\x90\x01\x01'
+    assert AnkiCommands.SDK_MODE_OFF_FRAME == b'\x03\x90\x01\x00'
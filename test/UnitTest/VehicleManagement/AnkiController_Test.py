@@ -12,6 +12,9 @@ from unittest import TestCase
 from unittest.mock import patch
 import struct
 from VehicleManagement.AnkiController import AnkiController
+from VehicleManagement.AnkiCommands import encode_speed
+from VehicleManagement.AnkiMessages import LocationMessage, TransitionMessage, BatteryMessage
+from VehicleManagement.VehicleController import Turns
 
 
 @pytest.mark.skip_ci
@@ -31,7 +34,7 @@ class AnkiControllerUnitTests(TestCase):
         self.commands_send = []
         pass
 
-    async def mock_send_command_task(self, command: bytes) -> None:
+    async def mock_send_command_task(self, command: bytes, response: bool = True) -> None:
         """
         Mock sending BLE command to Anki car by asynchronously sleep for a short time.
         Save commands simulated to be sent into a list.
@@ -65,7 +68,7 @@ class AnkiControllerUnitTests(TestCase):
                 # convert speed request to command and save in list for comparison
                 speed_int = int(controller._AnkiController__MAX_ANKI_SPEED * speed / 100)
                 limit_int = int(True)
-                speed_requests_commands.append(struct.pack("<BHHH", 0x24, speed_int, 1000, limit_int))
+                speed_requests_commands.append(encode_speed(speed_int, 1000, limit_int))
 
                 await asyncio.sleep(0.01)  # time between commands << time to process command
 
@@ -76,11 +79,122 @@ class AnkiControllerUnitTests(TestCase):
 
         # Assert
 
-        # test if __latest_command was cleared to None:
-        assert controller._AnkiController__latest_command is None
+        # test if all commands were taken from the queue:
+        assert len(controller._AnkiController__command_queue) == 0
         # test if first requested and send command is equal:
         assert self.commands_send[0] == speed_requests_commands[0]
         # test if commands_send is subset of speed_request_commands (expected that commands are dropped):
         assert self.commands_send < speed_requests_commands
         # test if last requested and send command is equal:
         assert self.commands_send.pop() == speed_requests_commands.pop()
+
+
+@pytest.mark.asyncio
+async def test_commands_are_written_by_priority():
+    controller = AnkiController()
+    written = []
+
+    async def mock_send_command_task(command: bytes, response: bool = True) -> bool:
+        written.append(command[1])
+        await asyncio.sleep(0.01)
+        return True
+
+    with patch.object(controller, "_AnkiController__send_command_task", new=mock_send_command_task):
+        controller.change_speed_to(50)
+        await asyncio.sleep(0)
+        # these are queued while the first command is written
+        controller.request_version()
+        controller.change_speed_to(60)
+        controller.change_lane_to(1, 50)
+        controller.do_turn_with(Turns.A_UTURN)
+        controller.change_speed_to(70)
+        controller.change_speed_to(0)
+        await asyncio.sleep(0.2)
+
+    # the stop comes first, lane changes and turns keep their order and pending speed updates are replaced by it
+    assert written == [0x24, 0x24, 0x25, 0x32, 0x18]
+    statistics = controller.get_command_statistics()
+    assert statistics['speed']['written'] == 1
+    assert statistics['speed']['coalesced'] == 2
+    assert statistics['stop']['written'] == 1
+    assert statistics['lane']['written'] == 1
+    assert statistics['lane']['average_latency'] > 0
+    assert statistics['version']['dropped'] == 0
+
+
+class MockBleClient:
+    """
+    Stand-in for a BleakClient that records the writes
+    """
+    def __init__(self):
+        self.address = 'AA:BB:CC:DD:EE:FF'
+        self.writes: list[tuple[int, bool]] = []
+
+    async def write_gatt_char(self, _: str, data: bytes, response: bool) -> None:
+        self.writes.append((data[1], response))
+        await asyncio.sleep(0.002 if response else 0)
+
+
+@pytest.mark.asyncio
+async def test_write_without_response_for_latest_value_commands():
+    controller = AnkiController(write_without_response=True, max_unacknowledged_writes=2,
+                                min_unacknowledged_write_interval=0)
+    client = MockBleClient()
+    controller._connected_car = client
+    latencies = []
+    controller.set_latency_callback(latencies.append)
+
+    for speed in [10, 20, 30, 40]:
+        controller.change_speed_to(speed)
+        await asyncio.sleep(0.01)
+    controller.change_lane_to(1, 40)
+    await asyncio.sleep(0.01)
+    controller.change_speed_to(0)
+    await asyncio.sleep(0.01)
+
+    # only two speed updates in a row are unacknowledged, lane changes and stops are always acknowledged
+    assert client.writes == [(0x24, False), (0x24, False), (0x24, True), (0x24, False), (0x25, True), (0x24, True)]
+    # the latency is only measured with acknowledged writes
+    assert len(latencies) == 3
+
+
+def test_notifications_are_decoded_into_records():
+    controller = AnkiController()
+    received = []
+    controller.set_callbacks(received.append, received.append, received.append, received.append, received.append)
+    receive = controller._AnkiController__on_receive_data
+
+    receive(None, bytearray(struct.pack("<BBBBfHB", 10, 0x27, 5, 17, 22.5, 450, 0x40)))
+    receive(None, bytearray(struct.pack("<BBBBfB", 8, 0x29, 18, 17, -22.5, 1)))
+    receive(None, bytearray(struct.pack("<BBH", 4, 0x1b, 3800)))
+    assert received == [LocationMessage(5, 17, 22.5, 450, 0x40), TransitionMessage(18, 17, -22.5, 1),
+                        BatteryMessage(3800)]
+    assert received[0].speed == 450
+    assert controller.get_last_notification_time() is not None
+
+    # unknown IDs are counted, notifications that are too short are ignored
+    receive(None, bytearray(b'\x03\x43\x00\x00'))
+    receive(None, bytearray(b'\x03\x43\x00\x00'))
+    receive(None, bytearray(b'\x02\x27\x05'))
+    assert len(received) == 3
+    assert controller.get_unknown_message_counts() == {0x43: 2}
+    assert controller.get_malformed_message_count() == 1
+
+
+@pytest.mark.asyncio
+async def test_identical_speed_updates_are_skipped():
+    controller = AnkiController()
+    client = MockBleClient()
+    controller._connected_car = client
+
+    for speed in [50, 50, 60, 60]:
+        controller.change_speed_to(speed)
+        await asyncio.sleep(0.01)
+    # a lane change sets a speed as well, so the same speed update is needed again afterwards
+    controller.change_lane_to(1, 40)
+    await asyncio.sleep(0.01)
+    controller.change_speed_to(60)
+    await asyncio.sleep(0.01)
+
+    assert client.writes == [(0x24, True), (0x24, True), (0x25, True), (0x24, True)]
+    assert controller.get_command_statistics()['speed']['skipped'] == 2
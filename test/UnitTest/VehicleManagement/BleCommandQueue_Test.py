@@ -0,0 +1,56 @@
+from VehicleManagement.BleCommandQueue import BleCommandQueue, CommandPriority
+
+
+def test_commands_are_ordered_by_priority_and_speed_is_coalesced():
+    queue = BleCommandQueue()
+    queue.put('version', b'v', CommandPriority.INFO)
+    queue.put('speed', b's1', CommandPriority.SPEED)
+    queue.put('lane', b'l1', CommandPriority.CONTROL)
+    queue.put('speed', b's2', CommandPriority.SPEED)
+    queue.put('lane', b'l2', CommandPriority.CONTROL)
+    assert len(queue) == 4
+    assert queue.get_coalesced_count() == 1
+
+    assert [queue.get_nowait() for _ in range(4)] == [('lane', b'l1'), ('lane', b'l2'), ('speed', b's2'),
+                                                      ('version', b'v')]
+    assert queue.get_nowait() is None
+    assert len(queue) == 0
+
+
+def test_stop_is_sent_first_and_removes_pending_speed_updates():
+    queue = BleCommandQueue()
+    queue.put('lane', b'l', CommandPriority.CONTROL)
+    queue.put('speed', b's', CommandPriority.SPEED)
+    queue.put('speed', b'stop', CommandPriority.SAFETY)
+    assert len(queue) == 2
+    assert queue.get_nowait() == ('speed', b'stop')
+    assert queue.get_nowait() == ('lane', b'l')
+    assert queue.get_nowait() is None
+
+
+def test_full_queue_drops_info_and_speed_but_never_control_commands():
+    queue = BleCommandQueue(capacity=3)
+    queue.put('version', b'v', CommandPriority.INFO)
+    queue.put('speed', b's', CommandPriority.SPEED)
+    queue.put('lane', b'l1', CommandPriority.CONTROL)
+    # the information request makes room
+    queue.put('lane', b'l2', CommandPriority.CONTROL)
+    # then the speed update
+    queue.put('turn', b't', CommandPriority.CONTROL)
+    # nothing can be dropped anymore, but control commands are accepted anyway
+    queue.put('lane', b'l3', CommandPriority.CONTROL)
+    # an information request isn't accepted
+    queue.put('battery', b'b', CommandPriority.INFO)
+
+    assert queue.get_dropped_counts() == {'version': 1, 'speed': 1, 'battery': 1}
+    assert [queue.get_nowait() for _ in range(len(queue))] == [('lane', b'l1'), ('lane', b'l2'), ('turn', b't'),
+                                                               ('lane', b'l3')]
+
+
+def test_clear_removes_all_commands():
+    queue = BleCommandQueue()
+    queue.put('turn', b't', CommandPriority.CONTROL)
+    queue.put('speed', b's', CommandPriority.SPEED)
+    queue.clear()
+    assert len(queue) == 0
+    assert queue.get_dropped_counts() == {}
@@ -0,0 +1,118 @@
+import pytest
+
+from EnvironmentManagement.Clock import Clock, VirtualClock, set_clock
+from LocationService.Track import FullTrack, TrackPieceType
+from LocationService.TrackPieces import TrackBuilder
+from VehicleManagement.AnkiController import AnkiController
+from VehicleManagement.AnkiMessages import BatteryMessage, LocationMessage, TransitionMessage, VersionMessage
+from VehicleManagement.EmulatedAnkiCar import EmulatedAnkiCar, _DelayedChannel
+
+PHYSICAL_IDS = [40, 18, 23, 39, 17, 20]
+
+
+@pytest.fixture
+def virtual_clock():
+    clock = VirtualClock()
+    set_clock(clock)
+    yield clock
+    set_clock(Clock())
+
+
+def get_track() -> FullTrack:
+    return TrackBuilder() \
+        .append(TrackPieceType.STRAIGHT_WE, 40) \
+        .append(TrackPieceType.CURVE_WS, 18) \
+        .append(TrackPieceType.CURVE_NW, 23) \
+        .append(TrackPieceType.STRAIGHT_EW, 39) \
+        .append(TrackPieceType.CURVE_EN, 17) \
+        .append(TrackPieceType.CURVE_SE, 20) \
+        .build()
+
+
+async def connect(car: EmulatedAnkiCar, clock: VirtualClock) -> tuple[AnkiController, list]:
+    controller = AnkiController()
+    received = []
+    assert await controller.connect_to_vehicle(car)
+    controller.set_callbacks(received.append, received.append, received.append, received.append, received.append)
+    await clock.advance(1)
+    return controller, received
+
+
+@pytest.mark.asyncio
+async def test_emulated_car_drives_and_sends_notifications(virtual_clock):
+    car = EmulatedAnkiCar('EE:00:00:00:00:01', get_track(), latency=0.02, jitter=0.01, seed=1)
+    controller, received = await connect(car, virtual_clock)
+    controller.request_version()
+    controller.request_battery()
+    await virtual_clock.advance(1)
+    assert received == [VersionMessage(0x50, 0x2e), BatteryMessage(3900)]
+
+    controller.change_speed_to(50)
+    await virtual_clock.advance(10)
+    transitions = [message for message in received if isinstance(message, TransitionMessage)]
+    locations = [message for message in received if isinstance(message, LocationMessage)]
+    # 600 mm/s for 10 s are several laps
+    assert len(transitions) > 10
+    for transition in transitions:
+        index = PHYSICAL_IDS.index(transition.piece)
+        assert transition.previous_piece == PHYSICAL_IDS[index - 1]
+    assert {location.piece for location in locations} == set(PHYSICAL_IDS)
+    assert locations[-1].speed == 600
+    assert car.get_lost_notification_count() == 0
+
+    # stops and doesn't send anything after disconnecting
+    controller.change_speed_to(0)
+    await virtual_clock.advance(3)
+    count = len(received)
+    await virtual_clock.advance(3)
+    assert len(received) == count
+    await car.disconnect()
+    assert not car.is_connected
+
+
+@pytest.mark.asyncio
+async def test_driving_commands_need_the_sdk_mode_and_notifications_can_get_lost(virtual_clock):
+    car = EmulatedAnkiCar('EE:00:00:00:00:02', get_track(), loss=1)
+    await car.connect()
+    received = []
+    await car.start_notify(None, lambda _, data: received.append(data))
+    await car.write_gatt_char(None, b'\x07\x24\x58\x02\xe8\x03\x01\x00', False)
+    await car.write_gatt_char(None, b'\x01\x18', False)
+    await virtual_clock.advance(5)
+    # without the SDK mode the car doesn't drive, and every notification gets lost
+    assert received == []
+    assert car.get_sent_notification_count() == 1
+    assert car.get_lost_notification_count() == 1
+    await car.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_delayed_channel_drops_cleared_coroutines_and_survives_failures(virtual_clock):
+    channel = _DelayedChannel()
+    ran = []
+
+    async def record(value: int) -> None:
+        ran.append(value)
+
+    async def fail() -> None:
+        raise RuntimeError("failed")
+
+    channel.put(0.1, fail())
+    channel.put(0.1, record(1))
+    await virtual_clock.advance(1)
+    # a failing coroutine doesn't stop the channel
+    assert ran == [1]
+    assert channel._task is None
+
+    channel.put(0.1, record(2))
+    channel.put(0.1, record(3))
+    # the running channel already took the first coroutine out of the queue before it is cleared
+    await virtual_clock.advance(0.05)
+    channel.clear()
+    await virtual_clock.advance(1)
+    assert ran == [1]
+    assert channel._task is None
+
+    channel.put(0.1, record(4))
+    await virtual_clock.advance(1)
+    assert ran == [1, 4]